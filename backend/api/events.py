@@ -0,0 +1,132 @@
+"""
+Server-Sent Events прогресса задачи
+GET /api/tasks/{id}/events/
+
+Асинхронное представление для config/asgi.py: соединение ждет событий
+в очереди EventHub (processing.events) и не занимает поток. Первым
+событием отдается текущий снимок статуса (progress), дальше — события
+конвейера (progress, stage, items) и комментарии keepalive раз в
+PROCESSING_EVENTS_KEEPALIVE секунд. Поток закрывается, когда задача
+завершена, отменена или упала.
+
+Под WSGI (runserver, gunicorn) потоковый ответ из асинхронного
+итератора собирается целиком до отправки, то есть клиент не получил бы
+ничего до завершения задачи, а соединение держало бы поток. Поэтому вне
+ASGI представление сразу отвечает 503, и клиент опрашивает
+/api/tasks/{id}/status/.
+"""
+
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connections
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from processing.events import FINAL_STATUSES, format_sse, get_event_hub, get_url, status_payload
+from processing.status import load_status
+
+
+def authenticate(request):
+    """Пользователь запроса по схемам аутентификации DRF"""
+    drf_request = Request(
+        request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    )
+    try:
+        return drf_request.user
+    except Exception:
+        return None
+
+
+def load_snapshot(request, pk):
+    """
+    Пользователь запроса и снимок статуса его задачи
+
+    Соединения с БД и кэшами, открытые здесь, привязаны к контексту
+    запроса и жили бы, пока открыт поток событий (часами), поэтому
+    закрываются сразу.
+
+    Returns:
+        (user или None, снимок или None)
+    """
+    try:
+        user = authenticate(request)
+        if user is None or not user.is_authenticated:
+            return None, None
+        return user, load_status(pk)
+    finally:
+        connections.close_all()
+        for alias in caches:
+            try:
+                del caches[alias]
+            except AttributeError:
+                pass
+
+
+async def task_events(request, pk):
+    """Поток событий задачи пользователя"""
+    if request.method != 'GET':
+        return JsonResponse({'detail': 'Метод не поддерживается'}, status=405)
+    if not get_url():
+        return JsonResponse({'detail': 'События задач отключены'}, status=503)
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'detail': 'События задач доступны только под ASGI сервером'}, status=503)
+
+    # Подписка до чтения снимка: событие между ними не потеряется
+    hub = get_event_hub()
+    queue = await hub.subscribe(pk)
+    try:
+        user, snapshot = await sync_to_async(load_snapshot)(request, pk)
+    except BaseException:
+        await hub.unsubscribe(pk, queue)
+        raise
+    if user is None:
+        await hub.unsubscribe(pk, queue)
+        return JsonResponse({'detail': 'Учетные данные не были предоставлены.'}, status=401)
+    if snapshot is None or snapshot['fields']['user_id'] != user.id:
+        await hub.unsubscribe(pk, queue)
+        return JsonResponse({'detail': 'Задача не найдена'}, status=404)
+
+    response = StreamingHttpResponse(stream(hub, pk, queue, snapshot), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Отключает буферизацию ответа в nginx
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+async def stream(hub, task_id, queue, snapshot):
+    keepalive = getattr(settings, 'PROCESSING_EVENTS_KEEPALIVE', 15.0)
+    # Уже отправленные клиенту версия и статус (снимок, опубликованный
+    # при чтении load_status, приходит и через подписку)
+    version = snapshot['version']
+    current = snapshot['fields']['status']
+    try:
+        yield 'retry: 3000\n\n'
+        yield format_sse('progress', status_payload(snapshot))
+        if current in FINAL_STATUSES:
+            return
+
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            event, data = message['event'], message['data']
+            if event == 'progress':
+                if data['version'] == version:
+                    continue
+                version = data['version']
+            elif event == 'stage':
+                if data['status'] == current:
+                    continue
+                current = data['status']
+            yield format_sse(event, data)
+            if event == 'stage' and current in FINAL_STATUSES:
+                return
+    finally:
+        await hub.unsubscribe(task_id, queue)
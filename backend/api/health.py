@@ -112,6 +112,30 @@ class HealthCheckView(APIView):
                 'error': str(e)
             }
         
+        # 5. Загруженность ограничителей запросов к LLM
+        try:
+            from processing.ratelimit import get_limiters
+            
+            limiters = get_limiters()
+            if limiters:
+                saturation = {limiter.name: limiter.saturation() for limiter in limiters}
+                peak = max((value for levels in saturation.values() for value in levels.values()), default=0)
+                health_status['components']['rate_limiter'] = {
+                    'status': 'warning' if peak >= 0.9 else 'healthy',
+                    'details': 'Saturation per model (0 - idle, 1 - exhausted, >1 - queued)',
+                    'saturation': saturation
+                }
+            else:
+                health_status['components']['rate_limiter'] = {
+                    'status': 'not_configured',
+                    'details': 'LLM rate limits not configured'
+                }
+        except Exception as e:
+            health_status['components']['rate_limiter'] = {
+                'status': 'unhealthy',
+                'error': str(e)
+            }
+        
         # Общий статус
         if not overall_healthy:
             health_status['status'] = 'unhealthy'
@@ -0,0 +1,190 @@
+"""
+Пагинация списков позиций товаров по ключу (keyset)
+
+PageNumberPagination на каждой странице выполняет COUNT(*) и читает
+страницу через OFFSET, поэтому глубокие страницы задачи на 100k позиций
+становятся все медленнее. Здесь страница продолжается с последнего
+ключа предыдущей: WHERE (task_id, row_number) > (:task, :row) ORDER BY
+task_id, row_number LIMIT n — это один проход по уникальному индексу
+(task, row_number), время не зависит от глубины.
+
+Параметры запроса:
+
+- cursor — непрозрачный курсор из поля next предыдущего ответа;
+- page_size — размер страницы (не больше max_page_size);
+- count=false — не считать общее число позиций (считается только на
+  первой странице, без cursor);
+- since — только позиции, измененные после прошлого опроса: курсор из
+  поля since предыдущего ответа или время ISO 8601 (пустое значение —
+  с начала). В этом режиме позиции идут по (updated_at, id) по индексу
+  (task, updated_at, id), а ответ содержит since для следующего опроса.
+
+Гарантия since — "хотя бы один раз": updated_at выставляется до
+фиксации транзакции (save_results, шарды пишут параллельно), поэтому
+позиция с более ранним временем может стать видна позже позиций, уже
+отданных клиенту. Поле since ответа никогда не уходит дальше, чем на
+PROCESSING_ITEMS_SINCE_WINDOW секунд до момента запроса: изменения за
+это окно следующий опрос отдаст повторно, и ни одно зафиксированное
+за окно изменение не потеряется. Окно (по умолчанию 2 с) длиннее
+транзакции записи пакета и короче интервала опроса, поэтому изменение
+приходит повторно не больше одного раза. Клиент применяет позиции по id (более
+поздняя версия заменяет прежнюю), повторы ему безразличны. Курсор next
+внутри одного опроса продолжает страницы без повторов.
+"""
+
+import base64
+import json
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def keyset_filter(fields, values):
+    """
+    Условие "кортеж полей больше кортежа значений"
+
+    (a, b) > (x, y)  =>  a > x OR (a = x AND b > y)
+    """
+    condition = Q()
+    for position, field in enumerate(fields):
+        step = Q(**{f'{field}__gt': values[position]})
+        for previous, value in zip(fields[:position], values):
+            step &= Q(**{previous: value})
+        condition |= step
+    return condition
+
+
+class KeysetPagination(BasePagination):
+    """Пагинация по ключу с необязательным подсчетом и режимом since"""
+
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 500
+    # Уникальный ключ порядка: индекс unique_together (task, row_number)
+    ordering = ('task_id', 'row_number')
+    # Порядок изменений: индекс item_since_idx (task, updated_at, id)
+    since_ordering = ('updated_at', 'id')
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    count_query_param = 'count'
+    since_query_param = 'since'
+
+    invalid_cursor_message = 'Неверный курсор'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.started = timezone.now()
+        self.model = queryset.model
+        self.page_size = self.get_page_size(request)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        since = request.query_params.get(self.since_query_param)
+        self.since_mode = since is not None
+        self.fields = self.since_ordering if self.since_mode else self.ordering
+
+        self.count = None
+        if cursor is None and not self.since_mode and self.wants_count(request):
+            self.count = queryset.count()
+
+        position = self.decode_cursor(cursor) if cursor else None
+        if position is None and self.since_mode:
+            position = self.decode_since(since)
+        if position is not None:
+            queryset = queryset.filter(keyset_filter(self.fields, position))
+
+        page = list(queryset.order_by(*self.fields)[:self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        page = page[:self.page_size]
+
+        if page:
+            self.last_position = [getattr(page[-1], field) for field in self.fields]
+        else:
+            self.last_position = position
+        return page
+
+    def get_paginated_response(self, data):
+        response = OrderedDict()
+        if self.count is not None:
+            response['count'] = self.count
+        response['next'] = self.get_next_link()
+        if self.since_mode:
+            position = self.get_since_position()
+            response['since'] = self.encode_cursor(position) if position else None
+        response['results'] = data
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer'},
+                'next': {'type': 'string', 'nullable': True},
+                'since': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_since_position(self):
+        """
+        Позиция для следующего опроса since: последняя отданная, но не
+        позже окна незафиксированных записей (см. описание модуля)
+        """
+        if not self.last_position:
+            return None
+        window = getattr(settings, 'PROCESSING_ITEMS_SINCE_WINDOW', 2)
+        return min(self.last_position, [self.started - timedelta(seconds=window), 0])
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def wants_count(self, request):
+        return request.query_params.get(self.count_query_param, 'true').lower() not in ('false', '0', 'no')
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.count_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.last_position))
+
+    def encode_cursor(self, position):
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in position]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, cursor):
+        """Значения ключа из курсора в типах полей модели"""
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if not isinstance(values, list) or len(values) != len(self.fields):
+                raise ValueError(cursor)
+            return [
+                self.model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.fields, values)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def decode_since(self, since):
+        """since: время ISO 8601 (позиции, измененные с этого момента) или курсор из ответа"""
+        if not since:
+            return None
+        moment = parse_datetime(since)
+        if moment is not None:
+            if timezone.is_naive(moment):
+                moment = timezone.make_aware(moment)
+            return [moment, 0]
+        return self.decode_cursor(since)
@@ -4,7 +4,21 @@
 
 from rest_framework import serializers
 from core.models import HSCode, ProcessingTask, ProductItem
+from core.registry import get_hs_code_registry
 from django.contrib.auth.models import User
+from django.conf import settings
+from django.db.models import Count, Q
+
+
+ITEM_STATUSES = [status for status, _ in ProductItem.ITEM_STATUS_CHOICES]
+
+
+def annotate_item_counts(queryset):
+    """Добавляет к задачам число позиций по статусам (items_<статус>) одним запросом"""
+    return queryset.annotate(**{
+        f'items_{status}': Count('items', filter=Q(items__status=status))
+        for status in ITEM_STATUSES
+    })
 
 
 class HSCodeSerializer(serializers.ModelSerializer):
@@ -25,59 +39,161 @@ class HSCodeSimpleSerializer(serializers.ModelSerializer):
         fields = ['id', 'code', 'description']
 
 
+class RegistryHSCodeField(serializers.Field):
+    """HS код позиции по id из справочника процесса (без JOIN и запросов)"""
+    
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+    
+    def to_representation(self, value):
+        entry = get_hs_code_registry().get_by_id(value)
+        if entry is None:
+            return None
+        return {'id': entry.id, 'code': entry.code, 'description': entry.description}
+
+
 class ProductItemSerializer(serializers.ModelSerializer):
     """Сериализатор для позиций товаров"""
     
-    suggested_hs_code = HSCodeSimpleSerializer(read_only=True)
-    final_hs_code = HSCodeSimpleSerializer(read_only=True)
+    suggested_hs_code = RegistryHSCodeField(source='suggested_hs_code_id')
+    final_hs_code = RegistryHSCodeField(source='final_hs_code_id')
     final_hs_code_id = serializers.IntegerField(write_only=True, required=False)
     
     class Meta:
         model = ProductItem
         fields = ['id', 'row_number', 'original_description', 'quantity', 'unit',
-                 'suggested_hs_code', 'confidence_score', 'alternatives', 'ai_reasoning',
-                 'status', 'user_comment', 'final_hs_code', 'final_hs_code_id',
+                 'suggested_hs_code', 'confidence_score', 'classification_tier',
+                 'alternatives', 'ai_reasoning', 'status', 'user_comment', 'final_hs_code', 'final_hs_code_id',
                  'created_at', 'updated_at']
         read_only_fields = ['id', 'row_number', 'original_description', 'quantity', 'unit',
-                           'suggested_hs_code', 'confidence_score', 'alternatives', 'ai_reasoning',
-                           'created_at', 'updated_at']
+                           'suggested_hs_code', 'confidence_score', 'classification_tier',
+                           'alternatives', 'ai_reasoning', 'created_at', 'updated_at']
+    
+    def validate_final_hs_code_id(self, value):
+        """Финальный код должен существовать в справочнике"""
+        if value and get_hs_code_registry().get_by_id(value) is None:
+            raise serializers.ValidationError('Неверный HS код')
+        return value
     
     def update(self, instance, validated_data):
         """Обновление позиции товара (статус, комментарий, финальный код)"""
         final_hs_code_id = validated_data.pop('final_hs_code_id', None)
         
         if final_hs_code_id:
-            try:
-                final_hs_code = HSCode.objects.get(id=final_hs_code_id)
-                instance.final_hs_code = final_hs_code
-            except HSCode.DoesNotExist:
-                raise serializers.ValidationError({'final_hs_code_id': 'Неверный HS код'})
+            instance.final_hs_code_id = final_hs_code_id
         
         return super().update(instance, validated_data)
 
 
-class ProcessingTaskSerializer(serializers.ModelSerializer):
-    """Сериализатор для задач обработки"""
+class TaskCountersMixin(serializers.Serializer):
+    """Прогресс задачи и число ее позиций по статусам"""
     
-    user = serializers.StringRelatedField(read_only=True)
-    items = ProductItemSerializer(many=True, read_only=True)
     progress_percent = serializers.SerializerMethodField()
+    status_counts = serializers.SerializerMethodField()
+    
+    def get_status_counts(self, obj):
+        """Берет аннотации annotate_item_counts, без них — один агрегирующий запрос"""
+        if not hasattr(obj, f'items_{ITEM_STATUSES[0]}'):
+            counts = dict(obj.items.values_list('status').annotate(count=Count('id')).order_by())
+            return {status: counts.get(status, 0) for status in ITEM_STATUSES}
+        return {status: getattr(obj, f'items_{status}') for status in ITEM_STATUSES}
+    
+    def get_progress_percent(self, obj):
+        """Вычисляет процент выполнения"""
+        if obj.total_items > 0:
+            return round((obj.processed_items / obj.total_items) * 100, 1)
+        return 0.0
+
+
+class ProcessingTaskListSerializer(TaskCountersMixin, serializers.ModelSerializer):
+    """Сериализатор списка задач: счетчики и прогресс, без позиций"""
+    
+    class Meta:
+        model = ProcessingTask
+        fields = ['id', 'file_name', 'status',
+                 'total_items', 'processed_items', 'progress_percent', 'status_counts',
+                 'cancel_requested_at', 'error_message',
+                 'created_at', 'updated_at']
+        read_only_fields = fields
+
+
+class ProcessingTaskSerializer(TaskCountersMixin, serializers.ModelSerializer):
+    """
+    Сериализатор для задач обработки
+    
+    Позиции не вкладываются: они доступны постранично через /tasks/{id}/items/
+    """
+    
+    user = serializers.StringRelatedField(read_only=True)
     
     class Meta:
         model = ProcessingTask
         fields = ['id', 'user', 'file_name', 'file_path', 'status', 
-                 'total_items', 'processed_items', 'progress_percent',
-                 'celery_task_id', 'error_message', 'items',
+                 'total_items', 'processed_items', 'progress_percent', 'status_counts',
+                 'duplicate_items', 'dedup_ratio',
+                 'cache_hits', 'cache_misses', 'cache_hit_ratio', 'tier_counts',
+                 'cancel_requested_at', 'cancelled_at', 'cancel_latency',
+                 'celery_task_id', 'error_message',
                  'created_at', 'updated_at']
         read_only_fields = ['id', 'user', 'status', 'processed_items', 
-                           'celery_task_id', 'error_message', 'items',
+                           'duplicate_items', 'cache_hits', 'cache_misses',
+                           'cancel_requested_at', 'cancelled_at',
+                           'celery_task_id', 'error_message',
                            'created_at', 'updated_at']
+
+
+class BulkItemActionSerializer(serializers.Serializer):
+    """
+    Выбор позиций задачи для массового действия
     
-    def get_progress_percent(self, obj):
-        """Вычисляет процент выполнения"""
-        if obj.total_items > 0:
-            return round((obj.processed_items / obj.total_items) * 100, 1)
-        return 0.0
+    Явный список ids или порог уверенности; по порогу выбираются только
+    еще не проверенные позиции (статус processed), чтобы не перезаписать
+    решения пользователя.
+    """
+    
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False,
+                                allow_empty=False, max_length=10000)
+    min_confidence = serializers.FloatField(required=False, min_value=0, max_value=1)
+    max_confidence = serializers.FloatField(required=False, min_value=0, max_value=1)
+    comment = serializers.CharField(required=False, allow_blank=True)
+    
+    def validate(self, attrs):
+        if not {'ids', 'min_confidence', 'max_confidence'} & set(attrs):
+            raise serializers.ValidationError('Укажите ids или порог уверенности (min_confidence, max_confidence)')
+        return attrs
+    
+    @property
+    def selection(self):
+        """Критерии выбора (ids и пороги) без остальных полей действия"""
+        return {
+            key: value for key, value in self.validated_data.items()
+            if key in ('ids', 'min_confidence', 'max_confidence')
+        }
+    
+    def filter(self, queryset):
+        """Сужает queryset позиций до выбранных"""
+        data = self.validated_data
+        if 'ids' in data:
+            queryset = queryset.filter(id__in=data['ids'])
+        else:
+            queryset = queryset.filter(status='processed')
+        if 'min_confidence' in data:
+            queryset = queryset.filter(confidence_score__gte=data['min_confidence'])
+        if 'max_confidence' in data:
+            queryset = queryset.filter(confidence_score__lt=data['max_confidence'])
+        return queryset
+
+
+class BulkSetCodeSerializer(BulkItemActionSerializer):
+    """Массовый выбор финального HS кода"""
+    
+    final_hs_code_id = serializers.IntegerField()
+    
+    def validate_final_hs_code_id(self, value):
+        if get_hs_code_registry().get_by_id(value) is None:
+            raise serializers.ValidationError('Неверный HS код')
+        return value
 
 
 class TaskCreateSerializer(serializers.Serializer):
@@ -87,9 +203,10 @@ class TaskCreateSerializer(serializers.Serializer):
     
     def validate_file(self, value):
         """Валидация загружаемого файла"""
-        # Проверяем размер файла (макс 10MB)
-        if value.size > 10 * 1024 * 1024:
-            raise serializers.ValidationError("Файл слишком большой. Максимум 10MB.")
+        # Проверяем размер файла
+        max_size_mb = settings.PROCESSING_MAX_UPLOAD_MB
+        if value.size > max_size_mb * 1024 * 1024:
+            raise serializers.ValidationError(f"Файл слишком большой. Максимум {max_size_mb}MB.")
         
         # Проверяем расширение файла
         allowed_extensions = ['.xlsx', '.xls', '.csv']
@@ -109,7 +226,9 @@ class TaskStatusSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProcessingTask
         fields = ['id', 'status', 'total_items', 'processed_items', 
-                 'progress_percent', 'error_message']
+                 'progress_percent', 'duplicate_items', 'dedup_ratio',
+                 'cache_hits', 'cache_misses', 'cache_hit_ratio', 'tier_counts',
+                 'cancel_latency', 'error_message']
     
     def get_progress_percent(self, obj):
         """Вычисляет процент выполнения"""
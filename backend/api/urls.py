@@ -6,6 +6,7 @@ from rest_framework.routers import DefaultRouter
 from django.urls import path, include
 from .views import HSCodeViewSet, ProcessingTaskViewSet, ProductItemViewSet
 from .health import HealthCheckView, ReadyCheckView, LivenessCheckView
+from .events import task_events
 
 # Создаем роутер для автоматической генерации URL
 router = DefaultRouter()
@@ -16,6 +17,8 @@ router.register(r'tasks', ProcessingTaskViewSet, basename='task')
 router.register(r'items', ProductItemViewSet, basename='item')
 
 urlpatterns = [
+    # Поток событий задачи (SSE) — асинхронное представление вне роутера
+    path('tasks/<int:pk>/events/', task_events, name='task-events'),
     path('', include(router.urls)),
     
     # Health Check endpoints
@@ -39,9 +42,13 @@ GET /api/tasks/{id}/                    - Детали задачи
 PATCH /api/tasks/{id}/                  - Обновить задачу
 DELETE /api/tasks/{id}/                 - Удалить задачу
 GET /api/tasks/{id}/status/             - Статус выполнения
+GET /api/tasks/{id}/events/             - Поток событий прогресса (SSE)
 POST /api/tasks/{id}/cancel/            - Отменить задачу
 GET /api/tasks/{id}/items/              - Позиции товаров задачи
 GET /api/tasks/{id}/export/             - Экспорт результатов
+POST /api/tasks/{id}/approve/           - Подтвердить коды позиций (ids или min_confidence)
+POST /api/tasks/{id}/reject/            - Отклонить коды позиций (ids или max_confidence)
+POST /api/tasks/{id}/set-code/          - Выбрать финальный код для позиций
 
 Позиции товаров:
 GET /api/items/                         - Список позиций пользователя
@@ -4,21 +4,34 @@ API Views для AI DECLARANT
 
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
 from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.http import (
+    content_disposition_header, http_date, parse_etags, parse_http_date_safe, quote_etag
+)
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
+from django.db.models import F, Q
+from django.utils import timezone
 import os
+import tempfile
 
 from core.models import HSCode, ProcessingTask, ProductItem
 from .serializers import (
     HSCodeSerializer, HSCodeSimpleSerializer,
-    ProcessingTaskSerializer, ProductItemSerializer,
-    TaskCreateSerializer, TaskStatusSerializer
+    ProcessingTaskSerializer, ProcessingTaskListSerializer, ProductItemSerializer,
+    TaskCreateSerializer, TaskStatusSerializer, annotate_item_counts,
+    BulkItemActionSerializer, BulkSetCodeSerializer
 )
-from processing.tasks import process_file_task
+from .pagination import KeysetPagination
+from processing.cancellation import request_cancel
+from processing.exports import iter_csv, iter_export_rows, write_xlsx
+from processing.memory import is_enabled as memory_enabled, remember
+from processing.scheduler import submit
+from processing.status import load_status, publish_status, snapshot_task
+from processing.tasks import remember_confirmed_items
 
 
 class HSCodeViewSet(viewsets.ReadOnlyModelViewSet):
@@ -81,13 +94,18 @@ class ProcessingTaskViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Пользователь видит только свои задачи"""
-        return ProcessingTask.objects.filter(user=self.request.user)\
+        queryset = ProcessingTask.objects.filter(user=self.request.user)\
             .order_by('-created_at')
+        if self.action in ('list', 'retrieve'):
+            queryset = annotate_item_counts(queryset.select_related('user'))
+        return queryset
     
     def get_serializer_class(self):
         """Разные сериализаторы для разных действий"""
         if self.action == 'create':
             return TaskCreateSerializer
+        elif self.action == 'list':
+            return ProcessingTaskListSerializer
         elif self.action == 'status':
             return TaskStatusSerializer
         return super().get_serializer_class()
@@ -102,10 +120,10 @@ class ProcessingTaskViewSet(viewsets.ModelViewSet):
         
         uploaded_file = serializer.validated_data['file']
         
-        # Сохраняем файл
+        # Сохраняем файл (хранилище копирует его по частям, без чтения целиком в память)
         file_name = uploaded_file.name
         file_path = f'uploads/{request.user.id}/{file_name}'
-        saved_path = default_storage.save(file_path, ContentFile(uploaded_file.read()))
+        saved_path = default_storage.save(file_path, uploaded_file)
         
         # Создаем задачу
         task = ProcessingTask.objects.create(
@@ -115,10 +133,9 @@ class ProcessingTaskViewSet(viewsets.ModelViewSet):
             status='pending'
         )
         
-        # Запускаем асинхронную обработку
-        celery_task = process_file_task.delay(task.id)
-        task.celery_task_id = celery_task.id
-        task.save()
+        # Задачу запускает планировщик: сразу или когда освободится место
+        submit(task, uploaded_file.size)
+        task.refresh_from_db()
         
         # Возвращаем созданную задачу
         task_serializer = ProcessingTaskSerializer(task)
@@ -129,10 +146,36 @@ class ProcessingTaskViewSet(viewsets.ModelViewSet):
         """
         Получить статус выполнения задачи
         GET /api/tasks/{id}/status/
+        
+        Статус читается из снимка в кэше (processing.status), в БД —
+        только при промахе. Ответ несет ETag и Last-Modified версии
+        прогресса: повторный опрос с If-None-Match / If-Modified-Since
+        без изменений получает 304. ETag точнее и проверяется первым.
         """
-        task = self.get_object()
-        serializer = self.get_serializer(task)
-        return Response(serializer.data)
+        snapshot = load_status(pk) if str(pk).isdigit() else None
+        if snapshot is None or snapshot['fields']['user_id'] != request.user.id:
+            raise NotFound('Задача не найдена')
+        
+        etag = quote_etag(snapshot['version'])
+        modified = int(snapshot['modified'].timestamp())
+        # Last-Modified точен до секунды: пока секунда изменения не прошла, прогресс
+        # может измениться еще раз в ней же, поэтому отдается предыдущая секунда,
+        # а If-Modified-Since не дает 304 (иначе опрос пропустил бы это изменение)
+        recent = modified >= int(timezone.now().timestamp())
+        last_modified = http_date(modified - 1 if recent else modified)
+        headers = {'ETag': etag, 'Last-Modified': last_modified, 'Cache-Control': 'private, no-cache'}
+        
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            not_modified = if_none_match.strip() == '*' or etag in parse_etags(if_none_match)
+        else:
+            since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+            not_modified = not recent and since is not None and modified <= since
+        if not_modified:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        
+        serializer = self.get_serializer(snapshot_task(snapshot))
+        return Response(serializer.data, headers=headers)
     
     @action(detail=True, methods=['post'])
     def cancel(self, request, pk=None):
@@ -148,21 +191,22 @@ class ProcessingTaskViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Отменяем Celery задачу
-        if task.celery_task_id:
-            from celery import current_app
-            current_app.control.revoke(task.celery_task_id, terminate=True)
-        
-        task.status = 'cancelled'
-        task.save()
+        # Процесс воркера не убиваем: конвейер сам остановится между пакетами
+        if request_cancel(task):
+            return Response({'message': 'Задача отменена', 'status': 'cancelled'})
         
-        return Response({'message': 'Задача отменена'})
+        return Response(
+            {'message': 'Отмена запрошена, обработка остановится после текущего пакета',
+             'status': task.status},
+            status=status.HTTP_202_ACCEPTED
+        )
     
     @action(detail=True, methods=['get'])
     def items(self, request, pk=None):
         """
-        Получить позиции товаров для задачи с пагинацией
-        GET /api/tasks/{id}/items/?page=1&page_size=50&status=processed
+        Получить позиции товаров для задачи с пагинацией по ключу
+        GET /api/tasks/{id}/items/?page_size=50&status=processed&cursor=...
+        GET /api/tasks/{id}/items/?since=... — только измененные после прошлого опроса
         """
         task = self.get_object()
         
@@ -172,14 +216,72 @@ class ProcessingTaskViewSet(viewsets.ModelViewSet):
         if status_filter:
             items_queryset = items_queryset.filter(status=status_filter)
         
-        # Пагинация
-        page = self.paginate_queryset(items_queryset)
-        if page is not None:
-            serializer = ProductItemSerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+        # Пагинация по ключу (task_id, row_number) без OFFSET
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(items_queryset, request, view=self)
+        serializer = ProductItemSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+    
+    @action(detail=True, methods=['post'], parser_classes=[JSONParser])
+    def approve(self, request, pk=None):
+        """
+        Массово подтвердить предложенные HS коды
+        POST /api/tasks/{id}/approve/ {"min_confidence": 0.8} или {"ids": [1, 2, 3]}
+        """
+        return self.bulk_update_items(
+            request, pk, BulkItemActionSerializer,
+            filters={'suggested_hs_code__isnull': False},
+            final_hs_code_id=F('suggested_hs_code_id'), status='confirmed',
+        )
+    
+    @action(detail=True, methods=['post'], parser_classes=[JSONParser])
+    def reject(self, request, pk=None):
+        """
+        Массово отклонить предложенные коды (на проверку)
+        POST /api/tasks/{id}/reject/ {"max_confidence": 0.6, "comment": "..."} или {"ids": [...]}
+        """
+        return self.bulk_update_items(request, pk, BulkItemActionSerializer, status='needs_review')
+    
+    @action(detail=True, methods=['post'], url_path='set-code', parser_classes=[JSONParser])
+    def set_code(self, request, pk=None):
+        """
+        Массово выбрать финальный HS код
+        POST /api/tasks/{id}/set-code/ {"ids": [...], "final_hs_code_id": 42}
+        """
+        return self.bulk_update_items(request, pk, BulkSetCodeSerializer, status='confirmed')
+    
+    def bulk_update_items(self, request, pk, serializer_class, filters=None, **changes):
+        """
+        Массовое действие над позициями задачи одним UPDATE
+        
+        Позиции не читаются: выбор (serializer_class.filter) и изменения
+        уходят в БД одним запросом, владелец задачи проверяется в том же
+        запросе. Подтвержденные коды запоминаются фоновой задачей по тем же
+        критериям выбора.
+        """
+        if not str(pk).isdigit():
+            raise NotFound('Задача не найдена')
+        serializer = serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        now = timezone.now()
+        changes['updated_at'] = now
+        if 'final_hs_code_id' in serializer.validated_data:
+            changes['final_hs_code_id'] = serializer.validated_data['final_hs_code_id']
+        if 'comment' in serializer.validated_data:
+            changes['user_comment'] = serializer.validated_data['comment']
         
-        serializer = ProductItemSerializer(items_queryset, many=True)
-        return Response(serializer.data)
+        items = ProductItem.objects.filter(task_id=pk, task__user=request.user, **(filters or {}))
+        updated = serializer.filter(items).update(**changes)
+        
+        if not updated and not self.get_queryset().filter(pk=pk).exists():
+            raise NotFound('Задача не найдена')
+        
+        # Подтвержденный код запоминается для тех же товаров в следующих файлах
+        if updated and changes['status'] == 'confirmed' and memory_enabled():
+            remember_confirmed_items.delay(int(pk), **serializer.selection)
+        
+        return Response({'updated': updated, 'status': changes['status']})
     
     @action(detail=True, methods=['get'])
     def export(self, request, pk=None):
@@ -196,13 +298,46 @@ class ProcessingTaskViewSet(viewsets.ModelViewSet):
             )
         
         export_format = request.query_params.get('format', 'excel')
+        rows = iter_export_rows(task)
+        name = os.path.splitext(task.file_name)[0] or f'task_{task.id}'
+        
+        # CSV уходит клиенту по мере чтения позиций
+        if export_format == 'csv':
+            response = StreamingHttpResponse(iter_csv(rows), content_type='text/csv; charset=utf-8')
+            response['Content-Disposition'] = content_disposition_header(True, f'{name}_results.csv')
+            return response
+        
+        # XLSX собирается во временном файле на диске и отдается по частям
+        if export_format in ('excel', 'xlsx'):
+            output = tempfile.TemporaryFile()
+            write_xlsx(rows, output)
+            output.seek(0)
+            return FileResponse(
+                output,
+                as_attachment=True,
+                filename=f'{name}_results.xlsx',
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            )
         
-        # TODO: Реализовать экспорт в Excel/CSV
-        return Response({
-            'message': f'Экспорт в формате {export_format} будет реализован позже',
-            'task_id': task.id,
-            'total_items': task.total_items
-        })
+        return Response(
+            {'error': 'Неподдерживаемый формат. Поддерживаются: excel, csv'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        # Снимок статуса обновляется вместе с задачей
+        publish_status(serializer.instance.pk)
+    
+    def perform_destroy(self, instance):
+        task_id = instance.pk
+        super().perform_destroy(instance)
+        # Снимок удаленной задачи убирается из кэша
+        publish_status(task_id)
+    
+    def perform_content_negotiation(self, request, force=False):
+        """?format= у export — формат файла, а не рендерер DRF"""
+        return super().perform_content_negotiation(request, force=force or self.action == 'export')
 
 
 class ProductItemViewSet(viewsets.ModelViewSet):
@@ -211,11 +346,12 @@ class ProductItemViewSet(viewsets.ModelViewSet):
     """
     serializer_class = ProductItemSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
         """Пользователь видит только позиции своих задач"""
         return ProductItem.objects.filter(task__user=self.request.user)\
-            .select_related('task', 'suggested_hs_code', 'final_hs_code')\
+            .select_related('task')\
             .order_by('task_id', 'row_number')
     
     def update(self, request, *args, **kwargs):
@@ -233,6 +369,10 @@ class ProductItemViewSet(viewsets.ModelViewSet):
             serializer.validated_data['status'] = 'confirmed'
         
         self.perform_update(serializer)
+        
+        # Подтвержденный код запоминается для тех же товаров в следующих файлах
+        if instance.status == 'confirmed':
+            remember([instance])
         return Response(serializer.data)
     
     @action(detail=True, methods=['post'])
@@ -243,15 +383,16 @@ class ProductItemViewSet(viewsets.ModelViewSet):
         """
         item = self.get_object()
         
-        if not item.suggested_hs_code:
+        if not item.suggested_hs_code_id:
             return Response(
                 {'error': 'Нет предложенного HS кода для подтверждения'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        item.final_hs_code = item.suggested_hs_code
+        item.final_hs_code_id = item.suggested_hs_code_id
         item.status = 'confirmed'
         item.save()
+        remember([item])
         
         serializer = self.get_serializer(item)
         return Response(serializer.data)
@@ -5,6 +5,8 @@
 import os
 from pathlib import Path
 
+from kombu import Queue
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
@@ -127,3 +129,155 @@ CELERY_ACCEPT_CONTENT = ['application/json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+# Очереди планировщика (processing.scheduler.QUEUES) объявлены здесь, поэтому воркер без -Q
+# читает их все, в порядке приоритета; остальные задачи идут в 'celery'.
+# Воркер берет по одной длинной задаче на процесс
+CELERY_TASK_QUEUES = [
+    Queue(name, routing_key=name)
+    for name in ('processing.high', 'processing', 'processing.bulk', 'celery')
+]
+CELERY_TASK_DEFAULT_QUEUE = 'celery'
+CELERY_BROKER_TRANSPORT_OPTIONS = {'queue_order_strategy': 'priority'}
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
+# Кэши: 'classification' — общий для воркеров кэш результатов классификации.
+# Вместо Redis можно использовать БД: BACKEND django.core.cache.backends.db.DatabaseCache,
+# LOCATION 'classification_cache' и python manage.py createcachetable
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'classification': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('PROCESSING_CACHE_URL', CELERY_BROKER_URL),
+        'KEY_PREFIX': 'ai_declarant',
+    },
+}
+
+# Настройки обработки файлов
+# Размер пакета строк для пакетной записи в process_file_task
+PROCESSING_BATCH_SIZE = int(os.environ.get('PROCESSING_BATCH_SIZE', '500'))
+
+# Коалесцирование прогресса: запись в БД/Celery раз в N строк или раз в T секунд (что раньше)
+PROCESSING_PROGRESS_EVERY_ROWS = int(os.environ.get('PROCESSING_PROGRESS_EVERY_ROWS', '1000'))
+PROCESSING_PROGRESS_INTERVAL = float(os.environ.get('PROCESSING_PROGRESS_INTERVAL', '0.5'))
+
+# Шардирование: файлы больше N строк классифицируются параллельно подзадачами (0 — отключено)
+PROCESSING_SHARD_SIZE = int(os.environ.get('PROCESSING_SHARD_SIZE', '5000'))
+
+# Бэкенд классификации: 'local' (детерминированный, без сети), 'lexical' (BM25 по справочнику
+# HS кодов), 'agents' (openai-agents), 'cascade' (уровни от дешевых к дорогим) или путь к классу. Параметры бэкендов — в PROCESSING_CLASSIFIER_OPTIONS
+PROCESSING_CLASSIFIER = os.environ.get('PROCESSING_CLASSIFIER', 'local')
+PROCESSING_CLASSIFIER_OPTIONS = {
+    'local': {
+        # Имитация задержки внешнего сервиса на позицию (секунды) для бенчмарков
+        'latency': float(os.environ.get('PROCESSING_CLASSIFIER_LATENCY', '0')),
+    },
+    'lexical': {
+        # Сколько кандидатов BM25 рассматривать (лучший — код, остальные — альтернативы)
+        'candidates': 5,
+        # В каскаде результат принимается, только если совпало не меньше min_terms термов
+        # описания и score BM25 не ниже min_score (иначе позиция уходит следующему уровню)
+        'min_terms': int(os.environ.get('PROCESSING_LEXICAL_MIN_TERMS', '2')),
+        'min_score': float(os.environ.get('PROCESSING_LEXICAL_MIN_SCORE', '0')),
+    },
+    'agents': {
+        'model': os.environ.get('OPENAI_MODEL', 'gpt-4.1'),
+        'vector_store_id': os.environ.get('OPENAI_VECTOR_STORE_ID', ''),
+        'max_num_results': 3,
+        'confidence': 0.8,
+        # OpenAI-совместимый endpoint вместо api.openai.com (прокси, фейковый сервер)
+        'base_url': os.environ.get('OPENAI_BASE_URL', ''),
+        # Одновременных вызовов агента в одном воркере и таймаут одного вызова (секунды)
+        'concurrency': int(os.environ.get('OPENAI_CONCURRENCY', '16')),
+        'timeout': float(os.environ.get('OPENAI_TIMEOUT', '60')),
+        # Лимиты провайдера на все воркеры (0 — без лимита), см. processing.ratelimit
+        'rpm': int(os.environ.get('OPENAI_RPM', '0')),
+        'tpm': int(os.environ.get('OPENAI_TPM', '0')),
+        # Оценка токенов сверх текста запроса: инструкции, результаты поиска, ответ
+        'tokens_per_call': int(os.environ.get('OPENAI_TOKENS_PER_CALL', '1000')),
+        # Сколько описаний упаковывать в один вызов агента (1 — по одному)
+        'pack_size': int(os.environ.get('OPENAI_PACK_SIZE', '1')),
+        # Поиск кодов агентом: 'vector_store' (FileSearchTool OpenAI) или 'local' (processing.retrieval)
+        'retrieval': os.environ.get('OPENAI_RETRIEVAL', 'vector_store'),
+        # Сколько кандидатов BM25 из справочника подставлять в запрос агенту (0 — не подставлять)
+        'candidates': int(os.environ.get('OPENAI_CANDIDATES', '0')),
+    },
+    'cascade': {
+        # Бэкенды по порядку; результат ниже порога уверенности уходит следующему
+        'tiers': [name.strip() for name in os.environ.get('PROCESSING_CASCADE_TIERS', 'lexical,agents').split(',') if name.strip()],
+        'threshold': float(os.environ.get('PROCESSING_CASCADE_THRESHOLD', '0.8')),
+    },
+}
+
+# Локальный векторный индекс HS кодов (см. processing.retrieval), строится командой build_hs_index.
+# Версии индекса открываются через mmap; новая версия подхватывается раз в CHECK_INTERVAL секунд
+PROCESSING_INDEX_DIR = os.environ.get('PROCESSING_INDEX_DIR', str(BASE_DIR / 'var' / 'hs_index'))
+PROCESSING_INDEX_CHECK_INTERVAL = float(os.environ.get('PROCESSING_INDEX_CHECK_INTERVAL', '5.0'))
+PROCESSING_EMBEDDER = os.environ.get('PROCESSING_EMBEDDER', 'hashing')
+PROCESSING_EMBEDDER_OPTIONS = {
+    'hashing': {
+        'dim': int(os.environ.get('PROCESSING_EMBEDDER_DIM', '256')),
+    },
+}
+
+# Кэш результатов классификации по нормализованному описанию (см. processing.cache):
+# LRU в памяти процесса + кэш Django PROCESSING_CACHE_ALIAS ('' — только LRU)
+PROCESSING_CACHE_ENABLED = os.environ.get('PROCESSING_CACHE_ENABLED', 'True').lower() == 'true'
+PROCESSING_CACHE_ALIAS = os.environ.get('PROCESSING_CACHE_ALIAS', 'classification')
+PROCESSING_CACHE_LRU_SIZE = int(os.environ.get('PROCESSING_CACHE_LRU_SIZE', '10000'))
+PROCESSING_CACHE_TTL = int(os.environ.get('PROCESSING_CACHE_TTL', str(30 * 24 * 3600)))
+
+# Планировщик задач (processing.scheduler): сколько задач выполняется одновременно (0 — без лимита)
+# и у одного пользователя, границы размера файла для приоритетов, группа пользователей с приоритетом
+PROCESSING_MAX_ACTIVE_TASKS = int(os.environ.get('PROCESSING_MAX_ACTIVE_TASKS', '4'))
+PROCESSING_MAX_TASKS_PER_USER = int(os.environ.get('PROCESSING_MAX_TASKS_PER_USER', '2'))
+PROCESSING_SMALL_FILE_MB = float(os.environ.get('PROCESSING_SMALL_FILE_MB', '1'))
+PROCESSING_LARGE_FILE_MB = float(os.environ.get('PROCESSING_LARGE_FILE_MB', '10'))
+PROCESSING_PRIORITY_GROUP = os.environ.get('PROCESSING_PRIORITY_GROUP', 'priority')
+PROCESSING_SCHEDULER_ALIAS = os.environ.get('PROCESSING_SCHEDULER_ALIAS', 'classification')
+# Запуск планировщика по расписанию (Celery beat, секунды) и через сколько минут без признаков
+# жизни запущенная задача возвращается в ожидание (0 — не возвращать)
+PROCESSING_DISPATCH_INTERVAL = float(os.environ.get('PROCESSING_DISPATCH_INTERVAL', '30'))
+PROCESSING_STALE_TASK_MINUTES = float(os.environ.get('PROCESSING_STALE_TASK_MINUTES', '30'))
+CELERY_BEAT_SCHEDULE = {
+    'dispatch-processing-tasks': {
+        'task': 'processing.tasks.dispatch_tasks',
+        'schedule': PROCESSING_DISPATCH_INTERVAL,
+    },
+}
+
+# Кооперативная отмена задач (processing.cancellation): флаг в кэше ALIAS и в БД,
+# асинхронные вызовы бэкенда проверяют флаг раз в CHECK_INTERVAL секунд
+PROCESSING_CANCEL_ALIAS = os.environ.get('PROCESSING_CANCEL_ALIAS', 'classification')
+PROCESSING_CANCEL_CHECK_INTERVAL = float(os.environ.get('PROCESSING_CANCEL_CHECK_INTERVAL', '1.0'))
+
+# Снимок статуса задач для /api/tasks/{id}/status/ (processing.status): публикуется
+# конвейером в кэш ALIAS ('' — всегда из БД) и живет TTL секунд после последней записи
+PROCESSING_STATUS_ALIAS = os.environ.get('PROCESSING_STATUS_ALIAS', 'classification')
+PROCESSING_STATUS_TTL = int(os.environ.get('PROCESSING_STATUS_TTL', '3600'))
+
+# Опрос изменений позиций ?since= (api.pagination): сколько секунд до момента запроса
+# отдаются повторно — дольше транзакции записи результатов пакета (один UPDATE), но
+# меньше интервала опроса клиента, иначе каждое изменение приходит по нескольку раз
+PROCESSING_ITEMS_SINCE_WINDOW = float(os.environ.get('PROCESSING_ITEMS_SINCE_WINDOW', '2'))
+
+# События задач (processing.events): Redis pub/sub для /api/tasks/{id}/events/ ('' — отключены),
+# клиентам SSE без событий раз в KEEPALIVE секунд уходит комментарий
+PROCESSING_EVENTS_URL = os.environ.get('PROCESSING_EVENTS_URL', CACHES['classification']['LOCATION'])
+PROCESSING_EVENTS_KEEPALIVE = float(os.environ.get('PROCESSING_EVENTS_KEEPALIVE', '15'))
+
+# Память подтвержденных пользователем кодов (processing.memory): проверяется до кэша и бэкенда
+PROCESSING_MEMORY_ENABLED = os.environ.get('PROCESSING_MEMORY_ENABLED', 'True').lower() == 'true'
+PROCESSING_MEMORY_CONFIDENCE = float(os.environ.get('PROCESSING_MEMORY_CONFIDENCE', '0.99'))
+
+# Справочник HS кодов в памяти процесса (см. core.registry): метка версии хранится
+# в общем кэше HS_CODE_REGISTRY_ALIAS и сверяется раз в HS_CODE_REGISTRY_CHECK_INTERVAL секунд
+HS_CODE_REGISTRY_ALIAS = os.environ.get('HS_CODE_REGISTRY_ALIAS', 'classification')
+HS_CODE_REGISTRY_CHECK_INTERVAL = float(os.environ.get('HS_CODE_REGISTRY_CHECK_INTERVAL', '1.0'))
+
+# Максимальное количество строк в загружаемом файле
+PROCESSING_MAX_ROWS = int(os.environ.get('PROCESSING_MAX_ROWS', '100000'))
+
+# Максимальный размер загружаемого файла (MB)
+PROCESSING_MAX_UPLOAD_MB = int(os.environ.get('PROCESSING_MAX_UPLOAD_MB', '50'))
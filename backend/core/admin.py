@@ -4,7 +4,7 @@
 
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import HSCode, ProcessingTask, ProductItem
+from .models import ConfirmedClassification, HSCode, ProcessingTask, ProductItem
 
 
 @admin.register(HSCode)
@@ -25,9 +25,9 @@ class ProductItemInline(admin.TabularInline):
     model = ProductItem
     extra = 0
     readonly_fields = ['row_number', 'original_description', 'suggested_hs_code', 
-                      'confidence_score', 'status']
+                      'confidence_score', 'classification_tier', 'status']
     fields = ['row_number', 'original_description', 'suggested_hs_code', 
-             'confidence_score', 'status', 'final_hs_code', 'user_comment']
+             'confidence_score', 'classification_tier', 'status', 'final_hs_code', 'user_comment']
 
 
 @admin.register(ProcessingTask)
@@ -90,6 +90,14 @@ class ProductItemAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related('task', 'suggested_hs_code', 'final_hs_code')
 
 
+@admin.register(ConfirmedClassification)
+class ConfirmedClassificationAdmin(admin.ModelAdmin):
+    list_display = ['description', 'hs_code', 'user', 'updated_at']
+    list_filter = ['user']
+    search_fields = ['description', 'hs_code__code']
+    readonly_fields = ['description_key', 'created_at', 'updated_at']
+
+
 # Настройки админки
 admin.site.site_header = "AI DECLARANT Админ Панель"
 admin.site.site_title = "AI DECLARANT Admin"
@@ -0,0 +1,189 @@
+"""
+Django команда для замера конкурентных вызовов агента в одном воркере
+
+Поднимает локальный фейковый OpenAI Responses endpoint с заданной
+задержкой и классифицирует через него пакет описаний бэкендом 'agents'
+при разной степени конкурентности и размере упаковки описаний в вызов.
+"""
+
+import json
+import logging
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+from processing.classifiers import AgentsClassifier
+
+ITEM_PATTERN = re.compile(r'^(\d+)\. \[', re.MULTILINE)
+
+
+class FakeResponsesHandler(BaseHTTPRequestHandler):
+    """
+    Отвечает на POST /v1/responses фиксированным кодом после задержки
+
+    На пронумерованный список товаров отвечает строкой `<номер>: <код>`
+    на позицию; с вероятностью malformed возвращает неразборчивый ответ.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    latency = 0.2
+    malformed = 0.0
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        time.sleep(self.latency)
+
+        numbers = ITEM_PATTERN.findall(self.input_text(request.get('input')))
+        if not numbers:
+            text = '0901110000'
+        elif random.random() < self.malformed:
+            text = 'Код для первого товара 0901110000, остальные уточняются'
+        else:
+            text = '\n'.join(f'{number}: 0901110000' for number in numbers)
+
+        body = json.dumps({
+            'id': f'resp_{uuid.uuid4().hex}',
+            'object': 'response',
+            'created_at': int(time.time()),
+            'model': request.get('model'),
+            'status': 'completed',
+            'output': [{
+                'type': 'message',
+                'id': f'msg_{uuid.uuid4().hex}',
+                'status': 'completed',
+                'role': 'assistant',
+                'content': [{'type': 'output_text', 'text': text, 'annotations': []}],
+            }],
+            'parallel_tool_calls': True,
+            'tool_choice': 'auto',
+            'tools': [],
+            'usage': {
+                'input_tokens': 120,
+                'output_tokens': 4,
+                'total_tokens': 124,
+                'input_tokens_details': {'cached_tokens': 0},
+                'output_tokens_details': {'reasoning_tokens': 0},
+            },
+        }).encode('utf-8')
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    @staticmethod
+    def input_text(input_items):
+        """Текст пользовательских сообщений запроса Responses API"""
+        if isinstance(input_items, str):
+            return input_items
+        parts = []
+        for item in input_items or []:
+            content = item.get('content')
+            if isinstance(content, str):
+                parts.append(content)
+            else:
+                parts.extend(part.get('text', '') for part in content or [])
+        return '\n'.join(parts)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeServer(ThreadingHTTPServer):
+    """HTTP сервер с очередью соединений, достаточной для всплеска запросов"""
+
+    daemon_threads = True
+    request_queue_size = 256
+
+
+class Command(BaseCommand):
+    help = 'Бенчмарк конкурентной классификации через фейковый LLM endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=200,
+            help='Количество описаний'
+        )
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=0.2,
+            help='Задержка ответа endpoint (секунды)'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            nargs='+',
+            default=[1, 8, 32],
+            help='Уровни конкурентности'
+        )
+        parser.add_argument(
+            '--pack-size',
+            type=int,
+            nargs='+',
+            default=[1],
+            help='Сколько описаний упаковывать в один вызов'
+        )
+        parser.add_argument(
+            '--malformed',
+            type=float,
+            default=0.0,
+            help='Доля неразборчивых ответов на упакованные запросы (0..1)'
+        )
+
+    def handle(self, *args, **options):
+        from agents import set_tracing_disabled
+
+        self.stdout.write(
+            self.style.SUCCESS('🚀 Бенчмарк конкурентных вызовов агента')
+        )
+
+        # Трейсы не отправляются: endpoint фейковый; логи HTTP-клиента не нужны
+        set_tracing_disabled(True)
+        logging.getLogger('httpx').setLevel(logging.WARNING)
+
+        FakeResponsesHandler.latency = options['latency']
+        FakeResponsesHandler.malformed = options['malformed']
+        server = FakeServer(('127.0.0.1', 0), FakeResponsesHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_address[1]}/v1'
+
+        rows = options['rows']
+        latency = options['latency']
+        descriptions = [f'Кофе в зернах, партия {i}' for i in range(rows)]
+        self.stdout.write(
+            f'📦 {rows} описаний, задержка {latency * 1000:.0f} мс, '
+            f'последовательно ≈ {rows * latency:.1f} с'
+        )
+
+        try:
+            for pack_size in options['pack_size']:
+                for concurrency in options['concurrency']:
+                    classifier = AgentsClassifier(
+                        base_url=base_url,
+                        api_key='benchmark',
+                        concurrency=concurrency,
+                        pack_size=pack_size,
+                        timeout=30,
+                    )
+                    started = time.perf_counter()
+                    results = classifier.classify_batch(descriptions)
+                    elapsed = time.perf_counter() - started
+
+                    classified = sum(1 for result in results if result['code'])
+                    self.stdout.write(
+                        f'  pack_size={pack_size:>3} concurrency={concurrency:>3}: '
+                        f'{elapsed:6.2f} с, вызовов {classifier.calls} '
+                        f'({classifier.calls / rows:.2f} на позицию), '
+                        f'классифицировано {classified}/{rows}'
+                    )
+        finally:
+            server.shutdown()
@@ -0,0 +1,130 @@
+"""
+Django команда для замера сохранения позиций товаров:
+построчный create()/save() против пакетной записи
+"""
+
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+
+from core.models import ProcessingTask, ProductItem
+from processing.persistence import attach_hs_codes, chunked, create_items, save_results
+from processing.progress import ProgressReporter
+
+
+class QueryCounter:
+    """Считает SQL запросы без накопления их текста"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = 'Бенчмарк сохранения позиций: количество запросов и время'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            nargs='+',
+            default=[1000, 50000],
+            help='Размеры файлов (количество строк)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Размер пакета строк'
+        )
+        parser.add_argument(
+            '--skip-legacy',
+            action='store_true',
+            help='Не замерять построчное сохранение'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            self.style.SUCCESS('🚀 Бенчмарк сохранения позиций товаров')
+        )
+
+        user, _ = User.objects.get_or_create(username='benchmark')
+        # Результат в том виде, в каком его сохраняет конвейер (с hs_code_id)
+        result, = attach_hs_codes([{
+            'code': '0000.00.00',
+            'description': 'Бенчмарк',
+            'confidence': 0.9,
+            'reasoning': 'benchmark',
+            'alternatives': [],
+        }])
+
+        for total_rows in options['rows']:
+            rows = [
+                {'description': f'Товар {i}', 'quantity': str(i), 'unit': 'шт'}
+                for i in range(total_rows)
+            ]
+            self.stdout.write(f'\n📦 {total_rows} строк')
+
+            if not options['skip_legacy']:
+                self.run_case('построчно', user, lambda task: self.save_per_row(task, rows, result))
+
+            self.run_case(
+                f'пакетами по {options["batch_size"]}',
+                user,
+                lambda task: self.save_batched(task, rows, result, options['batch_size'])
+            )
+
+    def run_case(self, label, user, func):
+        """Замеряет одну стратегию сохранения на новой задаче"""
+        task = ProcessingTask.objects.create(
+            user=user, file_name='benchmark.csv', file_path='benchmark.csv'
+        )
+        try:
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                started = time.perf_counter()
+                func(task)
+                elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'  {label:>20}: {counter.count:>7} запросов, {elapsed:8.2f} с'
+            )
+        finally:
+            task.delete()
+
+    def save_per_row(self, task, rows, result):
+        """Прежняя схема: create + save позиции + save задачи на каждую строку"""
+        for index, row in enumerate(rows):
+            item = ProductItem.objects.create(
+                task=task,
+                row_number=index + 1,
+                original_description=row['description'],
+                quantity=row['quantity'],
+                unit=row['unit']
+            )
+            item.suggested_hs_code_id = result['hs_code_id']
+            item.confidence_score = result['confidence']
+            item.ai_reasoning = result['reasoning']
+            item.alternatives = result['alternatives']
+            item.status = 'processed'
+            item.save()
+
+            task.processed_items = index + 1
+            task.save()
+
+    def save_batched(self, task, rows, result, batch_size):
+        """Новая схема: INSERT пакета + пакетная запись результатов"""
+        progress = ProgressReporter(task)
+        processed = 0
+        with override_settings(PROCESSING_BATCH_SIZE=batch_size):
+            for chunk in chunked(rows, batch_size):
+                items = create_items(task, chunk, start_row=processed + 1)
+                save_results(items, [result] * len(items))
+                processed += len(items)
+                progress.advance(len(items))
+            progress.flush()
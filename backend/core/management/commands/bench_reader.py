@@ -0,0 +1,137 @@
+"""
+Django команда для замера пикового потребления памяти при чтении файлов:
+pandas (весь файл в DataFrame) против потокового чтения пакетами
+"""
+
+import multiprocessing
+import os
+import resource
+import shutil
+import tempfile
+import time
+
+import openpyxl
+import pandas as pd
+from django.core.management.base import BaseCommand
+
+from processing.readers import iter_row_batches
+
+
+def read_rss_kb(field):
+    """Значение поля из /proc/self/status в KB (VmRSS, VmHWM)"""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def read_with_pandas(path, batch_size):
+    """Прежняя схема: весь файл в DataFrame и обход по строкам"""
+    df = pd.read_excel(path) if path.endswith('.xlsx') else pd.read_csv(path)
+    rows = 0
+    for _, row in df.iterrows():
+        str(row.get('description', ''))
+        rows += 1
+    return rows
+
+
+def read_streaming(path, batch_size):
+    """Новая схема: генератор пакетов строк"""
+    rows = 0
+    for batch in iter_row_batches(path, batch_size):
+        rows += len(batch)
+    return rows
+
+
+def measure(reader, path, batch_size, queue):
+    """Выполняется в отдельном процессе, чтобы пик памяти считался с нуля"""
+    baseline = read_rss_kb('VmRSS')
+    started = time.perf_counter()
+    rows = reader(path, batch_size)
+    elapsed = time.perf_counter() - started
+    peak = read_rss_kb('VmHWM')
+    queue.put((rows, max(0, peak - baseline), elapsed))
+
+
+class Command(BaseCommand):
+    help = 'Бенчмарк памяти: чтение файла целиком против потокового чтения'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            nargs='+',
+            default=[10000, 100000],
+            help='Размеры файлов (количество строк)'
+        )
+        parser.add_argument(
+            '--formats',
+            nargs='+',
+            default=['csv', 'xlsx'],
+            choices=['csv', 'xlsx'],
+            help='Форматы файлов'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Размер пакета строк'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            self.style.SUCCESS('🚀 Бенчмарк памяти при чтении файлов')
+        )
+
+        workdir = tempfile.mkdtemp(prefix='bench_reader_')
+        context = multiprocessing.get_context('fork')
+        try:
+            for file_format in options['formats']:
+                for total_rows in options['rows']:
+                    path = self.generate_file(workdir, file_format, total_rows)
+                    size_mb = os.path.getsize(path) / (1024 * 1024)
+                    self.stdout.write(f'\n📦 {file_format}, {total_rows} строк, {size_mb:.1f} MB')
+
+                    for label, reader in [('pandas', read_with_pandas), ('потоково', read_streaming)]:
+                        queue = context.Queue()
+                        process = context.Process(
+                            target=measure,
+                            args=(reader, path, options['batch_size'], queue)
+                        )
+                        process.start()
+                        rows, peak_kb, elapsed = queue.get()
+                        process.join()
+                        self.stdout.write(
+                            f'  {label:>10}: {rows:>7} строк, '
+                            f'пик +{peak_kb / 1024:7.1f} MB, {elapsed:6.2f} с'
+                        )
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def generate_file(self, workdir, file_format, total_rows):
+        """Создает тестовый файл потоково, не держа строки в памяти"""
+        header = ['description', 'quantity', 'unit', 'country', 'price']
+
+        def rows():
+            for i in range(total_rows):
+                yield [f'Товар номер {i}, артикул {i * 7919 % 100000}', i % 100 + 1, 'шт', 'Турция', i * 1.5]
+
+        if file_format == 'xlsx':
+            path = os.path.join(workdir, f'bench_{total_rows}.xlsx')
+            workbook = openpyxl.Workbook(write_only=True)
+            sheet = workbook.create_sheet()
+            sheet.append(header)
+            for row in rows():
+                sheet.append(row)
+            workbook.save(path)
+        else:
+            path = os.path.join(workdir, f'bench_{total_rows}.csv')
+            with open(path, 'w', encoding='utf-8') as output:
+                output.write(','.join(header) + '\n')
+                for row in rows():
+                    output.write(','.join(f'"{value}"' for value in row) + '\n')
+        return path
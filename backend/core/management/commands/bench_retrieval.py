@@ -0,0 +1,245 @@
+"""
+Django команда для замера локального поиска HS кодов
+
+--retriever vector (эмбеддинги) или lexical (BM25). По умолчанию
+используются индексы текущей номенклатуры HSCode. С --synthetic N
+строит индекс в памяти по N сгенерированным описаниям (без БД и сети) и
+проверяет, находится ли исходный код по искаженному описанию.
+
+С --processes замеряет память процессов, одновременно открывших индекс
+через mmap и прочитавших его в свою память (как дочерние процессы
+prefork воркера).
+"""
+
+import gc
+import multiprocessing
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from processing.retrieval import (
+    LexicalIndex, VectorIndex, get_embedder, get_lexical_index, get_vector_index, publish_index,
+)
+from processing.retrieval.index import current_version
+
+GOODS = [
+    'брюки', 'куртки', 'рубашки', 'платья', 'обувь', 'перчатки', 'шторы', 'ковры',
+    'кофе', 'чай', 'сахар', 'мука', 'масло', 'сыр', 'шоколад', 'соки',
+    'ноутбуки', 'телефоны', 'мониторы', 'кабели', 'насосы', 'двигатели', 'лампы', 'зеркала',
+    'плитка', 'мрамор', 'трубы', 'болты', 'замки', 'инструменты', 'игрушки', 'мебель',
+]
+MATERIALS = [
+    'из хлопка', 'из шерсти', 'из синтетики', 'из кожи', 'из стали', 'из алюминия',
+    'из пластмассы', 'из стекла', 'из дерева', 'из керамики', 'из меди', 'из бумаги',
+]
+PURPOSES = [
+    'мужские', 'женские', 'детские', 'бытовые', 'промышленные', 'медицинские',
+    'спортивные', 'упакованные', 'в розничной упаковке', 'для автомобилей',
+    'для строительства', 'прочие', 'обжаренные', 'замороженные',
+]
+CONDITIONS = ['новые', 'бывшие в употреблении', 'весовые']
+
+
+def synthetic_nomenclature(count, seed=0):
+    """Уникальные описания вида "товар материал назначение состояние" с кодами"""
+    rng = random.Random(seed)
+    combinations = [
+        f'{goods} {material} {purpose} {condition}'
+        for goods in GOODS for material in MATERIALS
+        for purpose in PURPOSES for condition in CONDITIONS
+    ]
+    rng.shuffle(combinations)
+    descriptions = combinations[:count]
+    codes = [f'{index:010d}' for index in range(len(descriptions))]
+    return codes, descriptions
+
+
+def distort(description, rng):
+    """Описание из декларации: другой регистр, окончания, количество"""
+    words = description.split()
+    words = [word[:-1] if len(word) > 5 and rng.random() < 0.3 else word for word in words]
+    rng.shuffle(words)
+    text = ' '.join(words)
+    if rng.random() < 0.5:
+        text = text.upper()
+    return f'{text}, {rng.randint(1, 500)} кг'
+
+
+def read_private_kb():
+    """Приватная память процесса (USS) в KB из /proc/self/smaps_rollup"""
+    private = 0
+    with open('/proc/self/smaps_rollup') as rollup:
+        for line in rollup:
+            field, _, value = line.partition(':')
+            if field in ('Private_Clean', 'Private_Dirty'):
+                private += int(value.split()[0])
+    return private
+
+
+def open_and_measure(directory, mmap, queries, loaded, measured, results):
+    """Дочерний процесс: открыть индекс, искать, замерить память, пока открыты все"""
+    baseline = read_private_kb()
+    index = VectorIndex.load(directory, mmap=mmap)
+    for query in queries:
+        index.search(query, 5)
+    loaded.wait()
+    results.put(read_private_kb() - baseline)
+    measured.wait()
+
+
+class Command(BaseCommand):
+    help = 'Бенчмарк локального векторного поиска HS кодов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retriever',
+            choices=['vector', 'lexical'],
+            default='vector',
+            help='Векторный индекс или BM25'
+        )
+        parser.add_argument(
+            '--synthetic',
+            type=int,
+            default=0,
+            help='Построить индекс в памяти по N синтетическим кодам'
+        )
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=1000,
+            help='Количество запросов'
+        )
+        parser.add_argument(
+            '--k',
+            type=int,
+            default=5,
+            help='Количество кандидатов'
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            nargs='+',
+            default=[],
+            help='Замерить память при таком числе процессов с открытым индексом'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            self.style.SUCCESS('🚀 Бенчмарк локального поиска HS кодов')
+        )
+        rng = random.Random(1)
+        k = options['k']
+
+        lexical = options['retriever'] == 'lexical'
+        expected = None
+        if options['synthetic']:
+            codes, descriptions = synthetic_nomenclature(options['synthetic'])
+            started = time.perf_counter()
+            if lexical:
+                index = LexicalIndex.build(ids=range(len(codes)), codes=codes, texts=descriptions)
+            else:
+                embedder = get_embedder().fit(descriptions)
+                index = VectorIndex(
+                    matrix=embedder.embed(descriptions),
+                    ids=np.arange(len(codes), dtype=np.int64),
+                    codes=np.array(codes, dtype='U10'),
+                    embedder=embedder,
+                )
+            self.stdout.write(
+                f'📦 Синтетический индекс: {len(index)} кодов за {time.perf_counter() - started:.2f} с'
+            )
+            picks = [rng.randrange(len(codes)) for _ in range(options['queries'])]
+            queries = [distort(descriptions[pick], rng) for pick in picks]
+            expected = [codes[pick] for pick in picks]
+        else:
+            index = get_lexical_index() if lexical else get_vector_index()
+            if index is None:
+                raise CommandError('Индекс не построен: python manage.py build_hs_index')
+            queries = [
+                f'{rng.choice(GOODS)} {rng.choice(MATERIALS)} {rng.choice(PURPOSES)}'
+                for _ in range(options['queries'])
+            ]
+
+        if lexical:
+            self.stdout.write(f'📐 {len(index)} кодов, {len(index.postings)} термов')
+        else:
+            self.stdout.write(
+                f'📐 {len(index)} × {index.matrix.shape[1]}, {index.matrix.nbytes / 1024 / 1024:.1f} MB'
+            )
+
+        # Одиночные запросы: так ищет агент (один вызов инструмента на товар)
+        index.search(queries[0], k)
+        timings = []
+        results = []
+        for query in queries:
+            started = time.perf_counter()
+            results.append(index.search(query, k))
+            timings.append((time.perf_counter() - started) * 1e6)
+        timings.sort()
+        self.stdout.write(
+            f'  одиночный поиск: медиана {statistics.median(timings):.0f} мкс, '
+            f'p95 {timings[int(len(timings) * 0.95) - 1]:.0f} мкс'
+        )
+
+        # Пакет запросов одним матричным умножением
+        if not lexical:
+            started = time.perf_counter()
+            index.search_many(queries, k)
+            elapsed = (time.perf_counter() - started) * 1e6
+            self.stdout.write(f'  пакетный поиск: {elapsed / len(queries):.0f} мкс на запрос')
+
+        if expected is not None:
+            top1 = sum(bool(hits) and hits[0]['code'] == code for hits, code in zip(results, expected))
+            topk = sum(code in {hit['code'] for hit in hits} for hits, code in zip(results, expected))
+            self.stdout.write(self.style.SUCCESS(
+                f'📊 top-1 {top1 / len(queries):.1%}, top-{k} {topk / len(queries):.1%}'
+            ))
+
+        if options['processes'] and not lexical:
+            self.measure_processes(index, queries[:100], options['processes'])
+
+    def measure_processes(self, index, queries, counts):
+        """Прирост памяти на процесс: mmap против копии в памяти процесса"""
+        root = tempfile.mkdtemp(prefix='bench_retrieval_')
+        try:
+            version = publish_index(index, root)
+            directory = os.path.join(root, current_version(root))
+            self.stdout.write(f'🧠 Приватная память процессов с открытым индексом {version}:')
+            context = multiprocessing.get_context('fork')
+            # Сборщик мусора не трогает объекты родителя, иначе copy-on-write исказит замер
+            gc.collect()
+            gc.freeze()
+            for mmap in (True, False):
+                mode = 'mmap' if mmap else 'копия'
+                for count in counts:
+                    loaded = context.Barrier(count)
+                    measured = context.Barrier(count + 1)
+                    results = context.Queue()
+                    processes = [
+                        context.Process(
+                            target=open_and_measure,
+                            args=(directory, mmap, queries, loaded, measured, results)
+                        )
+                        for _ in range(count)
+                    ]
+                    for process in processes:
+                        process.start()
+                    memory = [results.get() for _ in processes]
+                    measured.wait()
+                    for process in processes:
+                        process.join()
+
+                    # Страницы mmap, открытые одним процессом, тоже считаются приватными
+                    private = statistics.mean(memory) / 1024
+                    self.stdout.write(
+                        f'  {mode:>5} × {count:>2}: {private:6.1f} MB на процесс, '
+                        f'{sum(memory) / 1024:6.1f} MB всего'
+                    )
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
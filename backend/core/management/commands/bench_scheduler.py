@@ -0,0 +1,131 @@
+"""
+Django команда для симуляции планировщика задач обработки
+
+Дискретно-событийная модель без Celery и БД: воркеры, поток загрузок
+нескольких пользователей и время обработки, пропорциональное числу
+строк. Сравнивает одну общую очередь FIFO (как отправка всех задач в
+одну очередь Celery) с планировщиком processing.scheduler.plan
+(лимит на пользователя, круговая раздача мест, приоритеты) и выводит
+время ожидания запуска задач (p50/p95) по группам пользователей.
+"""
+
+import heapq
+import random
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from processing.scheduler import Job, get_priority, plan
+
+# Примерный размер строки CSV декларации в байтах (для приоритета по размеру файла)
+BYTES_PER_ROW = 80
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Command(BaseCommand):
+    help = 'Симулирует FIFO и справедливый планировщик задач и сравнивает время ожидания'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Процессов воркеров')
+        parser.add_argument('--per-user', type=int, default=2, help='Лимит задач на пользователя')
+        parser.add_argument('--rate', type=float, default=400, help='Строк в секунду на воркер')
+        parser.add_argument('--heavy-users', type=int, default=1, help='Пользователей с пакетом больших файлов')
+        parser.add_argument('--heavy-files', type=int, default=10, help='Больших файлов у каждого')
+        parser.add_argument('--heavy-rows', type=int, default=50000, help='Строк в большом файле')
+        parser.add_argument('--light-users', type=int, default=20, help='Пользователей с обычными файлами')
+        parser.add_argument('--light-files', type=int, default=5, help='Файлов у каждого')
+        parser.add_argument('--horizon', type=float, default=3600, help='Загрузки обычных файлов идут в течение (с)')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('🚀 Симуляция планировщика задач обработки'))
+        uploads = self.workload(options)
+        rows = sum(upload['rows'] for upload in uploads)
+        self.stdout.write(
+            f'  {len(uploads)} файлов, {rows} строк, {options["workers"]} воркеров '
+            f'по {options["rate"]:.0f} строк/с'
+        )
+
+        for policy in ('fifo', 'fair'):
+            waits, makespan = self.simulate(uploads, policy, options)
+            self.stdout.write(self.style.SUCCESS(f'📊 {policy}: все задачи завершены за {makespan / 60:.1f} мин'))
+            for group in ('heavy', 'light'):
+                values = waits[group]
+                self.stdout.write(
+                    f'  {group:5}  ожидание p50 {percentile(values, 0.5):8.1f} с, '
+                    f'p95 {percentile(values, 0.95):8.1f} с, макс {max(values, default=0):8.1f} с'
+                )
+
+    def workload(self, options):
+        """Загрузки: тяжелые пользователи — пачкой в начале, обычные — случайно"""
+        rng = random.Random(options['seed'])
+        uploads = []
+        for user in range(options['heavy_users']):
+            for _ in range(options['heavy_files']):
+                uploads.append({
+                    'user': f'heavy-{user}', 'group': 'heavy',
+                    'time': rng.uniform(0, 5), 'rows': options['heavy_rows'],
+                })
+        for user in range(options['light_users']):
+            for _ in range(options['light_files']):
+                uploads.append({
+                    'user': f'light-{user}', 'group': 'light',
+                    'time': rng.uniform(0, options['horizon']),
+                    'rows': int(rng.lognormvariate(7, 1)) + 50,
+                })
+        uploads.sort(key=lambda upload: upload['time'])
+        for number, upload in enumerate(uploads):
+            upload['id'] = number
+            upload['priority'] = get_priority(upload['rows'] * BYTES_PER_ROW)
+        return uploads
+
+    def simulate(self, uploads, policy, options):
+        """
+        Returns:
+            ({группа: [ожидание запуска, с]}, время завершения последней задачи)
+        """
+        workers = options['workers']
+        per_user = options['per_user'] if policy == 'fair' else 0
+
+        # События: (время, порядок, вид, загрузка)
+        events = [(upload['time'], upload['id'], 'submit', upload) for upload in uploads]
+        heapq.heapify(events)
+        sequence = len(uploads)
+        pending = []
+        active = Counter()
+        last_dispatched = {}
+        waits = {'heavy': [], 'light': []}
+        now = 0.0
+
+        while events:
+            now, _, kind, upload = heapq.heappop(events)
+            if kind == 'submit':
+                pending.append(upload)
+            else:
+                active[upload['user']] -= 1
+
+            free = workers - sum(active.values())
+            if free <= 0 or not pending:
+                continue
+            if policy == 'fifo':
+                started = pending[:free]
+            else:
+                jobs = [Job(upload['id'], upload['user'], upload['priority'], upload['time']) for upload in pending]
+                chosen = {job.id for job in plan(jobs, active, free, per_user, last_dispatched)}
+                started = [upload for upload in pending if upload['id'] in chosen]
+
+            for upload in started:
+                pending.remove(upload)
+                active[upload['user']] += 1
+                last_dispatched[upload['user']] = now
+                waits[upload['group']].append(now - upload['time'])
+                sequence += 1
+                heapq.heappush(events, (now + upload['rows'] / options['rate'], sequence, 'done', upload))
+
+        return waits, now
@@ -0,0 +1,85 @@
+"""
+Django команда для замера пропускной способности шардированной обработки
+
+Запускает process_file_task через брокер и ждет завершения, поэтому
+требует запущенных Celery воркеров. Для проверки масштабирования
+запустите команду при разном числе воркеров, например:
+
+    celery -A config worker -c 1
+    celery -A config worker -c 4
+
+Воркер без -Q читает все очереди CELERY_TASK_QUEUES (processing.high,
+processing, processing.bulk, celery); список -Q, если он задан, должен
+их включать, иначе задачи останутся в очереди.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import ProcessingTask
+from processing.tasks import process_file_task
+
+
+class Command(BaseCommand):
+    help = 'Бенчмарк шардированной обработки файла на запущенных воркерах'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=20000,
+            help='Количество строк в файле'
+        )
+        parser.add_argument(
+            '--timeout',
+            type=int,
+            default=1800,
+            help='Максимальное время ожидания (секунды)'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            self.style.SUCCESS('🚀 Бенчмарк шардированной обработки')
+        )
+
+        workdir = tempfile.mkdtemp(prefix='bench_sharding_')
+        user, _ = User.objects.get_or_create(username='benchmark')
+        try:
+            path = os.path.join(workdir, 'bench.csv')
+            with open(path, 'w', encoding='utf-8') as output:
+                output.write('description,quantity,unit\n')
+                for i in range(options['rows']):
+                    output.write(f'"Товар номер {i}",{i % 100 + 1},шт\n')
+
+            task = ProcessingTask.objects.create(
+                user=user, file_name='bench.csv', file_path=path
+            )
+            started = time.perf_counter()
+            process_file_task.delay(task.id)
+
+            last_reported = -1
+            while True:
+                task.refresh_from_db(fields=['status', 'processed_items', 'total_items'])
+                if task.processed_items != last_reported:
+                    self.stdout.write(f'  ⏳ {task.processed_items}/{task.total_items}')
+                    last_reported = task.processed_items
+                if task.status in ['completed', 'failed']:
+                    break
+                if time.perf_counter() - started > options['timeout']:
+                    raise CommandError('Превышено время ожидания')
+                time.sleep(0.5)
+
+            elapsed = time.perf_counter() - started
+            style = self.style.SUCCESS if task.status == 'completed' else self.style.ERROR
+            self.stdout.write(style(
+                f'📊 {task.status}: {task.processed_items} позиций за {elapsed:.1f} с '
+                f'({task.processed_items / elapsed:.0f} позиций/с)'
+            ))
+            task.delete()
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
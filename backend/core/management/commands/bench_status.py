@@ -0,0 +1,79 @@
+"""
+Django команда для замера /api/tasks/{id}/status/ под опросом
+
+Сравнивает пропускную способность (запросов в секунду) и число SQL
+запросов на один опрос: статус из БД на каждый запрос (кэш статуса
+отключен), снимок из кэша (processing.status) и условный запрос с
+If-None-Match, на который при неизменном прогрессе отдается 304.
+Аутентификация (force_authenticate) и панель отладки в замере не участвуют.
+"""
+
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import modify_settings, override_settings
+from rest_framework.test import APIClient
+
+from core.models import ProcessingTask
+from processing.status import discard_status, publish_status
+
+from .bench_persistence import QueryCounter
+
+
+class Command(BaseCommand):
+    help = 'Бенчмарк опроса статуса задачи: БД, кэш и 304'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Запросов в каждом режиме')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('🚀 Бенчмарк опроса статуса задачи'))
+        alias = getattr(settings, 'PROCESSING_STATUS_ALIAS', '')
+        if not alias:
+            self.stdout.write(self.style.WARNING('PROCESSING_STATUS_ALIAS пуст: режимы с кэшем совпадут с БД'))
+
+        user, _ = User.objects.get_or_create(username='bench_status')
+        task = ProcessingTask.objects.create(
+            user=user, file_name='bench_status.csv', status='processing',
+            total_items=100000, processed_items=42000,
+        )
+        # Клиент теста ходит на testserver
+        hosts = list(settings.ALLOWED_HOSTS) + ['testserver']
+        toolbar = {'remove': ['debug_toolbar.middleware.DebugToolbarMiddleware']}
+        url = f'/api/tasks/{task.id}/status/'
+
+        try:
+            with override_settings(ALLOWED_HOSTS=hosts), modify_settings(MIDDLEWARE=toolbar):
+                client = APIClient()
+                client.force_authenticate(user)
+                with override_settings(PROCESSING_STATUS_ALIAS=''):
+                    self.report('БД на каждый опрос', client, url, options['requests'])
+
+                publish_status(task.id)
+                self.report('снимок из кэша', client, url, options['requests'])
+
+                etag = client.get(url)['ETag']
+                self.report('If-None-Match → 304', client, url, options['requests'],
+                            HTTP_IF_NONE_MATCH=etag, expected=304)
+        finally:
+            # После delete() у задачи нет id — снимок удаляем по сохраненному
+            task_id = task.id
+            task.delete()
+            discard_status([task_id])
+
+    def report(self, label, client, url, requests, expected=200, **headers):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            for _ in range(requests):
+                response = client.get(url, **headers)
+                if response.status_code != expected:
+                    raise RuntimeError(f'{label}: ответ {response.status_code}, ожидался {expected}')
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'  {label:22} {requests / elapsed:8.0f} запросов/с, '
+            f'{counter.count / requests:.1f} SQL на запрос'
+        )
@@ -0,0 +1,59 @@
+"""
+Django команда для перестроения локального векторного индекса HS кодов
+
+Новая версия публикуется рядом с текущей и становится активной атомарной
+заменой указателя CURRENT; работающие воркеры переключаются на нее сами.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from processing.retrieval import VectorIndex, get_embedder, publish_index
+from processing.retrieval.index import get_index_dir
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает локальный векторный индекс HS кодов по таблице HSCode'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--embedder',
+            type=str,
+            default=None,
+            help='Эмбеддер (по умолчанию PROCESSING_EMBEDDER)'
+        )
+        parser.add_argument(
+            '--dir',
+            type=str,
+            default=None,
+            help='Каталог индекса (по умолчанию PROCESSING_INDEX_DIR)'
+        )
+        parser.add_argument(
+            '--keep',
+            type=int,
+            default=2,
+            help='Сколько последних версий хранить'
+        )
+
+    def handle(self, *args, **options):
+        root = options['dir'] or get_index_dir()
+        if not root:
+            raise CommandError('Не задан PROCESSING_INDEX_DIR')
+
+        self.stdout.write(
+            self.style.SUCCESS('🚀 Построение векторного индекса HS кодов')
+        )
+
+        started = time.perf_counter()
+        embedder = get_embedder(options['embedder'])
+        index = VectorIndex.build(embedder)
+        if not len(index):
+            raise CommandError('Нет активных HS кодов для индексации')
+        version = publish_index(index, root, keep=options['keep'])
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {len(index)} кодов, эмбеддер {embedder.name} (dim={embedder.dim}), '
+            f'{index.matrix.nbytes / 1024 / 1024:.1f} MB, {elapsed:.2f} с → {root}/{version}'
+        ))
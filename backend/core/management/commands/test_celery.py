@@ -3,7 +3,8 @@ Django команда для тестирования Celery задач
 """
 
 from django.core.management.base import BaseCommand
-from processing.tasks import debug_task, mock_classify_product
+from processing.tasks import debug_task
+from processing.classifiers import get_classifier
 from core.models import HSCode, ProcessingTask, ProductItem
 from django.contrib.auth.models import User
 
@@ -126,11 +127,12 @@ class Command(BaseCommand):
                 'Ноутбук HP Pavilion 15'
             ]
             
-            for desc in test_descriptions:
-                result = mock_classify_product(desc)
+            classifier = get_classifier()
+            results = classifier.classify_batch(test_descriptions)
+            for desc, result in zip(test_descriptions, results):
                 self.stdout.write(
-                    f'  🤖 "{desc[:30]}..." → {result["hs_code"].code} '
-                    f'(уверенность: {result["confidence"]:.2f})'
+                    f'  🤖 "{desc[:30]}..." → {result["code"]} '
+                    f'(уверенность: {result["confidence"]:.2f}, бэкенд: {classifier.name})'
                 )
             
             # Пытаемся выполнить задачу через Celery (если доступен)
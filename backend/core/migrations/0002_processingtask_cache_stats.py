@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processingtask',
+            name='cache_hits',
+            field=models.PositiveIntegerField(default=0, verbose_name='Найдено в кэше'),
+        ),
+        migrations.AddField(
+            model_name='processingtask',
+            name='cache_misses',
+            field=models.PositiveIntegerField(default=0, verbose_name='Не найдено в кэше'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_processingtask_cache_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processingtask',
+            name='duplicate_items',
+            field=models.PositiveIntegerField(default=0, verbose_name='Повторяющихся позиций'),
+        ),
+    ]
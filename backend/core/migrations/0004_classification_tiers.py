@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_processingtask_duplicate_items'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processingtask',
+            name='tier_agent_items',
+            field=models.PositiveIntegerField(default=0, verbose_name='Позиций агента'),
+        ),
+        migrations.AddField(
+            model_name='processingtask',
+            name='tier_local_items',
+            field=models.PositiveIntegerField(default=0, verbose_name='Позиций локального поиска'),
+        ),
+        migrations.AddField(
+            model_name='processingtask',
+            name='tier_memory_items',
+            field=models.PositiveIntegerField(default=0, verbose_name='Позиций из памяти'),
+        ),
+        migrations.AddField(
+            model_name='productitem',
+            name='classification_tier',
+            field=models.CharField(blank=True, choices=[('memory', 'Память'), ('local', 'Локальный поиск'), ('agent', 'Агент')], max_length=20, verbose_name='Уровень классификации'),
+        ),
+    ]
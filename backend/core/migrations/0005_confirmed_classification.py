@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_classification_tiers'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConfirmedClassification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+                ('description_key', models.CharField(max_length=32, verbose_name='Ключ описания')),
+                ('description', models.TextField(verbose_name='Нормализованное описание')),
+                ('hs_code', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.hscode', verbose_name='HS код')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Подтвержденная классификация',
+                'verbose_name_plural': 'Подтвержденные классификации',
+                'unique_together': {('user', 'description_key')},
+            },
+        ),
+    ]
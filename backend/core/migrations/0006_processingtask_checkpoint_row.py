@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_confirmed_classification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processingtask',
+            name='checkpoint_row',
+            field=models.PositiveIntegerField(default=0, verbose_name='Контрольная точка'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_processingtask_checkpoint_row'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processingtask',
+            name='cancel_requested_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Отмена запрошена'),
+        ),
+        migrations.AddField(
+            model_name='processingtask',
+            name='cancelled_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Отменено'),
+        ),
+        migrations.AlterField(
+            model_name='processingtask',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Ожидание'), ('processing', 'Обработка'), ('completed', 'Завершено'), ('failed', 'Ошибка'), ('cancelled', 'Отменено')], default='pending', max_length=20, verbose_name='Статус'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_processingtask_cancellation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processingtask',
+            name='dispatched_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Передано воркерам'),
+        ),
+        migrations.AddField(
+            model_name='processingtask',
+            name='priority',
+            field=models.PositiveSmallIntegerField(default=1, verbose_name='Приоритет'),
+        ),
+        migrations.AddIndex(
+            model_name='processingtask',
+            index=models.Index(fields=['status', 'dispatched_at'], name='task_schedule_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_processingtask_scheduling'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productitem',
+            index=models.Index(fields=['task', 'updated_at', 'id'], name='item_since_idx'),
+        ),
+    ]
@@ -41,6 +41,7 @@ class ProcessingTask(TimestampedModel):
         ('processing', _('Обработка')),
         ('completed', _('Завершено')),
         ('failed', _('Ошибка')),
+        ('cancelled', _('Отменено')),
     ]
     
     user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name=_("Пользователь"))
@@ -51,11 +52,27 @@ class ProcessingTask(TimestampedModel):
     processed_items = models.PositiveIntegerField(_("Обработано позиций"), default=0)
     celery_task_id = models.CharField(_("ID задачи Celery"), max_length=255, null=True, blank=True)
     error_message = models.TextField(_("Сообщение об ошибке"), blank=True)
+    duplicate_items = models.PositiveIntegerField(_("Повторяющихся позиций"), default=0)
+    cache_hits = models.PositiveIntegerField(_("Найдено в кэше"), default=0)
+    cache_misses = models.PositiveIntegerField(_("Не найдено в кэше"), default=0)
+    tier_memory_items = models.PositiveIntegerField(_("Позиций из памяти"), default=0)
+    tier_local_items = models.PositiveIntegerField(_("Позиций локального поиска"), default=0)
+    tier_agent_items = models.PositiveIntegerField(_("Позиций агента"), default=0)
+    # Последняя строка, результаты до которой сохранены (с нее продолжается повторный запуск)
+    checkpoint_row = models.PositiveIntegerField(_("Контрольная точка"), default=0)
+    cancel_requested_at = models.DateTimeField(_("Отмена запрошена"), null=True, blank=True)
+    cancelled_at = models.DateTimeField(_("Отменено"), null=True, blank=True)
+    # Планировщик (processing.scheduler): 0 — высокий, 1 — обычный, 2 — массовая обработка
+    priority = models.PositiveSmallIntegerField(_("Приоритет"), default=1)
+    dispatched_at = models.DateTimeField(_("Передано воркерам"), null=True, blank=True)
     
     class Meta:
         verbose_name = _("Задача обработки")
         verbose_name_plural = _("Задачи обработки")
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'dispatched_at'], name='task_schedule_idx'),
+        ]
     
     def __str__(self):
         return f"{self.file_name} - {self.get_status_display()}"
@@ -66,6 +83,37 @@ class ProcessingTask(TimestampedModel):
         if self.total_items == 0:
             return 0
         return round((self.processed_items / self.total_items) * 100, 2)
+    
+    @property
+    def dedup_ratio(self):
+        """Доля позиций, получивших результат повторяющегося описания из того же файла"""
+        if self.processed_items == 0:
+            return 0
+        return round(self.duplicate_items / self.processed_items, 3)
+    
+    @property
+    def cache_hit_ratio(self):
+        """Доля уникальных описаний, классифицированных из кэша"""
+        lookups = self.cache_hits + self.cache_misses
+        if lookups == 0:
+            return 0
+        return round(self.cache_hits / lookups, 3)
+    
+    @property
+    def cancel_latency(self):
+        """Секунды от запроса отмены до остановки обработки"""
+        if self.cancel_requested_at is None or self.cancelled_at is None:
+            return None
+        return round((self.cancelled_at - self.cancel_requested_at).total_seconds(), 3)
+    
+    @property
+    def tier_counts(self):
+        """Количество позиций по уровням классификации"""
+        return {
+            'memory': self.tier_memory_items,
+            'local': self.tier_local_items,
+            'agent': self.tier_agent_items,
+        }
 
 
 class ProductItem(TimestampedModel):
@@ -79,6 +127,13 @@ class ProductItem(TimestampedModel):
         ('rejected', _('Отклонено')),
     ]
     
+    # Уровень, давший результат: память (кэш), локальный поиск без сети, агент (LLM)
+    TIER_CHOICES = [
+        ('memory', _('Память')),
+        ('local', _('Локальный поиск')),
+        ('agent', _('Агент')),
+    ]
+    
     task = models.ForeignKey(ProcessingTask, on_delete=models.CASCADE, 
                            related_name='items', verbose_name=_("Задача"))
     row_number = models.PositiveIntegerField(_("Номер строки"))
@@ -93,6 +148,8 @@ class ProductItem(TimestampedModel):
     confidence_score = models.FloatField(_("Уровень доверия"), default=0.0)
     alternatives = models.JSONField(_("Альтернативные коды"), default=list)
     ai_reasoning = models.TextField(_("Обоснование AI"), blank=True)
+    classification_tier = models.CharField(_("Уровень классификации"), max_length=20,
+                                           choices=TIER_CHOICES, blank=True)
     
     # Пользовательская проверка
     status = models.CharField(_("Статус"), max_length=20, 
@@ -108,6 +165,10 @@ class ProductItem(TimestampedModel):
         verbose_name_plural = _("Позиции товаров")
         ordering = ['task', 'row_number']
         unique_together = ['task', 'row_number']
+        indexes = [
+            # Опрос изменений позиций задачи (api.pagination, since)
+            models.Index(fields=['task', 'updated_at', 'id'], name='item_since_idx'),
+        ]
     
     def __str__(self):
         return f"Строка {self.row_number}: {self.original_description[:30]}"
@@ -116,3 +177,19 @@ class ProductItem(TimestampedModel):
     def display_hs_code(self):
         """Отображаемый HS код (финальный или предложенный)"""
         return self.final_hs_code or self.suggested_hs_code
+
+
+class ConfirmedClassification(TimestampedModel):
+    """Подтвержденный пользователем HS код для описания товара (память решений)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name=_("Пользователь"))
+    description_key = models.CharField(_("Ключ описания"), max_length=32)
+    description = models.TextField(_("Нормализованное описание"))
+    hs_code = models.ForeignKey(HSCode, on_delete=models.CASCADE, verbose_name=_("HS код"))
+    
+    class Meta:
+        verbose_name = _("Подтвержденная классификация")
+        verbose_name_plural = _("Подтвержденные классификации")
+        unique_together = ['user', 'description_key']
+    
+    def __str__(self):
+        return f"{self.description[:30]} -> {self.hs_code_id}"
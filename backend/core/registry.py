@@ -0,0 +1,192 @@
+"""
+Справочник HS кодов в памяти процесса
+
+Номенклатура (~13 тыс. кодов) загружается одним запросом на процесс, и
+код/id разрешаются без обращения к БД. Процессы согласуются через метку
+версии в общем кэше HS_CODE_REGISTRY_ALIAS: любое изменение HSCode
+(сигналы core.signals, создание кодов конвейером) записывает новую
+метку, и каждый процесс перезагружает справочник, заметив ее. Метка
+проверяется не чаще раза в HS_CODE_REGISTRY_CHECK_INTERVAL секунд.
+
+Справочник читают потоки сервера (runserver, пул потоков ASGI), поэтому
+отображения не меняются на месте: новые строятся отдельно и заменяют
+старые одним присваиванием, а перезагрузку выполняет один поток —
+остальные тем временем читают прежние, полные отображения.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import HSCode
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'hs_codes:version'
+
+
+class HSCodeEntry(NamedTuple):
+    """Неизменяемая запись справочника"""
+
+    id: int
+    code: str
+    description: str
+    category: str
+    subcategory: str
+    is_active: bool
+
+
+ENTRY_FIELDS = HSCodeEntry._fields
+
+
+class HSCodeRegistry:
+    """Отображения код -> запись и id -> запись"""
+
+    def __init__(self, alias=None, check_interval=None):
+        """
+        Args:
+            alias: алиас кэша Django с меткой версии ('' — только в процессе)
+            check_interval: как часто сверять метку версии (секунды)
+        """
+        self.alias = alias if alias is not None else getattr(settings, 'HS_CODE_REGISTRY_ALIAS', '')
+        self.check_interval = check_interval if check_interval is not None else getattr(
+            settings, 'HS_CODE_REGISTRY_CHECK_INTERVAL', 1.0
+        )
+        self.loads = 0
+        self._by_code = {}
+        self._by_id = {}
+        self._version = None
+        self._loaded = False
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, code):
+        """Запись по коду или None"""
+        self.ensure_fresh()
+        return self._by_code.get(code)
+
+    def get_by_id(self, hs_code_id):
+        """Запись по id или None"""
+        self.ensure_fresh()
+        return self._by_id.get(hs_code_id)
+
+    def entries(self):
+        """Все записи справочника"""
+        self.ensure_fresh()
+        return list(self._by_id.values())
+
+    def resolve(self, descriptions, **defaults):
+        """
+        id HS кодов, недостающие коды создаются одним bulk_create
+
+        Args:
+            descriptions: словарь код -> описание (для новых кодов)
+            **defaults: остальные поля новых HSCode (category, subcategory)
+
+        Returns:
+            Словарь код -> id
+        """
+        self.ensure_fresh()
+        missing = [code for code in descriptions if code not in self._by_code]
+        if missing:
+            HSCode.objects.bulk_create(
+                [
+                    HSCode(code=code, description=descriptions[code] or code, **defaults)
+                    for code in missing
+                ],
+                ignore_conflicts=True,
+            )
+            # bulk_create не вызывает сигналы: дополняем справочник и сообщаем остальным
+            created = [
+                HSCodeEntry(*row)
+                for row in HSCode.objects.filter(code__in=missing).values_list(*ENTRY_FIELDS)
+            ]
+            with self._lock:
+                by_code, by_id = dict(self._by_code), dict(self._by_id)
+                for entry in created:
+                    by_code[entry.code] = entry
+                    by_id[entry.id] = entry
+                self._by_code, self._by_id = by_code, by_id
+                self._version = self._publish_version()
+
+        by_code = self._by_code
+        return {code: by_code[code].id for code in descriptions if code in by_code}
+
+    def ensure_fresh(self):
+        """Перезагружает справочник, если метка версии изменилась"""
+        if self._loaded and time.monotonic() - self._checked_at < self.check_interval:
+            return
+        # Справочник уже есть — не ждем потока, который его обновляет
+        if not self._lock.acquire(blocking=self.loads == 0):
+            return
+        try:
+            now = time.monotonic()
+            if self._loaded and now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+
+            # Метка читается до загрузки: изменение во время загрузки вызовет повторную
+            version = self._shared_version()
+            if not self._loaded or version != self._version:
+                self._load()
+                self._version = version
+        finally:
+            self._lock.release()
+
+    def load(self):
+        """Загружает все HS коды одним запросом"""
+        with self._lock:
+            self._load()
+
+    def _load(self):
+        by_code, by_id = {}, {}
+        for row in HSCode.objects.values_list(*ENTRY_FIELDS):
+            entry = HSCodeEntry(*row)
+            by_code[entry.code] = entry
+            by_id[entry.id] = entry
+        self._by_code, self._by_id = by_code, by_id
+        self._loaded = True
+        self.loads += 1
+
+    def invalidate(self):
+        """HSCode изменились: перезагрузить здесь и во всех процессах"""
+        self._loaded = False
+        self._publish_version()
+
+    def _shared_version(self):
+        if not self.alias:
+            return self._version
+        try:
+            version = caches[self.alias].get(VERSION_KEY)
+        except Exception as exc:
+            # Без общего кэша работаем с тем, что уже загружено
+            logger.warning(f"Метка версии HS кодов недоступна: {exc}")
+            return self._version
+        if version is None:
+            version = self._publish_version()
+        return version
+
+    def _publish_version(self):
+        version = uuid.uuid4().hex
+        if self.alias:
+            try:
+                caches[self.alias].set(VERSION_KEY, version, timeout=None)
+            except Exception as exc:
+                logger.warning(f"Метка версии HS кодов недоступна: {exc}")
+        return version
+
+
+_registry = None
+
+
+def get_hs_code_registry():
+    """Справочник HS кодов текущего процесса"""
+    global _registry
+    if _registry is None:
+        _registry = HSCodeRegistry()
+    return _registry
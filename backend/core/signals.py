@@ -0,0 +1,15 @@
+"""
+Сигналы моделей core
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import HSCode
+from .registry import get_hs_code_registry
+
+
+@receiver([post_save, post_delete], sender=HSCode)
+def invalidate_hs_code_registry(sender, **kwargs):
+    """Изменение HS кода сбрасывает справочник во всех процессах"""
+    get_hs_code_registry().invalidate()
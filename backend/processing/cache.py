@@ -0,0 +1,164 @@
+"""
+Двухуровневый кэш результатов классификации
+
+В декларациях одни и те же товары повторяются постоянно, поэтому перед
+вызовом бэкенда результат ищется по нормализованному описанию:
+
+1. LRU в памяти процесса (PROCESSING_CACHE_LRU_SIZE записей);
+2. кэш Django PROCESSING_CACHE_ALIAS (Redis или БД), общий для всех
+   воркеров.
+
+Ключ включает имя и версию бэкенда, поэтому смена модели или правил не
+отдает старые результаты. Записи живут PROCESSING_CACHE_TTL секунд на
+обоих уровнях. Кэшируются только результаты с определенным кодом.
+"""
+
+import hashlib
+import logging
+import re
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+# Количество с единицей измерения: "10 кг", "2,5л", "100 шт."
+QUANTITY_PATTERN = re.compile(
+    r'\b\d+(?:[.,]\d+)?\s*'
+    r'(?:кг|гр|г|мг|т|л|мл|м2|м3|м|см|мм|шт|уп|пар|компл|kg|g|mg|l|ml|m|cm|mm|pcs|pc)\b\.?',
+    re.IGNORECASE,
+)
+# Единицы измерения без количества: "шт.", "уп"
+UNIT_PATTERN = re.compile(r'\b(?:шт|уп|ед|компл|pcs|pc)\b\.?', re.IGNORECASE)
+PUNCTUATION_PATTERN = re.compile(r'[^\w\s]+')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def normalize_description(description):
+    """
+    Нормализованное описание товара для ключа кэша
+
+    Регистр, ё/е, пунктуация, лишние пробелы и количество с единицами
+    измерения не влияют на код ТН ВЭД и отбрасываются.
+    """
+    text = str(description or '').lower().replace('ё', 'е')
+    text = QUANTITY_PATTERN.sub(' ', text)
+    text = UNIT_PATTERN.sub(' ', text)
+    text = PUNCTUATION_PATTERN.sub(' ', text).replace('_', ' ')
+    return WHITESPACE_PATTERN.sub(' ', text).strip()
+
+
+class ClassificationCache:
+    """Кэш результатов одного бэкенда классификации"""
+
+    def __init__(self, classifier, maxsize=None, ttl=None, alias=None):
+        """
+        Args:
+            classifier: бэкенд (его name и version входят в ключ)
+            maxsize: размер LRU в памяти процесса (0 — без LRU)
+            ttl: время жизни записи (секунды)
+            alias: алиас кэша Django для второго уровня ('' — без него)
+        """
+        self.prefix = f'hs:{classifier.name}:{classifier.version}'
+        self.maxsize = maxsize if maxsize is not None else getattr(
+            settings, 'PROCESSING_CACHE_LRU_SIZE', 10000
+        )
+        self.ttl = ttl if ttl is not None else getattr(settings, 'PROCESSING_CACHE_TTL', 30 * 24 * 3600)
+        self.alias = alias if alias is not None else getattr(settings, 'PROCESSING_CACHE_ALIAS', '')
+        self._lru = OrderedDict()
+
+    def key(self, description):
+        """Ключ кэша для описания товара"""
+        normalized = normalize_description(description)
+        return f'{self.prefix}:{hashlib.md5(normalized.encode("utf-8")).hexdigest()}'
+
+    def get_many(self, descriptions):
+        """
+        Результаты из кэша
+
+        Returns:
+            Список той же длины, что descriptions: результат или None
+        """
+        keys = [self.key(description) for description in descriptions]
+        found = {}
+        missing = []
+        for key in set(keys):
+            result = self._lru_get(key)
+            if result is None:
+                missing.append(key)
+            else:
+                found[key] = result
+
+        if missing and self.alias:
+            try:
+                shared = caches[self.alias].get_many(missing)
+            except Exception as exc:
+                # Недоступный общий кэш не должен останавливать обработку
+                logger.warning(f"Кэш классификации {self.alias} недоступен: {exc}")
+                shared = {}
+            for key, result in shared.items():
+                self._lru_set(key, result)
+                found[key] = result
+
+        return [found.get(key) for key in keys]
+
+    def set_many(self, descriptions, results):
+        """Сохраняет результаты с определенным кодом на оба уровня"""
+        entries = {
+            self.key(description): result
+            for description, result in zip(descriptions, results)
+            if result.get('code')
+        }
+        if not entries:
+            return
+
+        for key, result in entries.items():
+            self._lru_set(key, result)
+        if self.alias:
+            try:
+                caches[self.alias].set_many(entries, timeout=self.ttl)
+            except Exception as exc:
+                logger.warning(f"Кэш классификации {self.alias} недоступен: {exc}")
+
+    def clear_local(self):
+        """Очищает LRU текущего процесса"""
+        self._lru.clear()
+
+    def _lru_get(self, key):
+        entry = self._lru.get(key)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if expires_at < time.monotonic():
+            del self._lru[key]
+            return None
+        self._lru.move_to_end(key)
+        return result
+
+    def _lru_set(self, key, result):
+        if self.maxsize <= 0:
+            return
+        self._lru[key] = (time.monotonic() + self.ttl, result)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.maxsize:
+            self._lru.popitem(last=False)
+
+
+_caches = {}
+
+
+def get_classification_cache(classifier):
+    """Кэш бэкенда (один на процесс) или None, если кэш отключен"""
+    if not getattr(settings, 'PROCESSING_CACHE_ENABLED', True):
+        return None
+    key = (classifier.name, classifier.version)
+    if key not in _caches:
+        _caches[key] = ClassificationCache(classifier)
+    return _caches[key]
+
+
+def reset_classification_caches():
+    """Сбрасывает кэши процесса (после изменения настроек)"""
+    _caches.clear()
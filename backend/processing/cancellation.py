@@ -0,0 +1,199 @@
+"""
+Кооперативная отмена задач обработки
+
+API не убивает процесс воркера (revoke(terminate=True) обрывает
+транзакцию на середине), а выставляет флаг отмены: ключ в общем кэше
+PROCESSING_CANCEL_ALIAS и ProcessingTask.cancel_requested_at в БД.
+Конвейер проверяет флаг между пакетами (по БД) и, пока идут асинхронные
+вызовы бэкенда, раз в PROCESSING_CANCEL_CHECK_INTERVAL секунд (по кэшу,
+без запросов к БД). Заметив отмену,
+он прерывает текущий пакет (его результаты не записываются), сохраняет
+прогресс уже записанных пакетов и переводит задачу в 'cancelled'.
+
+Задержка отмены ограничена одним пакетом для синхронных бэкендов и
+интервалом проверки для асинхронных; фактическая задержка сохраняется
+в задаче (cancel_latency).
+
+Той же проверкой между пакетами запуск узнает, что задача ему больше не
+принадлежит: планировщик вернул ее в ожидание и запустил заново с
+другим celery_task_id (processing.scheduler.reclaim_stale). Такой
+запуск прекращается (TaskSuperseded), не меняя задачу.
+"""
+
+import asyncio
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from core.models import ProcessingTask
+
+from .status import publish_status
+
+logger = logging.getLogger(__name__)
+
+CANCEL_KEY = 'tasks:cancel:{task_id}'
+# Флаг нужен, пока задача может выполняться
+CANCEL_TTL = 24 * 3600
+
+_current = contextvars.ContextVar('cancellation_token', default=None)
+
+
+class TaskCancelled(Exception):
+    """Задача отменена пользователем"""
+
+
+class TaskSuperseded(Exception):
+    """Задачу выполняет другой, более новый запуск"""
+
+
+def get_alias():
+    return getattr(settings, 'PROCESSING_CANCEL_ALIAS', '')
+
+
+def get_check_interval():
+    return getattr(settings, 'PROCESSING_CANCEL_CHECK_INTERVAL', 1.0)
+
+
+def request_cancel(task):
+    """
+    Запрашивает отмену задачи
+
+    Задача, которая еще не начала выполняться, отменяется сразу;
+    выполняющаяся остановится сама, заметив флаг.
+
+    Returns:
+        True, если задача уже отменена, False — если отмена ожидает воркер
+    """
+    now = timezone.now()
+    alias = get_alias()
+    if alias:
+        try:
+            caches[alias].set(CANCEL_KEY.format(task_id=task.pk), now.timestamp(), timeout=CANCEL_TTL)
+        except Exception as exc:
+            # Воркер увидит отмену по БД при проверке между пакетами
+            logger.warning(f"Флаг отмены задачи {task.pk} не записан в кэш: {exc}")
+
+    ProcessingTask.objects.filter(pk=task.pk, cancel_requested_at__isnull=True).update(
+        cancel_requested_at=now
+    )
+    cancelled = ProcessingTask.objects.filter(pk=task.pk, status='pending').update(
+        status='cancelled', cancelled_at=now, updated_at=now
+    )
+    publish_status(task.pk)
+    return bool(cancelled)
+
+
+def mark_cancelled(task_id):
+    """
+    Переводит задачу в 'cancelled' и записывает задержку отмены
+
+    Returns:
+        Задержка от запроса отмены до остановки (секунды) или None
+    """
+    now = timezone.now()
+    updated = ProcessingTask.objects.filter(
+        pk=task_id, status__in=['pending', 'processing']
+    ).update(status='cancelled', cancelled_at=now, updated_at=now)
+
+    task = ProcessingTask.objects.only('cancel_requested_at', 'cancelled_at').get(pk=task_id)
+    latency = task.cancel_latency
+    publish_status(task_id)
+    if updated:
+        logger.info(f"Задача {task_id} отменена, задержка отмены: {latency:.2f} с" if latency is not None
+                    else f"Задача {task_id} отменена")
+    return latency
+
+
+class CancellationToken:
+    """Флаг отмены одной задачи с ограничением частоты проверок"""
+
+    def __init__(self, task_id, check_interval=None, owner=None):
+        """
+        Args:
+            owner: celery_task_id запуска, которому принадлежит задача
+                (None — не проверять)
+        """
+        self.task_id = task_id
+        self.owner = owner
+        self.check_interval = check_interval if check_interval is not None else get_check_interval()
+        self.cancelled = False
+        self._checked_at = None
+
+    def is_cancelled(self):
+        """Проверяет флаг (не чаще раза в check_interval секунд)"""
+        if self.cancelled:
+            return True
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return False
+        self._checked_at = now
+        self.cancelled = self._read_flag()
+        return self.cancelled
+
+    def raise_if_cancelled(self):
+        """
+        Проверка между пакетами: по БД (флаг там есть всегда), без ограничения частоты
+
+        Raises:
+            TaskCancelled: задачу отменили
+            TaskSuperseded: задача принадлежит другому запуску
+        """
+        if not self.cancelled:
+            cancel_requested_at, celery_task_id = self._read_state()
+            self.cancelled = cancel_requested_at is not None
+            self._check_owner(celery_task_id)
+        if self.cancelled:
+            raise TaskCancelled(f'Задача {self.task_id} отменена')
+
+    def raise_if_superseded(self):
+        """Проверка владельца после пакета, до записи его прогресса"""
+        self._check_owner(self._read_state()[1])
+
+    def _check_owner(self, celery_task_id):
+        if self.owner is not None and celery_task_id != self.owner:
+            raise TaskSuperseded(f'Задача {self.task_id} запущена заново ({celery_task_id})')
+
+    async def wait(self):
+        """Завершается, когда задачу отменят (для прерывания асинхронных вызовов)"""
+        while not await sync_to_async(self.is_cancelled)():
+            await asyncio.sleep(self.check_interval)
+
+    def _read_flag(self):
+        alias = get_alias()
+        if alias:
+            try:
+                return caches[alias].get(CANCEL_KEY.format(task_id=self.task_id)) is not None
+            except Exception as exc:
+                logger.warning(f"Флаг отмены задачи {self.task_id} недоступен в кэше: {exc}")
+        return self._read_db()
+
+    def _read_db(self):
+        return ProcessingTask.objects.filter(pk=self.task_id, cancel_requested_at__isnull=False).exists()
+
+    def _read_state(self):
+        """(cancel_requested_at, celery_task_id) задачи; удаленная считается отмененной"""
+        state = ProcessingTask.objects.filter(pk=self.task_id).values_list(
+            'cancel_requested_at', 'celery_task_id'
+        ).first()
+        return state or (timezone.now(), self.owner)
+
+
+@contextmanager
+def cancellation_scope(token):
+    """Делает token текущим для вызовов бэкенда внутри блока"""
+    reset = _current.set(token)
+    try:
+        yield token
+    finally:
+        _current.reset(reset)
+
+
+def current_token():
+    """Токен отмены текущей задачи или None"""
+    return _current.get()
@@ -0,0 +1,57 @@
+"""
+Реестр бэкендов классификации
+
+Бэкенд выбирается настройкой PROCESSING_CLASSIFIER: имя из реестра
+('local', 'lexical', 'agents', 'cascade') или путь к классу ('myapp.classifiers.MyClassifier').
+Параметры бэкенда берутся из PROCESSING_CLASSIFIER_OPTIONS[имя].
+"""
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .base import BaseClassifier
+from .cascade import CascadeClassifier
+from .lexical import LexicalClassifier
+from .local import LocalClassifier
+from .openai_agents import AgentsClassifier
+
+_registry = {}
+_instances = {}
+
+
+def register(classifier_class):
+    """Регистрирует класс бэкенда под его именем (можно как декоратор)"""
+    _registry[classifier_class.name] = classifier_class
+    return classifier_class
+
+
+register(LocalClassifier)
+register(LexicalClassifier)
+register(AgentsClassifier)
+register(CascadeClassifier)
+
+
+def get_classifier(name=None):
+    """
+    Экземпляр бэкенда классификации (один на процесс)
+
+    Args:
+        name: имя бэкенда или путь к классу, по умолчанию PROCESSING_CLASSIFIER
+    """
+    name = name or getattr(settings, 'PROCESSING_CLASSIFIER', 'local')
+    if name not in _instances:
+        classifier_class = _registry.get(name) or import_string(name)
+        options = getattr(settings, 'PROCESSING_CLASSIFIER_OPTIONS', {}).get(name, {})
+        _instances[name] = classifier_class(**options)
+    return _instances[name]
+
+
+def reset_classifiers():
+    """Сбрасывает созданные экземпляры (после изменения настроек)"""
+    _instances.clear()
+
+
+__all__ = [
+    'AgentsClassifier', 'BaseClassifier', 'CascadeClassifier', 'LexicalClassifier', 'LocalClassifier',
+    'get_classifier', 'register', 'reset_classifiers',
+]
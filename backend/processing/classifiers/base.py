@@ -0,0 +1,93 @@
+"""
+Базовый интерфейс бэкенда классификации
+"""
+
+from ..concurrency import map_bounded, run_sync
+
+
+class BaseClassifier:
+    """
+    Бэкенд классификации товаров по ТН ВЭД
+
+    Бэкенд получает пакет описаний и возвращает список результатов той же
+    длины и в том же порядке. Каждый результат — словарь:
+
+        {
+            'code': '8703.10.00' или None, если код не определен,
+            'description': описание кода (для новых HS кодов),
+            'confidence': уверенность 0..1,
+            'reasoning': обоснование,
+            'alternatives': [{'code': ..., 'confidence': ...}, ...],
+            'tier': уровень, давший результат (необязательно, по умолчанию tier бэкенда),
+        }
+
+    Связывание кодов с моделью HSCode и сохранение выполняет конвейер
+    обработки, бэкенд с БД не работает.
+    """
+
+    # Имя в реестре (PROCESSING_CLASSIFIER)
+    name = None
+
+    # Версия модели/правил — меняется, когда меняются результаты классификации
+    version = '1'
+
+    # Уровень стоимости (ProductItem.TIER_CHOICES): 'local' — без сети, 'agent' — вызов LLM
+    tier = 'local'
+
+    def __init__(self, **options):
+        self.options = options
+
+    def classify_batch(self, descriptions):
+        """Классифицирует пакет описаний"""
+        raise NotImplementedError
+
+    def classify(self, description):
+        """Классифицирует одно описание"""
+        return self.classify_batch([description])[0]
+
+    def is_confident(self, result, threshold):
+        """
+        Достаточно ли результата, чтобы каскад не передавал позицию
+        следующему уровню (CascadeClassifier)
+        """
+        return result['confidence'] >= threshold
+
+    @staticmethod
+    def unknown(reasoning=''):
+        """Результат для товара, код которого определить не удалось"""
+        return {
+            'code': None,
+            'description': '',
+            'confidence': 0.0,
+            'reasoning': reasoning,
+            'alternatives': [],
+        }
+
+
+class AsyncClassifier(BaseClassifier):
+    """
+    Бэкенд с асинхронным вызовом на одну позицию
+
+    Пакет классифицируется конкурентно: одновременно выполняется не более
+    options['concurrency'] вызовов aclassify, каждый ограничен
+    options['timeout'] секундами. Результаты возвращаются в порядке
+    описаний, поэтому пакет из N позиций занимает примерно
+    N / concurrency × задержка вызова вместо N × задержка.
+    """
+
+    def classify_batch(self, descriptions):
+        return run_sync(self.aclassify_batch(descriptions))
+
+    async def aclassify_batch(self, descriptions):
+        """Конкурентная классификация пакета внутри событийного цикла"""
+        return await map_bounded(
+            self.aclassify,
+            descriptions,
+            concurrency=self.options.get('concurrency', 16),
+            timeout=self.options.get('timeout', 60),
+            on_timeout=lambda description: self.unknown('Превышено время ожидания ответа'),
+        )
+
+    async def aclassify(self, description):
+        """Классифицирует одно описание"""
+        raise NotImplementedError
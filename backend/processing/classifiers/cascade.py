@@ -0,0 +1,75 @@
+"""
+Каскадная классификация по уровням стоимости
+
+Описание проходит бэкенды options['tiers'] по порядку, от дешевых к
+дорогим (по умолчанию лексический поиск, затем агент). Результат с
+уверенностью не ниже options['threshold'] принимается, если уровень
+считает его достаточным (BaseClassifier.is_confident: лексический
+уровень требует еще и совпадения нескольких термов), остальные
+описания передаются следующему уровню одним пакетом. Так дорогой
+вызов агента достается только позициям, которые дешевый уровень не
+решил уверенно.
+
+Если следующий уровень не определил код (таймаут, ошибка), остается
+результат предыдущего. Уровень 'memory' (кэш классификации) работает
+перед каскадом в конвейере обработки.
+"""
+
+import logging
+
+from .base import BaseClassifier
+
+logger = logging.getLogger(__name__)
+
+
+class CascadeClassifier(BaseClassifier):
+    """Бэкенды-уровни с эскалацией неуверенных результатов"""
+
+    name = 'cascade'
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.tier_names = list(options.get('tiers', ['lexical', 'agents']))
+        self.threshold = options.get('threshold', 0.8)
+        if not self.tier_names:
+            raise ValueError('Каскад без уровней: задайте PROCESSING_CASCADE_TIERS')
+        if self.name in self.tier_names:
+            raise ValueError('Каскад не может быть собственным уровнем')
+
+    @property
+    def tiers(self):
+        """Экземпляры бэкендов уровней (общие с реестром)"""
+        from . import get_classifier
+
+        return [get_classifier(name) for name in self.tier_names]
+
+    @property
+    def version(self):
+        # Результат зависит от версий всех уровней и порога эскалации
+        versions = '+'.join(f'{tier.name}-{tier.version}' for tier in self.tiers)
+        return f'cascade-{self.threshold}-{versions}'
+
+    def classify_batch(self, descriptions):
+        results = [None] * len(descriptions)
+        pending = list(range(len(descriptions)))
+        tiers = self.tiers
+
+        for level, classifier in enumerate(tiers):
+            answers = classifier.classify_batch([descriptions[index] for index in pending])
+            last = level == len(tiers) - 1
+            escalated = []
+            for index, answer in zip(pending, answers):
+                answer.setdefault('tier', classifier.tier)
+                if results[index] is None or answer.get('code'):
+                    results[index] = answer
+                if not last and not classifier.is_confident(results[index], self.threshold):
+                    escalated.append(index)
+
+            logger.debug(
+                f"Каскад: {classifier.name} решил {len(pending) - len(escalated)} из {len(pending)}"
+            )
+            pending = escalated
+            if not pending:
+                break
+
+        return results
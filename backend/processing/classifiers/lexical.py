@@ -0,0 +1,84 @@
+"""
+Классификация по лексическому поиску BM25 без LLM
+
+Код — лучший кандидат processing.retrieval.LexicalIndex. Уверенность —
+произведение трех долей:
+
+- доли термов описания, найденных в описании кода (слово "кофе" в
+  "Кофе деревянный ящик" не делает мебель ответом);
+- доли наибольшего достижимого score запроса, набранной кандидатом
+  (редкие, значимые термы весят больше частых);
+- отрыва от второго кандидата: от 0.5 при равных кандидатах до 1.
+
+Так высокую уверенность получает только код, совпавший с описанием
+почти целиком и без близкого соперника; остальное стоит отдать на
+проверку или более сильному бэкенду.
+
+Уверенность BM25 не откалибрована по реальным ответам, поэтому в каскаде
+результат принимается, только если кроме порога совпало не меньше
+options['min_terms'] термов и score не ниже options['min_score'];
+иначе позиция уходит следующему уровню.
+"""
+
+from ..retrieval import get_lexical_index
+from ..retrieval.lexical import tokenize
+from .base import BaseClassifier
+
+
+class LexicalClassifier(BaseClassifier):
+    """Лучший кандидат BM25 по справочнику HS кодов"""
+
+    name = 'lexical'
+    version = 'lexical-2'
+
+    def classify_batch(self, descriptions):
+        index = get_lexical_index()
+        candidates = self.options.get('candidates', 5)
+        return [
+            self.select(description, index.search(description, candidates), index.max_score(description))
+            for description in descriptions
+        ]
+
+    def is_confident(self, result, threshold):
+        return (
+            super().is_confident(result, threshold)
+            and result.get('matched_terms', 0) >= self.options.get('min_terms', 2)
+            and result.get('score', 0.0) >= self.options.get('min_score', 0.0)
+        )
+
+    def select(self, description, hits, max_score):
+        """
+        Результат по кандидатам одного описания
+
+        Args:
+            hits: кандидаты LexicalIndex.search
+            max_score: LexicalIndex.max_score описания
+        """
+        if not hits:
+            return self.unknown(f'Нет кандидатов в справочнике для "{description[:50]}"')
+
+        terms = len(set(tokenize(description)))
+
+        def coverage(hit):
+            return (hit['matched'] / terms) * min(1.0, hit['score'] / max_score)
+
+        best = hits[0]
+        runner_up = hits[1]['score'] if len(hits) > 1 else 0.0
+        margin = 1 - runner_up / best['score']
+        confidence = min(0.95, coverage(best) * (0.5 + 0.5 * margin))
+
+        return {
+            'code': best['code'],
+            'description': best['description'],
+            'confidence': round(confidence, 4),
+            'reasoning': (
+                f'BM25 {best["score"]:.2f} (следующий кандидат {runner_up:.2f}), '
+                f'совпало термов {best["matched"]} из {terms}: {best["description"][:100]}'
+            ),
+            'alternatives': [
+                {'code': hit['code'], 'confidence': round(min(0.95, coverage(hit) * 0.5), 4)}
+                for hit in hits[1:]
+            ],
+            'score': round(best['score'], 4),
+            'matched_terms': best['matched'],
+        }
@@ -0,0 +1,290 @@
+"""
+Бэкенд классификации на openai-agents (Agent/Runner)
+
+Повторяет прототип из ai_agents.ipynb: агент с инструкцией классификатора
+ТН ВЭД и FileSearchTool по векторному хранилищу с кодовой базой. При
+retrieval='local' вместо удаленного хранилища агент получает функцию
+поиска по локальному индексу HS кодов (processing.retrieval). При
+candidates > 0 в запрос добавляется короткий список кандидатов BM25 из
+справочника, и агенту не нужно искать по всей номенклатуре.
+Вызовы Runner.run для позиций пакета выполняются конкурентно (см.
+AsyncClassifier). Таймаут options['timeout'] ограничивает только сам
+вызов: ожидание очереди общего лимита RPM/TPM (processing.ratelimit) в
+него не входит, поэтому при насыщенном лимите позиции ждут, а не
+получают UNKNOWN по таймауту. Библиотека agents импортируется лениво,
+чтобы остальные бэкенды работали и без нее.
+
+При pack_size > 1 в один вызов агента упаковывается до pack_size
+описаний (как в прототипе с [мрамор], [зеркало]); ответ — по строке
+`<номер>: <код>` на позицию. Если ответ не разбирается, пачка делится
+пополам и классифицируется заново, вплоть до одиночных вызовов.
+"""
+
+import asyncio
+import re
+
+from core.registry import get_hs_code_registry
+
+from ..concurrency import map_bounded
+from ..ratelimit import RateLimiter, estimate_tokens
+from ..retrieval import get_lexical_index, get_vector_index
+from .base import AsyncClassifier
+
+AGENT_INSTRUCTIONS = (
+    "Роль: Ты — высокоточный классификатор товаров по ТН ВЭД Туркменистана, использующий "
+    "векторную базу описаний в котором загружена ТН ВЭД кодовая база Туркменистана."
+    "Задание: По каждому входному описанию товара определяй наиболее релевантный 9-значный код ТН ВЭД."
+    "Правила ответа:"
+    "• Выводи только сам код (9 цифр) без каких-либо символов, текста или пояснений."
+    "Формат ввода: произвольное текстовое описание товара (RU)."
+    "Формат вывода: `XXXXXXXXXX` либо `UNKNOWN`."
+)
+
+PACKED_AGENT_INSTRUCTIONS = (
+    "Роль: Ты — высокоточный классификатор товаров по ТН ВЭД Туркменистана, использующий "
+    "векторную базу описаний в котором загружена ТН ВЭД кодовая база Туркменистана."
+    "Задание: Для каждого товара из пронумерованного списка определяй наиболее релевантный "
+    "9-значный код ТН ВЭД."
+    "Правила ответа:"
+    "• Ровно одна строка на каждый товар списка, в том же порядке."
+    "• Формат строки: `<номер товара>: XXXXXXXXXX` либо `<номер товара>: UNKNOWN`."
+    "• Никакого другого текста или пояснений."
+)
+
+CODE_PATTERN = re.compile(r'\b\d{9,10}\b')
+PACKED_LINE_PATTERN = re.compile(r'^\s*(\d+)\s*[:.)\-]\s*`?(\d{9,10}|UNKNOWN)`?\s*$', re.IGNORECASE)
+
+
+def search_candidates(query, k):
+    """Кандидаты локального индекса строками `код (близость): описание`"""
+    index = get_vector_index()
+    if index is None:
+        return 'Индекс HS кодов не построен'
+    registry = get_hs_code_registry()
+    lines = []
+    for hit in index.search(query, k):
+        entry = registry.get_by_id(hit['id'])
+        description = entry.description if entry else ''
+        lines.append(f"{hit['code']} ({hit['score']:.2f}): {description}")
+    return '\n'.join(lines) or 'Ничего не найдено'
+
+
+class AgentsClassifier(AsyncClassifier):
+    """Классификация через Runner.run агента openai-agents"""
+
+    name = 'agents'
+    tier = 'agent'
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.model = options.get('model', 'gpt-4.1')
+        self.version = f'agents-{self.model}'
+        self.pack_size = max(1, options.get('pack_size', 1))
+        self.limiter = RateLimiter(
+            self.model,
+            rpm=options.get('rpm', 0),
+            tpm=options.get('tpm', 0),
+        )
+        # Количество вызовов Runner.run (для бенчмарков и статистики)
+        self.calls = 0
+        self.lexical = None
+        self._agent = None
+        self._packed_agent = None
+
+    @property
+    def agent(self):
+        """Агент для одной позиции, создается один раз на процесс"""
+        if self._agent is None:
+            self._agent = self.build_agent(AGENT_INSTRUCTIONS)
+        return self._agent
+
+    @property
+    def packed_agent(self):
+        """Агент для пронумерованного списка позиций"""
+        if self._packed_agent is None:
+            self._packed_agent = self.build_agent(PACKED_AGENT_INSTRUCTIONS)
+        return self._packed_agent
+
+    def build_agent(self, instructions):
+        """Агент прототипа с заданной инструкцией"""
+        from agents import Agent, FileSearchTool
+
+        tools = []
+        vector_store_id = self.options.get('vector_store_id')
+        if self.options.get('retrieval') == 'local':
+            tools.append(self.build_local_search_tool())
+        elif vector_store_id:
+            tools.append(FileSearchTool(
+                vector_store_ids=[vector_store_id],
+                max_num_results=self.options.get('max_num_results', 3),
+                include_search_results=True,
+            ))
+
+        return Agent(
+            name='AI Declarant',
+            instructions=instructions,
+            model=self.build_model(),
+            tools=tools,
+        )
+
+    def build_local_search_tool(self):
+        """Функция поиска кандидатов по локальному векторному индексу"""
+        from agents import function_tool
+        from asgiref.sync import sync_to_async
+
+        max_num_results = self.options.get('max_num_results', 3)
+
+        @function_tool
+        async def search_hs_codes(query: str) -> str:
+            """Ищет коды ТН ВЭД, ближайшие к описанию товара.
+
+            Args:
+                query: описание товара
+            """
+            # Справочник может обратиться к БД, поэтому поиск выполняется вне цикла
+            return await sync_to_async(search_candidates)(query, max_num_results)
+
+        return search_hs_codes
+
+    def build_model(self):
+        """Имя модели или модель с отдельным клиентом, если задан base_url"""
+        base_url = self.options.get('base_url')
+        if not base_url:
+            return self.model
+
+        from agents import OpenAIResponsesModel
+        from openai import AsyncOpenAI
+
+        client = AsyncOpenAI(base_url=base_url, api_key=self.options.get('api_key') or None)
+        return OpenAIResponsesModel(model=self.model, openai_client=client)
+
+    async def run(self, agent, prompt):
+        """
+        Один вызов агента с учетом общего лимита RPM/TPM
+
+        Raises:
+            asyncio.TimeoutError: вызов дольше options['timeout'] секунд
+                (без учета ожидания лимита)
+        """
+        from agents import Runner
+
+        # Общий для всех воркеров лимит RPM/TPM: ждем свою очередь, а не ловим 429
+        await self.limiter.aacquire(estimate_tokens(prompt, self.options.get('tokens_per_call', 0)))
+        self.calls += 1
+        run = await asyncio.wait_for(Runner.run(agent, prompt), self.options.get('timeout', 60))
+        return str(run.final_output or '').strip()
+
+    def classify_batch(self, descriptions):
+        # Индекс BM25 строится из справочника (может обратиться к БД) до входа в событийный цикл
+        self.lexical = get_lexical_index() if self.options.get('candidates') else None
+        return super().classify_batch(descriptions)
+
+    async def aclassify_batch(self, descriptions):
+        # Таймаут — внутри run (только Runner.run), map_bounded его не накладывает:
+        # TimeoutError вызова превращается в UNKNOWN через on_timeout
+        if self.pack_size == 1:
+            return await map_bounded(
+                self.aclassify,
+                descriptions,
+                concurrency=self.options.get('concurrency', 16),
+                on_timeout=lambda description: self.unknown('Превышено время ожидания ответа'),
+            )
+
+        packs = [
+            descriptions[start:start + self.pack_size]
+            for start in range(0, len(descriptions), self.pack_size)
+        ]
+        results = await map_bounded(
+            self.aclassify_pack,
+            packs,
+            concurrency=self.options.get('concurrency', 16),
+            on_timeout=lambda pack: [self.unknown('Превышено время ожидания ответа')] * len(pack),
+        )
+        return [result for pack_results in results for result in pack_results]
+
+    async def aclassify(self, description):
+        output = await self.run(self.agent, self.build_prompt(description))
+        return self.parse_output(output)
+
+    async def aclassify_pack(self, descriptions):
+        """
+        Классифицирует пачку описаний одним вызовом агента
+
+        Если ответ не содержит корректной строки для каждой позиции, пачка
+        делится пополам и классифицируется заново.
+        """
+        if len(descriptions) == 1:
+            return [await self.aclassify(descriptions[0])]
+
+        output = await self.run(self.packed_agent, self.build_packed_prompt(descriptions))
+        results = self.parse_packed_output(output, len(descriptions))
+        if results is not None:
+            return results
+
+        middle = len(descriptions) // 2
+        return (
+            await self.aclassify_pack(descriptions[:middle])
+            + await self.aclassify_pack(descriptions[middle:])
+        )
+
+    def build_prompt(self, description):
+        """Запрос агенту в формате прототипа"""
+        prompt = f'Какой ТНВЭД код [Наименование товара :{description}]'
+        candidates = self.format_candidates(description)
+        if candidates:
+            prompt += f'\nКандидаты из справочника: {candidates}'
+        return prompt
+
+    def build_packed_prompt(self, descriptions):
+        """Пронумерованный список товаров для одного вызова"""
+        lines = []
+        for index, description in enumerate(descriptions, 1):
+            line = f'{index}. [Наименование товара :{description}]'
+            candidates = self.format_candidates(description)
+            if candidates:
+                line += f' (кандидаты: {candidates})'
+            lines.append(line)
+        return 'Какие ТНВЭД коды у товаров:\n' + '\n'.join(lines)
+
+    def format_candidates(self, description):
+        """Кандидаты BM25 строкой `код — описание; ...` или '' без индекса"""
+        if self.lexical is None:
+            return ''
+        hits = self.lexical.search(description, self.options.get('candidates', 0))
+        return '; '.join(f"{hit['code']} — {hit['description'][:60]}" for hit in hits)
+
+    def parse_output(self, output):
+        """Достает код из ответа агента, UNKNOWN и мусор — неизвестный код"""
+        output = str(output or '').strip()
+        match = CODE_PATTERN.search(output)
+        if not match:
+            return self.unknown(f'Агент {self.model} не определил код: "{output[:100]}"')
+
+        return {
+            'code': match.group(0),
+            'description': '',
+            'confidence': self.options.get('confidence', 0.8),
+            'reasoning': f'Ответ агента {self.model}: {output[:200]}',
+            'alternatives': [],
+        }
+
+    def parse_packed_output(self, output, count):
+        """
+        Разбирает ответ `<номер>: <код>` по строкам
+
+        Returns:
+            Список результатов по порядку позиций или None, если ответ
+            некорректен (нет строки для какой-то позиции, лишний текст)
+        """
+        answers = {}
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            match = PACKED_LINE_PATTERN.match(line)
+            if not match:
+                return None
+            answers[int(match.group(1))] = match.group(2)
+
+        if set(answers) != set(range(1, count + 1)):
+            return None
+        return [self.parse_output(answers[index]) for index in range(1, count + 1)]
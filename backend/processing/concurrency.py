@@ -0,0 +1,93 @@
+"""
+Конкурентное выполнение асинхронных вызовов внутри Celery воркера
+
+Celery задача синхронная, поэтому асинхронные вызовы (запросы к LLM)
+выполняются в событийном цикле процесса. Цикл создается один раз на
+процесс и переиспользуется между пакетами, чтобы HTTP-клиенты могли
+держать соединения открытыми.
+
+Если задача выполняется с токеном отмены (processing.cancellation),
+map_bounded прерывает незавершенные вызовы, как только задачу отменят.
+"""
+
+import asyncio
+import os
+
+from .cancellation import TaskCancelled, current_token
+
+_loop = None
+_loop_pid = None
+
+
+def get_event_loop():
+    """Событийный цикл текущего процесса (свой в каждом дочернем процессе prefork)"""
+    global _loop, _loop_pid
+    if _loop is None or _loop.is_closed() or _loop_pid != os.getpid():
+        _loop = asyncio.new_event_loop()
+        _loop_pid = os.getpid()
+    return _loop
+
+
+def run_sync(coroutine):
+    """Выполняет корутину в цикле процесса и возвращает ее результат"""
+    return get_event_loop().run_until_complete(coroutine)
+
+
+async def map_bounded(func, items, concurrency, timeout=None, on_timeout=None):
+    """
+    Выполняет await func(item) для всех items, не более concurrency одновременно
+
+    Args:
+        func: асинхронная функция одного аргумента
+        items: последовательность аргументов
+        concurrency: максимальное число одновременных вызовов
+        timeout: ограничение времени одного вызова (секунды)
+        on_timeout: функция item -> результат для вызовов, превысивших timeout
+            или поднявших TimeoutError сами; если не задана, TimeoutError
+            пробрасывается
+
+    Returns:
+        Список результатов в порядке items
+
+    Raises:
+        TaskCancelled: текущую задачу отменили во время вызовов
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def call(item):
+        async with semaphore:
+            try:
+                return await asyncio.wait_for(func(item), timeout)
+            except asyncio.TimeoutError:
+                if on_timeout is None:
+                    raise
+                return on_timeout(item)
+
+    calls = asyncio.gather(*(call(item) for item in items))
+    token = current_token()
+    if token is None:
+        return await calls
+    return await until_cancelled(calls, token)
+
+
+async def until_cancelled(calls, token):
+    """Ждет calls, отменяя их, если задачу отменят раньше"""
+    watcher = asyncio.ensure_future(token.wait())
+    try:
+        done, _ = await asyncio.wait({calls, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    except BaseException:
+        calls.cancel()
+        watcher.cancel()
+        raise
+
+    if calls in done:
+        watcher.cancel()
+        return calls.result()
+
+    calls.cancel()
+    try:
+        await calls
+    except (asyncio.CancelledError, Exception):
+        # Результаты прерванного пакета не нужны
+        pass
+    raise TaskCancelled(f'Задача {token.task_id} отменена')
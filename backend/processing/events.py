@@ -0,0 +1,183 @@
+"""
+События задач обработки через Redis pub/sub
+
+Конвейер публикует события задачи в канал tasks:events:{id} Redis
+PROCESSING_EVENTS_URL ('' — события отключены):
+
+- progress — снимок статуса задачи (при каждой записи прогресса,
+  см. processing.status);
+- stage — смена статуса задачи (pending → processing → completed, ...);
+- items — пакет позиций, получивших результат классификации.
+
+Публикация не ждет подписчиков и не прерывает обработку при
+недоступности Redis. /api/tasks/{id}/events/ (api.events) раздает
+события клиентам как Server-Sent Events: в каждом процессе ASGI одна
+подписка Redis (EventHub) обслуживает все открытые соединения, поэтому
+тысячи ожидающих клиентов — это тысячи очередей asyncio, а не потоков
+или соединений с Redis.
+"""
+
+import asyncio
+import json
+import logging
+
+import redis
+import redis.asyncio
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from core.registry import get_hs_code_registry
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'tasks:events:{task_id}'
+
+# Статусы, после которых событий задачи больше не будет
+FINAL_STATUSES = {'completed', 'failed', 'cancelled'}
+
+_client = None
+_hub = None
+
+
+def get_url():
+    return getattr(settings, 'PROCESSING_EVENTS_URL', '')
+
+
+def get_redis():
+    """Синхронный клиент Redis для публикации (один на процесс)"""
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(get_url())
+    return _client
+
+
+def reset_redis():
+    """Сбрасывает клиент (после смены настроек)"""
+    global _client
+    _client = None
+
+
+def publish_event(task_id, event, data):
+    """Публикует событие задачи (без ошибок при недоступности Redis)"""
+    if not get_url():
+        return
+    message = json.dumps({'event': event, 'data': data}, cls=DjangoJSONEncoder)
+    try:
+        get_redis().publish(CHANNEL.format(task_id=task_id), message)
+    except Exception as exc:
+        logger.warning(f"Событие {event} задачи {task_id} не опубликовано: {exc}")
+
+
+def status_payload(snapshot):
+    """Данные события progress из снимка статуса"""
+    fields = snapshot['fields']
+    total, processed = fields['total_items'], fields['processed_items']
+    payload = {key: value for key, value in fields.items() if key != 'user_id'}
+    payload['progress_percent'] = round(processed / total * 100, 1) if total else 0.0
+    payload['version'] = snapshot['version']
+    return payload
+
+
+def publish_items(task_id, items):
+    """Публикует пакет позиций с результатами классификации"""
+    if not get_url() or not items:
+        return
+    registry = get_hs_code_registry()
+    rows = []
+    for item in items:
+        entry = registry.get_by_id(item.suggested_hs_code_id) if item.suggested_hs_code_id else None
+        rows.append({
+            'row_number': item.row_number,
+            'description': item.original_description,
+            'code': entry.code if entry else None,
+            'confidence': item.confidence_score,
+            'tier': item.classification_tier,
+            'status': item.status,
+        })
+    publish_event(task_id, 'items', {'count': len(rows), 'items': rows})
+
+
+def format_sse(event, data):
+    """Кадр Server-Sent Events"""
+    return f'event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)}\n\n'
+
+
+class EventHub:
+    """
+    Подписка Redis процесса ASGI, раздающая события по очередям клиентов
+
+    Канал задачи подписывается при появлении первого слушателя и
+    отписывается с уходом последнего. Очередь медленного клиента
+    ограничена queue_size: при переполнении теряются самые старые события.
+    """
+
+    def __init__(self, url, queue_size=100):
+        self.url = url
+        self.queue_size = queue_size
+        self.listeners = {}
+        self.loop = asyncio.get_running_loop()
+        self._pubsub = None
+        self._reader = None
+        self._lock = asyncio.Lock()
+
+    async def subscribe(self, task_id):
+        """Очередь событий задачи (отписаться — unsubscribe)"""
+        channel = CHANNEL.format(task_id=task_id)
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        async with self._lock:
+            listeners = self.listeners.setdefault(channel, set())
+            listeners.add(queue)
+            if len(listeners) == 1:
+                if self._pubsub is None:
+                    self._pubsub = redis.asyncio.Redis.from_url(self.url).pubsub(ignore_subscribe_messages=True)
+                await self._pubsub.subscribe(channel)
+            if self._reader is None or self._reader.done():
+                self._reader = asyncio.create_task(self._read())
+        return queue
+
+    async def unsubscribe(self, task_id, queue):
+        channel = CHANNEL.format(task_id=task_id)
+        async with self._lock:
+            listeners = self.listeners.get(channel)
+            if not listeners:
+                return
+            listeners.discard(queue)
+            if not listeners:
+                del self.listeners[channel]
+                try:
+                    await self._pubsub.unsubscribe(channel)
+                except Exception as exc:
+                    logger.warning(f"Отписка от {channel} не удалась: {exc}")
+
+    async def _read(self):
+        """Читает сообщения Redis, пока есть слушатели"""
+        while self.listeners:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except Exception as exc:
+                logger.warning(f"Чтение событий задач из Redis прервано: {exc}")
+                await asyncio.sleep(1.0)
+                continue
+            if not message or message.get('type') != 'message':
+                continue
+
+            channel = message['channel']
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            try:
+                event = json.loads(message['data'])
+            except ValueError:
+                continue
+            for queue in list(self.listeners.get(channel, ())):
+                if queue.full():
+                    queue.get_nowait()
+                queue.put_nowait(event)
+
+
+def get_event_hub():
+    """EventHub текущего цикла событий"""
+    global _hub
+    loop = asyncio.get_running_loop()
+    if _hub is None or _hub.loop is not loop:
+        _hub = EventHub(get_url())
+    return _hub
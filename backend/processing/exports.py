@@ -0,0 +1,105 @@
+"""
+Потоковая выгрузка результатов обработки в CSV и XLSX
+
+Позиции читаются из БД курсором (.iterator(chunk_size)), HS коды
+берутся из справочника процесса (core.registry) без JOIN, поэтому
+память не зависит от количества строк:
+
+- CSV отдается генератором в StreamingHttpResponse: первые байты уходят
+  клиенту сразу, до чтения остальных строк;
+- XLSX пишется книгой openpyxl в режиме write-only во временный файл
+  (строки уходят на диск, строки текста — inline, без общей таблицы) и
+  отдается файлом по частям.
+"""
+
+import csv
+
+import openpyxl
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+from core.models import ProductItem
+from core.registry import get_hs_code_registry
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_HEADERS = [
+    'Строка', 'Описание', 'Количество', 'Единица',
+    'Предложенный код', 'Описание кода', 'Уверенность', 'Уровень',
+    'Финальный код', 'Статус', 'Комментарий', 'Альтернативы', 'Обоснование',
+]
+
+EXPORT_FIELDS = [
+    'row_number', 'original_description', 'quantity', 'unit',
+    'suggested_hs_code_id', 'confidence_score', 'classification_tier',
+    'final_hs_code_id', 'status', 'user_comment', 'alternatives', 'ai_reasoning',
+]
+
+
+def format_alternatives(alternatives):
+    """Альтернативные коды одной строкой: "код (уверенность); ..." """
+    return '; '.join(
+        f"{alternative.get('code')} ({alternative.get('confidence', 0):.2f})"
+        for alternative in alternatives or []
+        if isinstance(alternative, dict) and alternative.get('code')
+    )
+
+
+def iter_export_rows(task, chunk_size=EXPORT_CHUNK_SIZE):
+    """Строки выгрузки задачи по порядку номеров строк файла"""
+    registry = get_hs_code_registry()
+    statuses = dict(ProductItem.ITEM_STATUS_CHOICES)
+    queryset = task.items.order_by('row_number').values_list(*EXPORT_FIELDS)
+
+    for (row_number, description, quantity, unit, suggested_id, confidence, tier,
+         final_id, status, comment, alternatives, reasoning) in queryset.iterator(chunk_size=chunk_size):
+        suggested = registry.get_by_id(suggested_id) if suggested_id else None
+        final = registry.get_by_id(final_id) if final_id else None
+        yield [
+            row_number, description, quantity, unit,
+            suggested.code if suggested else '',
+            suggested.description if suggested else '',
+            round(confidence, 4), tier,
+            final.code if final else '',
+            str(statuses.get(status, status)), comment,
+            format_alternatives(alternatives), reasoning,
+        ]
+
+
+class Echo:
+    """Псевдо-файл для csv.writer: write возвращает строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows, rows_per_chunk=500):
+    """
+    CSV по частям для StreamingHttpResponse
+
+    Заголовок (с BOM, чтобы Excel распознал UTF-8) отдается сразу,
+    дальше — по rows_per_chunk строк за раз.
+    """
+    writer = csv.writer(Echo())
+    yield '\ufeff' + writer.writerow(EXPORT_HEADERS)
+    chunk = []
+    for row in rows:
+        chunk.append(writer.writerow(row))
+        if len(chunk) >= rows_per_chunk:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def write_xlsx(rows, output):
+    """Записывает строки в XLSX книгу write-only (output — путь или файл)"""
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('Результаты')
+    sheet.append(EXPORT_HEADERS)
+    for row in rows:
+        # Управляющие символы из исходных файлов недопустимы в XML листа
+        sheet.append([
+            ILLEGAL_CHARACTERS_RE.sub('', value) if isinstance(value, str) else value
+            for value in row
+        ])
+    workbook.save(output)
@@ -0,0 +1,111 @@
+"""
+Память подтвержденных решений пользователей
+
+Когда пользователь подтверждает код позиции (approve или выбор
+final_hs_code), решение сохраняется в ConfirmedClassification по
+нормализованному описанию товара. Перед классификацией пакета конвейер
+ищет описания в памяти владельца задачи одним запросом по уникальному
+индексу (user, description_key): найденные товары получают
+подтвержденный код с уверенностью PROCESSING_MEMORY_CONFIDENCE и не
+доходят ни до кэша, ни до бэкенда.
+
+Память у каждого пользователя своя: одно и то же описание у разных
+импортеров может означать разные товары.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.utils import timezone
+
+from core.models import ConfirmedClassification
+from core.registry import get_hs_code_registry
+
+from .cache import normalize_description
+
+
+def description_key(normalized):
+    """Ключ памяти для нормализованного описания"""
+    return hashlib.md5(normalized.encode('utf-8')).hexdigest()
+
+
+def is_enabled():
+    return getattr(settings, 'PROCESSING_MEMORY_ENABLED', True)
+
+
+def remember(items):
+    """
+    Запоминает подтвержденные коды позиций одним INSERT ... ON CONFLICT
+
+    Позиции без final_hs_code_id пропускаются; новое решение по тому же
+    описанию заменяет прежнее.
+
+    Args:
+        items: ProductItem с загруженной task (нужен task.user_id)
+    """
+    if not is_enabled():
+        return
+
+    now = timezone.now()
+    records = {}
+    for item in items:
+        if not item.final_hs_code_id:
+            continue
+        normalized = normalize_description(item.original_description)
+        if not normalized:
+            continue
+        # Последнее решение по описанию в пакете побеждает
+        records[(item.task.user_id, description_key(normalized))] = ConfirmedClassification(
+            user_id=item.task.user_id,
+            description_key=description_key(normalized),
+            description=normalized,
+            hs_code_id=item.final_hs_code_id,
+            created_at=now,
+            updated_at=now,
+        )
+
+    if records:
+        ConfirmedClassification.objects.bulk_create(
+            list(records.values()),
+            update_conflicts=True,
+            unique_fields=['user', 'description_key'],
+            update_fields=['hs_code', 'updated_at'],
+        )
+
+
+def recall(user_id, normalized_descriptions):
+    """
+    Подтвержденные пользователем коды для нормализованных описаний
+
+    Returns:
+        Словарь нормализованное описание -> результат классификации
+        (уровень 'memory') только для найденных описаний
+    """
+    if not is_enabled() or user_id is None:
+        return {}
+
+    keys = {description_key(normalized): normalized for normalized in normalized_descriptions if normalized}
+    if not keys:
+        return {}
+
+    rows = ConfirmedClassification.objects.filter(
+        user_id=user_id,
+        description_key__in=list(keys),
+    ).values_list('description_key', 'hs_code_id')
+
+    registry = get_hs_code_registry()
+    confidence = getattr(settings, 'PROCESSING_MEMORY_CONFIDENCE', 0.99)
+    found = {}
+    for key, hs_code_id in rows:
+        entry = registry.get_by_id(hs_code_id)
+        if entry is None:
+            continue
+        found[keys[key]] = {
+            'code': entry.code,
+            'description': entry.description,
+            'confidence': confidence,
+            'reasoning': f'Код {entry.code} ранее подтвержден пользователем для этого товара',
+            'alternatives': [],
+            'tier': 'memory',
+        }
+    return found
@@ -0,0 +1,163 @@
+"""
+Пакетное сохранение позиций товаров
+
+Вместо create()/save() на каждую строку файла позиции создаются одним
+bulk_create на пакет, а результаты классификации записываются обратно
+одним пакетным UPDATE в одной транзакции на пакет.
+
+Для записи результатов используется INSERT ... ON CONFLICT DO UPDATE
+по (task, row_number): на тех же данных это на порядок быстрее
+bulk_update, который строит CASE WHEN выражение для каждой строки.
+
+Обе записи идемпотентны, поэтому повторный запуск задачи после сбоя
+не создает дубликатов строк: вместе с результатами пакета в той же
+транзакции сдвигается контрольная точка ProcessingTask.checkpoint_row.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import ProcessingTask, ProductItem
+from core.registry import get_hs_code_registry
+
+# Уникальный ключ позиции (ProductItem.Meta.unique_together)
+UNIQUE_FIELDS = ['task', 'row_number']
+
+# Поля, которые заполняет классификация
+RESULT_FIELDS = [
+    'suggested_hs_code', 'confidence_score', 'ai_reasoning',
+    'alternatives', 'classification_tier', 'status', 'updated_at',
+]
+
+
+def get_batch_size():
+    """Размер пакета строк из настроек"""
+    return max(1, getattr(settings, 'PROCESSING_BATCH_SIZE', 500))
+
+
+def chunked(rows, size):
+    """Разбивает последовательность строк на списки длиной не более size"""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def build_item(task, row_number, row):
+    """Создает несохраненный ProductItem из строки файла"""
+    return ProductItem(
+        task=task,
+        row_number=row_number,
+        original_description=str(row.get('description', '')),
+        quantity=str(row.get('quantity', '')),
+        unit=str(row.get('unit', '')),
+    )
+
+
+def create_items(task, rows, start_row):
+    """
+    Создает позиции пакета одним INSERT
+
+    Уже существующие строки (повторный запуск) пропускаются
+    (ON CONFLICT DO NOTHING), поэтому у возвращенных позиций id не
+    заполнен: результаты сохраняются по (task, row_number).
+
+    Args:
+        task: ProcessingTask
+        rows: список словарей строк файла
+        start_row: номер строки (с 1) для первого элемента пакета
+
+    Returns:
+        Список ProductItem
+    """
+    items = [
+        build_item(task, start_row + offset, row)
+        for offset, row in enumerate(rows)
+    ]
+    with transaction.atomic():
+        ProductItem.objects.bulk_create(items, batch_size=get_batch_size(), ignore_conflicts=True)
+    return items
+
+
+def pending_items(task, items):
+    """Позиции пакета, у которых еще нет сохраненного результата"""
+    if not items:
+        return items
+    done = set(
+        ProductItem.objects.filter(
+            task=task,
+            row_number__range=(items[0].row_number, items[-1].row_number),
+        ).exclude(status='pending').values_list('row_number', flat=True)
+    )
+    return [item for item in items if item.row_number not in done]
+
+
+def advance_checkpoint(task, row_number):
+    """Сдвигает контрольную точку задачи вперед (назад — никогда)"""
+    ProcessingTask.objects.filter(pk=task.pk, checkpoint_row__lt=row_number).update(
+        checkpoint_row=row_number
+    )
+
+
+def attach_hs_codes(results):
+    """
+    Связывает коды из результатов классификации с HSCode
+
+    Коды разрешаются по справочнику процесса без запросов к БД,
+    недостающие создаются одним bulk_create. В каждый результат
+    добавляется ключ 'hs_code_id' (id HSCode или None).
+    """
+    descriptions = {
+        result['code']: result.get('description')
+        for result in results if result.get('code')
+    }
+    hs_code_ids = get_hs_code_registry().resolve(
+        descriptions,
+        category='Товары народного потребления',
+        subcategory='Общая группа',
+    )
+
+    for result in results:
+        result['hs_code_id'] = hs_code_ids.get(result.get('code'))
+    return results
+
+
+def apply_result(item, result, now=None):
+    """Переносит результат классификации в ProductItem (без сохранения)"""
+    item.suggested_hs_code_id = result['hs_code_id']
+    item.confidence_score = result['confidence']
+    item.ai_reasoning = result['reasoning']
+    item.alternatives = result['alternatives']
+    item.classification_tier = result.get('tier', '')
+    item.status = 'processed'
+    # Пакетная запись не вызывает auto_now, поэтому выставляем время вручную
+    item.updated_at = now or timezone.now()
+
+
+def save_results(items, results, checkpoint=None):
+    """
+    Сохраняет результаты классификации пакета в одной транзакции
+
+    Args:
+        checkpoint: (task, номер строки) — контрольная точка, которая
+            сдвигается в той же транзакции, что и результаты
+    """
+    now = timezone.now()
+    for item, result in zip(items, results):
+        apply_result(item, result, now)
+
+    with transaction.atomic():
+        ProductItem.objects.bulk_create(
+            items,
+            batch_size=get_batch_size(),
+            update_conflicts=True,
+            unique_fields=UNIQUE_FIELDS,
+            update_fields=RESULT_FIELDS,
+        )
+        if checkpoint is not None:
+            advance_checkpoint(*checkpoint)
@@ -0,0 +1,107 @@
+"""
+Коалесцированная отправка прогресса задачи обработки
+
+Прогресс копится в памяти и записывается в БД и в Celery result backend
+один раз на PROCESSING_PROGRESS_EVERY_ROWS строк или на
+PROCESSING_PROGRESS_INTERVAL секунд (что наступит раньше), а не на
+каждую строку или пакет. В БД обновляется только колонка
+processed_items через F(), поэтому несколько воркеров могут увеличивать
+прогресс одной задачи одновременно. Так же накапливаются и другие
+счетчики задачи (например, cache_hits/cache_misses). После записи
+снимок статуса публикуется в кэш (processing.status).
+"""
+
+import time
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import ProcessingTask
+
+from .status import publish_status
+
+
+class ProgressReporter:
+    """Накопитель прогресса одной задачи ProcessingTask"""
+
+    def __init__(self, task, celery_task=None, every_rows=None, interval=None):
+        """
+        Args:
+            task: ProcessingTask
+            celery_task: связанная (bind=True) Celery задача для update_state
+            every_rows: записывать, когда накопилось столько строк
+            interval: записывать, когда прошло столько секунд с прошлой записи
+        """
+        self.task = task
+        self.celery_task = celery_task
+        self.every_rows = every_rows or getattr(settings, 'PROCESSING_PROGRESS_EVERY_ROWS', 1000)
+        self.interval = interval if interval is not None else getattr(
+            settings, 'PROCESSING_PROGRESS_INTERVAL', 0.5
+        )
+        self.total = task.total_items
+        self.processed = task.processed_items
+        self.pending = 0
+        self.counters = {}
+        self.writes = 0
+        self._last_flush = time.monotonic()
+
+    @property
+    def percent(self):
+        """Процент выполнения"""
+        if not self.total:
+            return 0
+        return int((self.processed / self.total) * 100)
+
+    def advance(self, count, **counters):
+        """
+        Отмечает count обработанных строк, пишет только при достижении порога
+
+        Args:
+            count: количество обработанных строк
+            **counters: приращения других числовых полей ProcessingTask
+        """
+        self.processed += count
+        self.pending += count
+        for field, value in counters.items():
+            self.counters[field] = self.counters.get(field, 0) + value
+        if self.pending >= self.every_rows or self._elapsed() >= self.interval:
+            self.flush()
+
+    def flush(self):
+        """Немедленно записывает накопленный прогресс"""
+        if self.pending or any(self.counters.values()):
+            updates = {
+                field: F(field) + value
+                for field, value in self.counters.items() if value
+            }
+            # updated_at — признак жизни задачи для планировщика (processing.scheduler)
+            ProcessingTask.objects.filter(pk=self.task.pk).update(
+                processed_items=F('processed_items') + self.pending,
+                updated_at=timezone.now(),
+                **updates
+            )
+            self.task.processed_items = self.processed
+            self.pending = 0
+            self.counters = {}
+            self.writes += 1
+            publish_status(self.task.pk)
+        self._publish()
+        self._last_flush = time.monotonic()
+
+    def _elapsed(self):
+        return time.monotonic() - self._last_flush
+
+    def _publish(self):
+        """Обновляет состояние Celery задачи для /api/tasks/{id}/status/"""
+        if self.celery_task is None:
+            return
+        self.celery_task.update_state(
+            state='PROGRESS',
+            meta={
+                'current': self.processed,
+                'total': self.total,
+                'percent': self.percent,
+                'status': f'Обработано {self.processed} из {self.total} позиций'
+            }
+        )
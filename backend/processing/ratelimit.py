@@ -0,0 +1,179 @@
+"""
+Распределенный ограничитель запросов к LLM (token bucket в Redis)
+
+Все воркеры делят одно ведро на модель в Redis из CELERY_BROKER_URL.
+Ведро считает и запросы (RPM), и оценку токенов (TPM). Каждый вызов
+резервирует свою долю атомарным Lua-скриптом и получает время ожидания:
+если ведро пусто, вызывающий ждет ровно до момента, когда его доля
+накопится. Повторных попыток и 429 от провайдера при этом не возникает.
+"""
+
+import asyncio
+import logging
+import math
+import time
+
+import redis
+import redis.asyncio
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Резервирует запросы и токены, возвращает время ожидания в секундах.
+# Уровень ведра может уйти в минус: это очередь уже выданных резервов.
+ACQUIRE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local rpm = tonumber(ARGV[1])
+local tpm = tonumber(ARGV[2])
+local state = redis.call('HMGET', KEYS[1], 'requests', 'tokens', 'ts')
+local requests = tonumber(state[1]) or rpm
+local tokens = tonumber(state[2]) or tpm
+local elapsed = math.max(0, now - (tonumber(state[3]) or now))
+local wait = 0
+if rpm > 0 then
+    requests = math.min(rpm, requests + elapsed * rpm / 60) - tonumber(ARGV[3])
+    if requests < 0 then wait = math.max(wait, -requests * 60 / rpm) end
+end
+if tpm > 0 then
+    tokens = math.min(tpm, tokens + elapsed * tpm / 60) - tonumber(ARGV[4])
+    if tokens < 0 then wait = math.max(wait, -tokens * 60 / tpm) end
+end
+redis.call('HSET', KEYS[1], 'requests', tostring(requests), 'tokens', tostring(tokens), 'ts', tostring(now))
+-- Ключ живет, пока долг не погашен и ведро не наполнилось (минута пополнения):
+-- после этого отсутствие ключа равносильно полному ведру
+redis.call('EXPIRE', KEYS[1], math.ceil(wait) + 60)
+return tostring(wait)
+"""
+
+# Текущий уровень ведра с учетом пополнения (без резервирования)
+PEEK_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local rpm = tonumber(ARGV[1])
+local tpm = tonumber(ARGV[2])
+local state = redis.call('HMGET', KEYS[1], 'requests', 'tokens', 'ts')
+local elapsed = math.max(0, now - (tonumber(state[3]) or now))
+local requests = math.min(rpm, (tonumber(state[1]) or rpm) + elapsed * rpm / 60)
+local tokens = math.min(tpm, (tonumber(state[2]) or tpm) + elapsed * tpm / 60)
+return {tostring(requests), tostring(tokens)}
+"""
+
+_clients = {}
+
+
+def get_redis(url=None):
+    """Синхронный клиент Redis (один на URL в процессе)"""
+    url = url or settings.CELERY_BROKER_URL
+    if url not in _clients:
+        _clients[url] = redis.from_url(url)
+    return _clients[url]
+
+
+def estimate_tokens(text, overhead=0):
+    """
+    Грубая оценка токенов запроса
+
+    Для русского текста в среднем ~3 символа на токен; overhead учитывает
+    инструкции агента, результаты поиска и ответ.
+    """
+    return overhead + math.ceil(len(text) / 3)
+
+
+class RateLimiter:
+    """Token bucket одной модели, общий для всех воркеров"""
+
+    def __init__(self, name, rpm=0, tpm=0, redis_url=None):
+        """
+        Args:
+            name: имя ведра (обычно модель)
+            rpm: лимит запросов в минуту (0 — без лимита)
+            tpm: лимит токенов в минуту (0 — без лимита)
+            redis_url: Redis, по умолчанию CELERY_BROKER_URL
+        """
+        self.name = name
+        self.key = f'ratelimit:{name}'
+        self.rpm = rpm
+        self.tpm = tpm
+        self.redis_url = redis_url or settings.CELERY_BROKER_URL
+        self._async_client = None
+        self._async_loop = None
+
+    @property
+    def enabled(self):
+        return bool(self.rpm or self.tpm)
+
+    def _args(self, tokens):
+        return [self.rpm, self.tpm, 1, tokens]
+
+    def reserve(self, tokens=0):
+        """Резервирует один запрос и tokens токенов, возвращает время ожидания"""
+        if not self.enabled:
+            return 0.0
+        try:
+            client = get_redis(self.redis_url)
+            return float(client.eval(ACQUIRE_SCRIPT, 1, self.key, *self._args(tokens)))
+        except redis.RedisError as exc:
+            # Без Redis не блокируем обработку: провайдер сам ограничит запросы
+            logger.warning(f"Ограничитель {self.name} недоступен: {exc}")
+            return 0.0
+
+    def acquire(self, tokens=0):
+        """Ждет, пока ведро позволит выполнить запрос (синхронно)"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def aacquire(self, tokens=0):
+        """Ждет, пока ведро позволит выполнить запрос (в событийном цикле)"""
+        if not self.enabled:
+            return 0.0
+        try:
+            client = self._get_async_client()
+            wait = float(await client.eval(ACQUIRE_SCRIPT, 1, self.key, *self._args(tokens)))
+        except redis.RedisError as exc:
+            logger.warning(f"Ограничитель {self.name} недоступен: {exc}")
+            return 0.0
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def _get_async_client(self):
+        """Асинхронный клиент привязан к циклу, в котором создан"""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            self._async_client = redis.asyncio.from_url(self.redis_url)
+            self._async_loop = loop
+        return self._async_client
+
+    def saturation(self):
+        """
+        Загруженность ведра: 0 — свободно, 1 — исчерпано, >1 — есть очередь
+
+        Returns:
+            {'requests': ..., 'tokens': ...} по включенным лимитам
+        """
+        rpm = self.rpm or 1
+        tpm = self.tpm or 1
+        requests, tokens = get_redis(self.redis_url).eval(PEEK_SCRIPT, 1, self.key, rpm, tpm)
+
+        result = {}
+        if self.rpm:
+            result['requests'] = round(1 - float(requests) / self.rpm, 3)
+        if self.tpm:
+            result['tokens'] = round(1 - float(tokens) / self.tpm, 3)
+        return result
+
+
+def get_limiters():
+    """Ограничители из настроек бэкендов классификации (для health/метрик)"""
+    limiters = []
+    for name, options in getattr(settings, 'PROCESSING_CLASSIFIER_OPTIONS', {}).items():
+        if options.get('rpm') or options.get('tpm'):
+            limiters.append(RateLimiter(
+                options.get('model', name),
+                rpm=options.get('rpm', 0),
+                tpm=options.get('tpm', 0),
+            ))
+    return limiters
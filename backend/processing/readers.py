@@ -0,0 +1,129 @@
+"""
+Потоковое чтение загруженных файлов
+
+Файл не загружается в память целиком: строки читаются по одной и
+отдаются пакетами фиксированного размера, поэтому потребление памяти
+воркером не зависит от размера файла.
+"""
+
+import itertools
+import os
+
+import openpyxl
+import pandas as pd
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+
+def resolve_path(file_path):
+    """Путь к файлу на диске (абсолютный или относительно хранилища)"""
+    if os.path.exists(file_path):
+        return file_path
+    return default_storage.path(file_path)
+
+
+def get_max_rows():
+    """Максимальное количество строк в файле из настроек"""
+    return getattr(settings, 'PROCESSING_MAX_ROWS', 100000)
+
+
+def _clean(value):
+    """Приводит значение ячейки к строке, пустые ячейки — к ''"""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value != value:  # NaN
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def _batches(header, rows, batch_size):
+    """Собирает строки-кортежи в пакеты словарей по заголовку"""
+    header = [_clean(name) for name in header]
+    batch = []
+    for values in rows:
+        if values is None or all(_clean(value) == '' for value in values):
+            continue
+        batch.append(dict(zip(header, (_clean(value) for value in values))))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _iter_xlsx(path, batch_size):
+    """Чтение .xlsx через openpyxl в режиме read-only (потоково)"""
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        # В read-only режиме openpyxl верит сохраненному <dimension>, а многие
+        # выгрузки пишут его устаревшим (A1:C1) — без сброса строки теряются
+        sheet.reset_dimensions()
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        yield from _batches(header, rows, batch_size)
+    finally:
+        workbook.close()
+
+
+def _iter_csv(path, batch_size):
+    """Чтение CSV кусками по batch_size строк"""
+    reader = pd.read_csv(
+        path,
+        chunksize=batch_size,
+        dtype=str,
+        keep_default_na=False,
+        encoding='utf-8-sig',
+    )
+    with reader:
+        chunks = iter(reader)
+        first = next(chunks, None)
+        if first is None:
+            return
+        rows = itertools.chain.from_iterable(
+            chunk.itertuples(index=False, name=None)
+            for chunk in itertools.chain([first], chunks)
+        )
+        yield from _batches(first.columns, rows, batch_size)
+
+
+def _iter_xls(path, batch_size):
+    """
+    Чтение старого формата .xls
+
+    xlrd не умеет потоковое чтение, но .xls ограничен 65536 строками,
+    поэтому файл читается целиком и отдается теми же пакетами.
+    """
+    df = pd.read_excel(path, dtype=str, keep_default_na=False)
+    yield from _batches(df.columns, df.itertuples(index=False, name=None), batch_size)
+
+
+def iter_row_batches(file_path, batch_size):
+    """
+    Генератор пакетов строк файла
+
+    Args:
+        file_path: путь к .xlsx/.xls/.csv файлу
+        batch_size: максимальное количество строк в пакете
+
+    Yields:
+        Списки словарей {название колонки: значение}
+    """
+    path = resolve_path(file_path)
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == '.xlsx':
+        yield from _iter_xlsx(path, batch_size)
+    elif extension == '.xls':
+        yield from _iter_xls(path, batch_size)
+    else:
+        yield from _iter_csv(path, batch_size)
+
+
+def count_rows(file_path, batch_size=1000):
+    """Количество строк с данными (отдельный потоковый проход по файлу)"""
+    return sum(len(batch) for batch in iter_row_batches(file_path, batch_size))
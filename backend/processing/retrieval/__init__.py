@@ -0,0 +1,52 @@
+"""
+Локальный поиск HS кодов без сети
+
+Векторный индекс (index.VectorIndex) ищет по эмбеддингам, лексический
+(lexical.LexicalIndex) — по BM25 над словами описаний HS кодов.
+
+Эмбеддер выбирается настройкой PROCESSING_EMBEDDER: имя из реестра
+('hashing') или путь к классу. Параметры эмбеддера берутся из
+PROCESSING_EMBEDDER_OPTIONS[имя].
+"""
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .embedders import BaseEmbedder, HashingEmbedder
+from .index import VectorIndex, get_vector_index, publish_index, reset_vector_index
+from .lexical import LexicalIndex, get_lexical_index, reset_lexical_index
+
+_registry = {}
+
+
+def register(embedder_class):
+    """Регистрирует класс эмбеддера под его именем (можно как декоратор)"""
+    _registry[embedder_class.name] = embedder_class
+    return embedder_class
+
+
+register(HashingEmbedder)
+
+
+def get_embedder_class(name):
+    """Класс эмбеддера по имени из реестра или пути к классу"""
+    return _registry.get(name) or import_string(name)
+
+
+def get_embedder(name=None):
+    """
+    Новый эмбеддер для построения индекса
+
+    Args:
+        name: имя эмбеддера или путь к классу, по умолчанию PROCESSING_EMBEDDER
+    """
+    name = name or getattr(settings, 'PROCESSING_EMBEDDER', 'hashing')
+    options = getattr(settings, 'PROCESSING_EMBEDDER_OPTIONS', {}).get(name, {})
+    return get_embedder_class(name)(**options)
+
+
+__all__ = [
+    'BaseEmbedder', 'HashingEmbedder', 'LexicalIndex', 'VectorIndex',
+    'get_embedder', 'get_embedder_class', 'get_lexical_index', 'get_vector_index',
+    'publish_index', 'register', 'reset_lexical_index', 'reset_vector_index',
+]
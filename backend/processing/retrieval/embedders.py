@@ -0,0 +1,125 @@
+"""
+Эмбеддеры текстов для локального индекса HS кодов
+
+Эмбеддер превращает пакет текстов в матрицу float32 (строки нормированы
+по L2), поэтому косинусная близость — обычное скалярное произведение.
+Состояние обученного эмбеддера (например, веса IDF) сохраняется вместе
+с индексом через state()/from_state().
+"""
+
+import zlib
+
+import numpy as np
+
+from ..cache import normalize_description
+
+
+class BaseEmbedder:
+    """Эмбеддер текстов"""
+
+    # Имя в реестре (PROCESSING_EMBEDDER)
+    name = None
+
+    def __init__(self, **options):
+        self.options = options
+
+    @property
+    def dim(self):
+        """Размерность вектора"""
+        raise NotImplementedError
+
+    def fit(self, texts):
+        """Обучение на корпусе индекса (по умолчанию не требуется)"""
+        return self
+
+    def embed(self, texts):
+        """Матрица (len(texts), dim) float32 с нормированными строками"""
+        raise NotImplementedError
+
+    def state(self):
+        """Параметры и массивы, необходимые для восстановления эмбеддера"""
+        return {'options': self.options, 'arrays': {}}
+
+    @classmethod
+    def from_state(cls, options, arrays):
+        """Восстанавливает эмбеддер из state()"""
+        return cls(**options)
+
+
+def normalize_rows(matrix):
+    """Нормирует строки матрицы по L2 (нулевые строки остаются нулевыми)"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    matrix /= norms
+    return matrix
+
+
+class HashingEmbedder(BaseEmbedder):
+    """
+    Hashing trick по словам и символьным n-граммам с весами TF-IDF
+
+    Не требует сети и словаря: признак (слово или n-грамма слова с
+    границами) хешируется crc32 в одну из dim корзин со знаком. N-граммы
+    делают поиск устойчивым к падежным окончаниям ("брюки"/"брюк").
+    fit() считает IDF по корзинам на корпусе индекса.
+    """
+
+    name = 'hashing'
+
+    def __init__(self, dim=256, ngram_min=3, ngram_max=4, idf=None, **options):
+        super().__init__(dim=dim, ngram_min=ngram_min, ngram_max=ngram_max, **options)
+        self._dim = dim
+        self.ngram_range = (ngram_min, ngram_max)
+        self.idf = idf
+
+    @property
+    def dim(self):
+        return self._dim
+
+    def features(self, text):
+        """Слова и символьные n-граммы нормализованного текста"""
+        features = []
+        low, high = self.ngram_range
+        for word in normalize_description(text).split():
+            features.append(word)
+            padded = f'<{word}>'
+            for size in range(low, high + 1):
+                features.extend(padded[start:start + size] for start in range(len(padded) - size + 1))
+        return features
+
+    def buckets(self, text):
+        """Номера корзин и знаки признаков текста"""
+        hashes = np.fromiter(
+            (zlib.crc32(feature.encode('utf-8')) for feature in self.features(text)),
+            dtype=np.uint64,
+        )
+        signs = np.where(hashes & (1 << 31), -1.0, 1.0).astype(np.float32)
+        return (hashes % self._dim).astype(np.intp), signs
+
+    def fit(self, texts):
+        document_frequency = np.zeros(self._dim, dtype=np.float32)
+        count = 0
+        for text in texts:
+            buckets, _ = self.buckets(text)
+            document_frequency[np.unique(buckets)] += 1
+            count += 1
+        self.idf = (np.log((1 + count) / (1 + document_frequency)) + 1).astype(np.float32)
+        return self
+
+    def embed(self, texts):
+        texts = list(texts)
+        matrix = np.zeros((len(texts), self._dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            buckets, signs = self.buckets(text)
+            np.add.at(matrix[row], buckets, signs)
+        if self.idf is not None:
+            matrix *= self.idf
+        return normalize_rows(matrix)
+
+    def state(self):
+        arrays = {'idf': self.idf} if self.idf is not None else {}
+        return {'options': self.options, 'arrays': arrays}
+
+    @classmethod
+    def from_state(cls, options, arrays):
+        return cls(idf=arrays.get('idf'), **options)
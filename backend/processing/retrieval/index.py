@@ -0,0 +1,248 @@
+"""
+Локальный векторный индекс HS кодов
+
+Эмбеддинги описаний HS кодов хранятся одной матрицей NumPy (n, dim);
+поиск top-k — одно матричное умножение и argpartition, без сети.
+
+Индекс строится по таблице HSCode командой build_hs_index и
+публикуется версией в PROCESSING_INDEX_DIR:
+
+    hs_index/
+        CURRENT                        имя текущей версии
+        20250701120000123456-1a2b3c/   matrix.npy, ids.npy, codes.npy, meta.json
+
+Массивы открываются через mmap, поэтому все процессы воркера делят одни
+страницы файла в page cache, а не держат по копии матрицы. Публикация
+новой версии — запись каталога и атомарная замена CURRENT; процессы
+замечают ее не позже чем через PROCESSING_INDEX_CHECK_INTERVAL секунд
+и переключаются без перезапуска.
+"""
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+from django.conf import settings
+
+from core.models import HSCode
+
+logger = logging.getLogger(__name__)
+
+
+def hs_code_text(description, category, subcategory):
+    """Текст HS кода, по которому строится эмбеддинг"""
+    return ' '.join(part for part in (description, category, subcategory) if part)
+
+
+class VectorIndex:
+    """Матрица эмбеддингов HS кодов с косинусным поиском"""
+
+    def __init__(self, matrix, ids, codes, embedder):
+        """
+        Args:
+            matrix: float32 (n, dim), строки нормированы по L2
+            ids: id HSCode для строк матрицы
+            codes: коды для строк матрицы
+            embedder: эмбеддер, которым построена матрица
+        """
+        self.matrix = matrix
+        self.ids = ids
+        self.codes = codes
+        self.embedder = embedder
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, embedder, queryset=None):
+        """Строит индекс по активным HS кодам"""
+        queryset = queryset if queryset is not None else HSCode.objects.filter(is_active=True)
+        rows = list(queryset.order_by('id').values_list('id', 'code', 'description', 'category', 'subcategory'))
+        texts = [hs_code_text(*row[2:]) for row in rows]
+        embedder.fit(texts)
+        return cls(
+            matrix=embedder.embed(texts),
+            ids=np.array([row[0] for row in rows], dtype=np.int64),
+            codes=np.array([row[1] for row in rows], dtype='U10'),
+            embedder=embedder,
+        )
+
+    def search(self, text, k=5):
+        """
+        Ближайшие HS коды к описанию товара
+
+        Returns:
+            [{'id': ..., 'code': ..., 'score': ...}, ...] по убыванию score
+        """
+        return self.search_many([text], k)[0]
+
+    def search_many(self, texts, k=5):
+        """Поиск top-k для пакета описаний одним матричным умножением"""
+        if not len(self) or not texts:
+            return [[] for _ in texts]
+
+        scores = self.embedder.embed(texts) @ self.matrix.T
+        k = min(k, len(self))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        return [
+            [
+                {'id': int(self.ids[column]), 'code': str(self.codes[column]), 'score': float(score)}
+                for column, score in zip(columns, row_scores)
+            ]
+            for columns, row_scores in zip(top, top_scores)
+        ]
+
+    def save(self, directory):
+        """Записывает массивы индекса в каталог (.npy) и метаданные в meta.json"""
+        state = self.embedder.state()
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, 'matrix.npy'), np.ascontiguousarray(self.matrix, dtype=np.float32))
+        np.save(os.path.join(directory, 'ids.npy'), self.ids)
+        np.save(os.path.join(directory, 'codes.npy'), self.codes)
+        for name, array in state['arrays'].items():
+            np.save(os.path.join(directory, f'embedder_{name}.npy'), array)
+        meta = {
+            'embedder': self.embedder.name,
+            'options': state['options'],
+            'arrays': sorted(state['arrays']),
+            'count': len(self),
+        }
+        with open(os.path.join(directory, 'meta.json'), 'w', encoding='utf-8') as output:
+            json.dump(meta, output, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """
+        Открывает индекс, записанный save()
+
+        Args:
+            directory: каталог версии индекса
+            mmap: открыть матрицу через mmap (общие страницы для всех процессов)
+                вместо чтения в память процесса
+        """
+        from . import get_embedder_class
+
+        mmap_mode = 'r' if mmap else None
+        with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as source:
+            meta = json.load(source)
+        arrays = {
+            name: np.load(os.path.join(directory, f'embedder_{name}.npy'))
+            for name in meta['arrays']
+        }
+        embedder = get_embedder_class(meta['embedder']).from_state(meta['options'], arrays)
+        return cls(
+            matrix=np.load(os.path.join(directory, 'matrix.npy'), mmap_mode=mmap_mode),
+            ids=np.load(os.path.join(directory, 'ids.npy'), mmap_mode=mmap_mode),
+            codes=np.load(os.path.join(directory, 'codes.npy'), mmap_mode=mmap_mode),
+            embedder=embedder,
+        )
+
+
+POINTER = 'CURRENT'
+
+
+def get_index_dir():
+    return str(getattr(settings, 'PROCESSING_INDEX_DIR', ''))
+
+
+def current_version(root=None):
+    """Имя опубликованной версии индекса или None"""
+    root = root or get_index_dir()
+    try:
+        with open(os.path.join(root, POINTER), encoding='utf-8') as pointer:
+            return pointer.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def publish_index(index, root=None, keep=2):
+    """
+    Публикует индекс новой версией и атомарно переключает CURRENT
+
+    Args:
+        index: VectorIndex
+        root: каталог индекса, по умолчанию PROCESSING_INDEX_DIR
+        keep: сколько последних версий оставить на диске (старые удаляются;
+            процессы, которые еще держат их через mmap, дочитают их спокойно)
+
+    Returns:
+        Имя опубликованной версии
+    """
+    root = root or get_index_dir()
+    os.makedirs(root, exist_ok=True)
+    # Имена версий сортируются в порядке публикации
+    version = f"{datetime.now().strftime('%Y%m%d%H%M%S%f')}-{uuid.uuid4().hex[:6]}"
+
+    # Версия целиком пишется во временный каталог и появляется одним rename
+    staging = tempfile.mkdtemp(dir=root, prefix='.staging-')
+    os.chmod(staging, 0o755)
+    index.save(staging)
+    os.rename(staging, os.path.join(root, version))
+
+    with tempfile.NamedTemporaryFile('w', dir=root, prefix='.pointer-', delete=False) as pointer:
+        pointer.write(version)
+    os.chmod(pointer.name, 0o644)
+    os.replace(pointer.name, os.path.join(root, POINTER))
+
+    versions = sorted(name for name in os.listdir(root) if not name.startswith('.') and name != POINTER)
+    for name in versions[:-keep] if keep else []:
+        if name != version:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+    return version
+
+
+_index = None
+_index_version = None
+_checked_at = 0.0
+
+
+def get_vector_index():
+    """
+    Текущая версия индекса (одна на процесс) или None, если не построен
+
+    Указатель CURRENT проверяется не чаще раза в
+    PROCESSING_INDEX_CHECK_INTERVAL секунд; новая версия открывается
+    без перезапуска процесса.
+    """
+    global _index, _index_version, _checked_at
+    now = time.monotonic()
+    if _index is not None and now - _checked_at < getattr(settings, 'PROCESSING_INDEX_CHECK_INTERVAL', 5.0):
+        return _index
+    _checked_at = now
+
+    root = get_index_dir()
+    version = current_version(root)
+    if version is None:
+        if _index is None:
+            logger.warning(f"Векторный индекс HS кодов не найден: {root}")
+        return _index
+
+    if version != _index_version:
+        try:
+            _index = VectorIndex.load(os.path.join(root, version))
+            _index_version = version
+            logger.info(f"Открыт векторный индекс HS кодов {version}: {len(_index)} кодов")
+        except OSError as exc:
+            # Версию могли удалить между чтением CURRENT и открытием — остаемся на прежней
+            logger.warning(f"Не удалось открыть векторный индекс {version}: {exc}")
+    return _index
+
+
+def reset_vector_index():
+    """Сбрасывает открытый индекс (следующий вызов перечитает CURRENT)"""
+    global _index, _index_version, _checked_at
+    _index = None
+    _index_version = None
+    _checked_at = 0.0
@@ -0,0 +1,195 @@
+"""
+Лексический поиск HS кодов (BM25)
+
+Инвертированный индекс по description/category/subcategory HS кодов:
+терм -> (номера документов, веса BM25). Веса посчитаны при построении,
+поэтому запрос — сложение нескольких коротких массивов и top-k, без
+матрицы по всей номенклатуре. Индекс строится в памяти процесса из
+справочника HS кодов (core.registry) и перестраивается, когда
+справочник перезагружается.
+
+Токенизация учитывает русский язык: нормализация описания (как у кэша
+классификации), стоп-слова и отсечение окончаний, чтобы "брюки",
+"брюк" и "брючные" давали общую основу.
+"""
+
+import math
+from collections import defaultdict
+
+import numpy as np
+
+from core.registry import get_hs_code_registry
+
+from ..cache import normalize_description
+from .index import hs_code_text
+
+STOPWORDS = {
+    'и', 'в', 'во', 'на', 'с', 'со', 'по', 'из', 'для', 'без', 'или', 'не', 'от', 'до',
+    'к', 'ко', 'о', 'об', 'за', 'при', 'под', 'над', 'а', 'но', 'их', 'его', 'ее',
+    'прочие', 'прочий', 'прочая', 'прочее', 'кроме', 'того', 'также', 'виде',
+}
+
+# Окончания прилагательных, существительных и причастий, от длинных к коротким
+SUFFIXES = sorted(
+    {
+        'иями', 'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими',
+        'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ый', 'ий', 'ой', 'ей', 'ых', 'их',
+        'ым', 'им', 'ом', 'ем', 'ую', 'юю', 'ов', 'ев', 'ах', 'ях', 'ам', 'ям',
+        'ию', 'ия', 'ье', 'ья', 'а', 'я', 'ы', 'и', 'е', 'о', 'у', 'ю', 'ь', 'й',
+    },
+    key=len,
+    reverse=True,
+)
+MIN_STEM = 3
+
+
+def stem(word):
+    """Отсекает окончание русского слова, оставляя основу не короче MIN_STEM"""
+    if len(word) <= MIN_STEM + 1 or not ('а' <= word[-1] <= 'я'):
+        return word
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text):
+    """Термы текста: нормализованные слова без стоп-слов, приведенные к основе"""
+    return [
+        stem(word)
+        for word in normalize_description(text).split()
+        if word not in STOPWORDS and (len(word) > 1 or word.isdigit())
+    ]
+
+
+class LexicalIndex:
+    """Инвертированный индекс BM25 по HS кодам"""
+
+    def __init__(self, ids, codes, descriptions, postings):
+        """
+        Args:
+            ids, codes, descriptions: HS коды в порядке номеров документов
+            postings: терм -> (номера документов int32, веса BM25 float32)
+        """
+        self.ids = ids
+        self.codes = codes
+        self.descriptions = descriptions
+        self.postings = postings
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, ids, codes, texts, descriptions=None, k1=1.2, b=0.75):
+        """Строит индекс по текстам HS кодов"""
+        documents = [tokenize(text) for text in texts]
+        lengths = np.array([len(terms) for terms in documents], dtype=np.float32)
+        average_length = float(lengths.mean()) if len(documents) else 0.0
+
+        frequencies = defaultdict(dict)
+        for number, terms in enumerate(documents):
+            for term in terms:
+                frequencies[term][number] = frequencies[term].get(number, 0) + 1
+
+        count = len(documents)
+        postings = {}
+        for term, by_document in frequencies.items():
+            numbers = np.fromiter(by_document.keys(), dtype=np.int32, count=len(by_document))
+            tf = np.fromiter(by_document.values(), dtype=np.float32, count=len(by_document))
+            idf = math.log(1 + (count - len(numbers) + 0.5) / (len(numbers) + 0.5))
+            norm = k1 * (1 - b + b * lengths[numbers] / (average_length or 1))
+            postings[term] = (numbers, (idf * tf * (k1 + 1) / (tf + norm)).astype(np.float32))
+
+        return cls(list(ids), list(codes), list(descriptions or texts), postings)
+
+    @classmethod
+    def from_registry(cls, registry=None):
+        """Индекс по активным записям справочника HS кодов"""
+        registry = registry or get_hs_code_registry()
+        entries = [entry for entry in registry.entries() if entry.is_active]
+        return cls.build(
+            ids=[entry.id for entry in entries],
+            codes=[entry.code for entry in entries],
+            texts=[hs_code_text(entry.description, entry.category, entry.subcategory) for entry in entries],
+            descriptions=[entry.description for entry in entries],
+        )
+
+    def search(self, text, k=5):
+        """
+        Кандидаты HS кодов для описания товара
+
+        Returns:
+            [{'id': ..., 'code': ..., 'description': ..., 'score': ..., 'matched': ...}, ...]
+            по убыванию score (matched — сколько термов запроса есть в
+            описании кода); пусто, если ни один терм не найден
+        """
+        found = [self.postings[term] for term in set(tokenize(text)) if term in self.postings]
+        if not found:
+            return []
+
+        if len(found) == 1:
+            numbers, scores = found[0]
+            matched = np.ones(len(numbers), dtype=np.int64)
+        else:
+            # Сумма весов по документам без сортировки: плотный массив на всю номенклатуру
+            concatenated = np.concatenate([item[0] for item in found])
+            scores = np.bincount(
+                concatenated,
+                weights=np.concatenate([item[1] for item in found]),
+                minlength=len(self),
+            )
+            numbers = np.flatnonzero(scores)
+            scores = scores[numbers]
+            matched = np.bincount(concatenated, minlength=len(self))[numbers]
+
+        if len(numbers) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(numbers))
+        top = top[np.argsort(-scores[top], kind='stable')]
+
+        return [
+            {
+                'id': self.ids[numbers[position]],
+                'code': self.codes[numbers[position]],
+                'description': self.descriptions[numbers[position]],
+                'score': float(scores[position]),
+                'matched': int(matched[position]),
+            }
+            for position in top
+        ]
+
+    def max_score(self, text):
+        """
+        Наибольший достижимый score запроса: сумма наибольших весов его
+        термов (код, описание которого содержит все термы запроса)
+        """
+        return float(sum(
+            self.postings[term][1].max() for term in set(tokenize(text)) if term in self.postings
+        ))
+
+
+_index = None
+_registry_loads = None
+
+
+def get_lexical_index():
+    """
+    Индекс BM25 текущего процесса
+
+    Перестраивается, когда справочник HS кодов перезагрузился (изменились
+    HSCode). Может обратиться к БД, поэтому вызывается вне событийного цикла.
+    """
+    global _index, _registry_loads
+    registry = get_hs_code_registry()
+    registry.ensure_fresh()
+    if _index is None or _registry_loads != registry.loads:
+        _index = LexicalIndex.from_registry(registry)
+        _registry_loads = registry.loads
+    return _index
+
+
+def reset_lexical_index():
+    global _index, _registry_loads
+    _index = None
+    _registry_loads = None
@@ -0,0 +1,294 @@
+"""
+Планировщик задач обработки: приоритеты и справедливость между пользователями
+
+Загруженный файл не отправляется в Celery сразу, а ждет в статусе
+pending (dispatched_at пусто). Планировщик выпускает задачи в очереди
+Celery, соблюдая лимиты:
+
+- одновременно выполняется не больше PROCESSING_MAX_ACTIVE_TASKS задач
+  (примерно число процессов воркеров), остальные ждут в БД, а не в
+  очереди брокера, где их порядок уже не поменять;
+- у одного пользователя не больше PROCESSING_MAX_TASKS_PER_USER задач;
+- свободные места раздаются по кругу: сначала пользователям, которые
+  дольше всех не получали места, по одной задаче за круг, поэтому
+  десять больших файлов одного пользователя не задерживают остальных.
+
+Приоритет задачи зависит от размера файла и группы пользователя:
+маленькие файлы — 'high', большие — 'bulk', пользователи группы
+PROCESSING_PRIORITY_GROUP поднимаются на уровень выше. Приоритет
+определяет очередь Celery (QUEUES) и порядок внутри круга; воркер
+читает очереди в порядке приоритета (-Q processing.high,processing,...).
+
+Планировщик запускается при загрузке файла, при завершении любой
+задачи (dispatch_tasks), поэтому освободившееся место сразу занимается,
+и по расписанию Celery beat раз в PROCESSING_DISPATCH_INTERVAL секунд.
+Если блокировку планировщика держит другой процесс, запуск
+откладывается на RETRY_COUNTDOWN секунд, а не теряется.
+
+Место задачи, воркер которой пропал (процесс убит, сообщение потеряно),
+возвращается: задача без признаков жизни (updated_at, его сдвигает и
+запись прогресса) дольше PROCESSING_STALE_TASK_MINUTES минут снова
+становится ожидающей и запускается заново с контрольной точки.
+Запуск получает id задачи Celery заранее (celery_task_id), поэтому
+устаревшая доставка той же задачи завершается, ничего не делая.
+"""
+
+import logging
+from collections import Counter
+from datetime import timedelta
+from typing import NamedTuple
+
+from celery.utils import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Max
+from django.utils import timezone
+
+from core.models import ProcessingTask
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_HIGH, PRIORITY_DEFAULT, PRIORITY_BULK = 0, 1, 2
+
+# Очередь Celery для каждого приоритета
+QUEUES = {
+    PRIORITY_HIGH: 'processing.high',
+    PRIORITY_DEFAULT: 'processing',
+    PRIORITY_BULK: 'processing.bulk',
+}
+
+LOCK_KEY = 'scheduler:dispatch'
+LOCK_TIMEOUT = 30
+
+# Повторный запуск, когда блокировка занята: один отложенный запуск на все
+# процессы; ключ истекает раньше, чем запуск выполнится, и тот может отложиться снова
+RETRY_KEY = 'scheduler:dispatch:retry'
+RETRY_COUNTDOWN = 2
+
+
+class Job(NamedTuple):
+    """Ожидающая задача с точки зрения планировщика"""
+
+    id: int
+    user_id: int
+    priority: int
+    created: object
+
+
+def plan(pending, active, slots, per_user, last_dispatched):
+    """
+    Выбирает задачи для запуска (чистая функция, без БД)
+
+    Args:
+        pending: ожидающие Job в порядке создания
+        active: Counter user_id -> выполняющихся задач
+        slots: сколько задач можно запустить сейчас
+        per_user: лимит выполняющихся задач пользователя (0 — без лимита)
+        last_dispatched: user_id -> когда пользователь последний раз получил
+            место (сортируемое значение; у новых пользователей нет записи)
+
+    Returns:
+        Job в порядке запуска
+    """
+    queues = {}
+    for job in sorted(pending, key=lambda job: (job.priority, job.created)):
+        queues.setdefault(job.user_id, []).append(job)
+
+    # Место в круге: кто дольше не получал места (или никогда), тот раньше
+    order = sorted(queues, key=lambda user_id: (
+        last_dispatched.get(user_id) is not None, last_dispatched.get(user_id) or 0
+    ))
+    rank = {user_id: position for position, user_id in enumerate(order)}
+
+    active = Counter(active)
+    chosen = []
+    while slots > 0 and queues:
+        # Круг: по одной лучшей задаче от каждого пользователя ниже лимита
+        candidates = [
+            jobs[0] for user_id, jobs in queues.items()
+            if not per_user or active[user_id] < per_user
+        ]
+        if not candidates:
+            break
+        candidates.sort(key=lambda job: (job.priority, rank[job.user_id], job.created))
+        for job in candidates[:slots]:
+            chosen.append(job)
+            active[job.user_id] += 1
+            # Получивший место уходит в конец круга
+            rank[job.user_id] = len(rank) + len(chosen)
+            queues[job.user_id].pop(0)
+            if not queues[job.user_id]:
+                del queues[job.user_id]
+        slots -= min(slots, len(candidates))
+    return chosen
+
+
+def get_priority(file_size, priority_user=False):
+    """Приоритет задачи по размеру файла (байты) и группе пользователя"""
+    small = getattr(settings, 'PROCESSING_SMALL_FILE_MB', 1) * 1024 * 1024
+    large = getattr(settings, 'PROCESSING_LARGE_FILE_MB', 10) * 1024 * 1024
+    if file_size <= small:
+        priority = PRIORITY_HIGH
+    elif file_size >= large:
+        priority = PRIORITY_BULK
+    else:
+        priority = PRIORITY_DEFAULT
+    if priority_user:
+        priority = max(PRIORITY_HIGH, priority - 1)
+    return priority
+
+
+def is_priority_user(user):
+    group = getattr(settings, 'PROCESSING_PRIORITY_GROUP', '')
+    return bool(group) and user.groups.filter(name=group).exists()
+
+
+def submit(task, file_size):
+    """
+    Ставит задачу в очередь планировщика и сразу пробует запустить
+
+    Args:
+        task: ProcessingTask в статусе pending
+        file_size: размер загруженного файла в байтах
+    """
+    task.priority = get_priority(file_size, is_priority_user(task.user))
+    task.save(update_fields=['priority', 'updated_at'])
+    return dispatch()
+
+
+def dispatch():
+    """
+    Запускает ожидающие задачи, на которые есть место
+
+    Один планировщик на все процессы (блокировка в кэше
+    PROCESSING_SCHEDULER_ALIAS); если блокировку держит другой процесс,
+    вызов откладывается: он мог уже посчитать задачу, место которой
+    освободилось после этого.
+
+    Returns:
+        Список id запущенных задач
+    """
+    lock = _acquire_lock()
+    if lock is False:
+        _retry_later()
+        return []
+    try:
+        reclaim_stale()
+        # При синхронном выполнении (CELERY_TASK_ALWAYS_EAGER) задачи завершаются
+        # внутри _dispatch, и места освобождаются сразу — запускаем следующие
+        dispatched = []
+        while True:
+            started = _dispatch()
+            if not started:
+                return dispatched
+            dispatched.extend(started)
+    finally:
+        if lock is not None:
+            lock.delete(LOCK_KEY)
+
+
+def _dispatch():
+    from .tasks import process_file_task
+
+    max_active = getattr(settings, 'PROCESSING_MAX_ACTIVE_TASKS', 0)
+    per_user = getattr(settings, 'PROCESSING_MAX_TASKS_PER_USER', 0)
+
+    active = Counter(
+        ProcessingTask.objects.filter(
+            dispatched_at__isnull=False, status__in=['pending', 'processing']
+        ).values_list('user_id', flat=True)
+    )
+    pending = [
+        Job(*row) for row in ProcessingTask.objects.filter(
+            status='pending', dispatched_at__isnull=True
+        ).order_by('created_at').values_list('id', 'user_id', 'priority', 'created_at')
+    ]
+    if not pending:
+        return []
+
+    slots = max_active - sum(active.values()) if max_active else len(pending)
+    last_dispatched = dict(
+        ProcessingTask.objects.filter(
+            user_id__in={job.user_id for job in pending}, dispatched_at__isnull=False
+        ).values('user_id').annotate(last=Max('dispatched_at')).values_list('user_id', 'last')
+    )
+
+    dispatched = []
+    for job in plan(pending, active, slots, per_user, last_dispatched):
+        now = timezone.now()
+        celery_task_id = uuid()
+        # Задачу могли отменить или запустить параллельно
+        if not ProcessingTask.objects.filter(
+            pk=job.id, status='pending', dispatched_at__isnull=True
+        ).update(dispatched_at=now, celery_task_id=celery_task_id, updated_at=now):
+            continue
+        try:
+            process_file_task.apply_async(args=[job.id], queue=QUEUES[job.priority], task_id=celery_task_id)
+        except Exception as exc:
+            # Сообщение не ушло брокеру — место не занято, задача ждет следующего запуска
+            logger.error(f"Задача {job.id} не передана в Celery: {exc}")
+            ProcessingTask.objects.filter(pk=job.id, celery_task_id=celery_task_id).update(
+                dispatched_at=None, celery_task_id=None, updated_at=timezone.now()
+            )
+            continue
+        dispatched.append(job.id)
+
+    if dispatched:
+        logger.info(f"Планировщик запустил задачи {dispatched}, ожидают {len(pending) - len(dispatched)}")
+    return dispatched
+
+
+def reclaim_stale():
+    """
+    Возвращает в ожидание запущенные задачи без признаков жизни
+
+    Returns:
+        Список id возвращенных задач
+    """
+    from .status import publish_status
+
+    minutes = getattr(settings, 'PROCESSING_STALE_TASK_MINUTES', 30)
+    if not minutes:
+        return []
+    stale = ProcessingTask.objects.filter(
+        dispatched_at__isnull=False, status__in=['pending', 'processing'],
+        updated_at__lt=timezone.now() - timedelta(minutes=minutes),
+    )
+    reclaimed = list(stale.values_list('id', flat=True))
+    if not reclaimed:
+        return []
+    ProcessingTask.objects.filter(pk__in=reclaimed).update(
+        status='pending', dispatched_at=None, celery_task_id=None, updated_at=timezone.now()
+    )
+    for task_id in reclaimed:
+        publish_status(task_id)
+    logger.warning(f"Планировщик вернул в ожидание задачи без признаков жизни: {reclaimed}")
+    return reclaimed
+
+
+def _retry_later():
+    """Откладывает запуск планировщика, пока блокировку держит другой процесс"""
+    from .tasks import dispatch_tasks
+
+    # При синхронном выполнении держатель блокировки — этот же процесс, он запустит задачи сам
+    if dispatch_tasks.app.conf.task_always_eager:
+        return
+    try:
+        if caches[settings.PROCESSING_SCHEDULER_ALIAS].add(RETRY_KEY, 1, timeout=RETRY_COUNTDOWN - 1):
+            dispatch_tasks.apply_async(countdown=RETRY_COUNTDOWN)
+    except Exception as exc:
+        logger.warning(f"Повторный запуск планировщика не поставлен: {exc}")
+
+
+def _acquire_lock():
+    """Кэш с взятой блокировкой, None — без блокировки, False — занята"""
+    alias = getattr(settings, 'PROCESSING_SCHEDULER_ALIAS', '')
+    if not alias:
+        return None
+    try:
+        cache = caches[alias]
+        return cache if cache.add(LOCK_KEY, 1, timeout=LOCK_TIMEOUT) else False
+    except Exception as exc:
+        logger.warning(f"Блокировка планировщика недоступна: {exc}")
+        return None
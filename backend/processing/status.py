@@ -0,0 +1,128 @@
+"""
+Снимок статуса задачи обработки в общем кэше
+
+Конвейер публикует статус задачи в кэш PROCESSING_STATUS_ALIAS (Redis)
+при каждой записи прогресса (ProgressReporter.flush) и при смене
+статуса. /api/tasks/{id}/status/ читает снимок из кэша и обращается к
+БД только при промахе (снимок истек или кэш недоступен), заодно
+публикуя его заново.
+
+Снимок содержит поля задачи, из которых строится ответ, и версию —
+хэш этих полей. Версия служит ETag: пока прогресс не изменился, опрос
+с If-None-Match получает 304 без запросов к задаче в БД. Изменение
+версии и смена статуса публикуются и как события задачи
+(processing.events, progress и stage).
+"""
+
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from core.models import ProcessingTask
+
+from .events import publish_event, status_payload
+
+logger = logging.getLogger(__name__)
+
+STATUS_KEY = 'tasks:status:{task_id}'
+
+# Поля задачи, из которых строится ответ статуса (TaskStatusSerializer)
+STATUS_FIELDS = [
+    'id', 'user_id', 'status', 'total_items', 'processed_items',
+    'duplicate_items', 'cache_hits', 'cache_misses',
+    'tier_memory_items', 'tier_local_items', 'tier_agent_items',
+    'cancel_requested_at', 'cancelled_at', 'error_message',
+]
+
+
+def get_alias():
+    return getattr(settings, 'PROCESSING_STATUS_ALIAS', '')
+
+
+def get_ttl():
+    return getattr(settings, 'PROCESSING_STATUS_TTL', 3600)
+
+
+def get_version(fields):
+    """Версия прогресса: хэш значений полей снимка"""
+    payload = json.dumps(fields, sort_keys=True, default=str)
+    return hashlib.md5(payload.encode('utf-8')).hexdigest()
+
+
+def read_status(task_id):
+    """Снимок из кэша или None (нет в кэше или кэш недоступен)"""
+    alias = get_alias()
+    if not alias:
+        return None
+    try:
+        return caches[alias].get(STATUS_KEY.format(task_id=task_id))
+    except Exception as exc:
+        logger.warning(f"Статус задачи {task_id} недоступен в кэше: {exc}")
+        return None
+
+
+def publish_status(task_id):
+    """
+    Читает статус задачи из БД и записывает снимок в кэш
+
+    Время изменения (modified) сдвигается, только если изменилась версия;
+    тогда же публикуются события progress и (при смене статуса) stage.
+
+    Returns:
+        Снимок {'fields', 'version', 'modified'} или None, если задачи нет
+    """
+    fields = ProcessingTask.objects.filter(pk=task_id).values(*STATUS_FIELDS).first()
+    alias = get_alias()
+    if fields is None:
+        if alias:
+            try:
+                caches[alias].delete(STATUS_KEY.format(task_id=task_id))
+            except Exception as exc:
+                logger.warning(f"Статус задачи {task_id} не удален из кэша: {exc}")
+        return None
+
+    version = get_version(fields)
+    previous = read_status(task_id)
+    changed = previous is None or previous['version'] != version
+    snapshot = {
+        'fields': fields,
+        'version': version,
+        'modified': timezone.now() if changed else previous['modified'],
+    }
+    if alias:
+        try:
+            caches[alias].set(STATUS_KEY.format(task_id=task_id), snapshot, timeout=get_ttl())
+        except Exception as exc:
+            logger.warning(f"Статус задачи {task_id} не записан в кэш: {exc}")
+
+    if changed:
+        publish_event(task_id, 'progress', status_payload(snapshot))
+        previous_status = previous['fields']['status'] if previous else None
+        if fields['status'] != previous_status:
+            publish_event(task_id, 'stage', {'status': fields['status'], 'previous': previous_status})
+    return snapshot
+
+
+def discard_status(task_ids):
+    """Удаляет снимки задач из кэша (задачи удалены без publish_status)"""
+    alias = get_alias()
+    if not alias or not task_ids:
+        return
+    try:
+        caches[alias].delete_many([STATUS_KEY.format(task_id=task_id) for task_id in task_ids])
+    except Exception as exc:
+        logger.warning(f"Статусы задач не удалены из кэша: {exc}")
+
+
+def load_status(task_id):
+    """Снимок статуса: из кэша, при промахе — из БД с публикацией"""
+    return read_status(task_id) or publish_status(task_id)
+
+
+def snapshot_task(snapshot):
+    """Несохраненный ProcessingTask из снимка (для сериализатора, без запросов)"""
+    return ProcessingTask(**snapshot['fields'])
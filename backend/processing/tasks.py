@@ -2,14 +2,33 @@
 Celery задачи для обработки файлов
 """
 
-from celery import shared_task
+from celery import chord, group, shared_task
+from django.conf import settings
 from django.core.mail import mail_admins
-from core.models import ProcessingTask, ProductItem, HSCode
-import pandas as pd
+from django.db.models import Count
+from django.utils import timezone
+from core.models import ProcessingTask, ProductItem
+from .cache import get_classification_cache, normalize_description
+from .cancellation import (
+    CancellationToken, TaskCancelled, TaskSuperseded, cancellation_scope, mark_cancelled
+)
+from .classifiers import get_classifier
+from .events import publish_items
+from .memory import recall, remember
+from .persistence import (
+    advance_checkpoint, attach_hs_codes, chunked, create_items, get_batch_size, pending_items, save_results
+)
+from .progress import ProgressReporter
+from .readers import count_rows, get_max_rows, iter_row_batches
+from .scheduler import QUEUES, dispatch
+from .status import discard_status, publish_status
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Уровни классификации, для которых у задачи есть счетчики tier_<уровень>_items
+TIERS = {tier for tier, _ in ProductItem.TIER_CHOICES}
+
 
 @shared_task(bind=True)
 def debug_task(self):
@@ -18,17 +37,67 @@ def debug_task(self):
     return 'Debug task completed'
 
 
+def restore_progress(task):
+    """
+    Готовит счетчики задачи к запуску (без сохранения)
+    
+    Первый запуск обнуляет счетчики. Повторный (retry после сбоя,
+    повторная доставка) продолжает с контрольной точки: обработанные
+    позиции и уровни пересчитываются по сохраненным результатам, а
+    счетчики повторов и кэша остаются как есть.
+    
+    Returns:
+        True, если у задачи уже есть позиции (повторный запуск)
+    """
+    resuming = task.checkpoint_row > 0 or task.items.exists()
+    if not resuming:
+        task.processed_items = 0
+        task.duplicate_items = 0
+        task.cache_hits = 0
+        task.cache_misses = 0
+        task.tier_memory_items = task.tier_local_items = task.tier_agent_items = 0
+        return False
+    
+    count_progress(task)
+    return True
+
+
+def count_progress(task):
+    """Пересчитывает обработанные позиции и уровни по сохраненным результатам (без сохранения)"""
+    done = task.items.exclude(status='pending')
+    task.processed_items = done.count()
+    tiers = dict(done.values_list('classification_tier').annotate(count=Count('id')))
+    for tier in TIERS:
+        setattr(task, f'tier_{tier}_items', tiers.get(tier, 0))
+
+
 @shared_task(bind=True)
 def process_file_task(self, task_id):
     """
     Основная задача обработки файла
     """
+    progress = None
     try:
         # Получаем задачу из БД
         task = ProcessingTask.objects.get(id=task_id)
+        if task.celery_task_id and task.celery_task_id != self.request.id:
+            # Планировщик вернул задачу в ожидание и запустил заново (processing.scheduler)
+            logger.warning(f"Устаревший запуск задачи {task_id} ({self.request.id}) пропущен")
+            return {'status': 'superseded'}
+        # Запуск владеет задачей, пока ее celery_task_id — его id
+        token = CancellationToken(task.id, owner=self.request.id)
+        if task.status == 'cancelled' or task.cancel_requested_at:
+            # Отменена до начала обработки
+            return finish_cancelled(task)
         task.status = 'processing'
         task.celery_task_id = self.request.id
-        task.save()
+        resuming = restore_progress(task)
+        task.save(update_fields=[
+            'status', 'celery_task_id', 'processed_items', 'duplicate_items',
+            'cache_hits', 'cache_misses', 'tier_memory_items', 'tier_local_items',
+            'tier_agent_items', 'updated_at'
+        ])
+        publish_status(task.id)
         
         # Обновляем прогресс
         self.update_state(
@@ -38,57 +107,78 @@ def process_file_task(self, task_id):
         
         # Читаем файл
         logger.info(f"Начинаем обработку файла: {task.file_name}")
-        df = pd.read_excel(task.file_path) if task.file_path.endswith('.xlsx') else pd.read_csv(task.file_path)
+        # Файл не загружается целиком: сначала считаем строки, затем читаем пакетами
+        total_rows = count_rows(task.file_path)
+        max_rows = get_max_rows()
+        if total_rows > max_rows:
+            raise ValueError(f'Слишком много строк ({total_rows}). Максимум: {max_rows} строк')
         
-        total_rows = len(df)
         task.total_items = total_rows
-        task.save()
-        
-        # Обрабатываем каждую строку
-        for index, row in df.iterrows():
-            # Создаем ProductItem
-            product_item = ProductItem.objects.create(
-                task=task,
-                row_number=index + 1,
-                original_description=str(row.get('description', '')),
-                quantity=str(row.get('quantity', '')),
-                unit=str(row.get('unit', ''))
-            )
-            
-            # Симуляция AI классификации (заглушка)
-            # TODO: Здесь будет реальная AI обработка
-            mock_classification_result = mock_classify_product(product_item.original_description)
-            
-            # Обновляем результат
-            product_item.suggested_hs_code = mock_classification_result['hs_code']
-            product_item.confidence_score = mock_classification_result['confidence']
-            product_item.ai_reasoning = mock_classification_result['reasoning']
-            product_item.alternatives = mock_classification_result['alternatives']
-            product_item.status = 'processed'
-            product_item.save()
-            
-            # Обновляем прогресс
-            processed = index + 1
-            task.processed_items = processed
-            task.save()
+        task.save(update_fields=['total_items', 'updated_at'])
+        publish_status(task.id)
+        
+        # Большой файл раскладываем на шарды и классифицируем на всех воркерах
+        shard_size = get_shard_size()
+        if shard_size and total_rows > shard_size:
+            return dispatch_shards(task, total_rows, shard_size, token)
+        
+        # Прогресс пишется в БД и Celery не на каждый пакет, а с коалесцированием
+        progress = ProgressReporter(task, celery_task=self)
+        
+        # Обрабатываем файл пакетами: один INSERT и один UPDATE на пакет.
+        # Пакеты до контрольной точки уже сохранены прошлым запуском и пропускаются
+        checkpoint = task.checkpoint_row
+        processed = 0
+        memo = {}
+        for rows in iter_row_batches(task.file_path, get_batch_size()):
+            start_row = processed + 1
+            processed += len(rows)
+            if processed <= checkpoint:
+                continue
+            token.raise_if_cancelled()
             
-            # Обновляем состояние задачи
-            progress_percent = int((processed / total_rows) * 100)
-            self.update_state(
-                state='PROGRESS',
-                meta={
-                    'current': processed,
-                    'total': total_rows,
-                    'percent': progress_percent,
-                    'status': f'Обработано {processed} из {total_rows} позиций'
-                }
-            )
+            # Создаем ProductItem для всего пакета
+            items = create_items(task, rows, start_row=start_row)
+            if resuming:
+                # Строки с результатом (сохраненные другим запуском) не классифицируем повторно
+                items = pending_items(task, items)
+            if not items:
+                advance_checkpoint(task, processed)
+                continue
+            with cancellation_scope(token):
+                stats = classify_batch(items, memo, user_id=task.user_id, checkpoint=(task, processed))
+            # Пока пакет классифицировался, задачу могли запустить заново:
+            # его прогресс учтет новый запуск
+            token.raise_if_superseded()
+            progress.advance(len(items), **stats)
+        
+        # Финальное состояние прогресса записывается всегда
+        progress.flush()
+        if resuming:
+            # Пакеты, дописанные прежним запуском после restore_progress,
+            # в счетчиках этого запуска не учтены
+            count_progress(task)
+            task.save(update_fields=[
+                'processed_items', 'tier_memory_items', 'tier_local_items',
+                'tier_agent_items', 'updated_at'
+            ])
         
         # Завершаем задачу
         task.status = 'completed'
-        task.save()
+        task.save(update_fields=['status', 'updated_at'])
+        publish_status(task.id)
         
-        logger.info(f"Обработка файла {task.file_name} завершена успешно")
+        task.refresh_from_db(fields=[
+            'duplicate_items', 'cache_hits', 'cache_misses',
+            'tier_memory_items', 'tier_local_items', 'tier_agent_items'
+        ])
+        logger.info(
+            f"Обработка файла {task.file_name} завершена успешно, "
+            f"повторов: {task.duplicate_items} ({task.dedup_ratio:.0%}), "
+            f"кэш: {task.cache_hits} попаданий, {task.cache_misses} промахов "
+            f"({task.cache_hit_ratio:.0%}), уровни: {task.tier_counts}"
+        )
+        dispatch_tasks.delay()
         
         return {
             'status': 'completed',
@@ -97,13 +187,29 @@ def process_file_task(self, task_id):
             'message': f'Файл {task.file_name} обработан успешно'
         }
         
+    except TaskSuperseded as exc:
+        # Задачу ведет новый запуск: ни прогресс, ни статус не трогаем
+        logger.warning(f"Запуск {self.request.id} прекращен: {exc}")
+        return {'status': 'superseded'}
+    
+    except TaskCancelled:
+        # Прерванный пакет не записан, записанные пакеты остаются
+        return finish_cancelled(task, progress)
+        
     except Exception as exc:
         logger.error(f"Ошибка при обработке файла: {exc}")
         
-        # Обновляем статус задачи
-        task.status = 'failed'
+        # Сохраняем уже обработанный прогресс и обновляем статус задачи.
+        # До исчерпания попыток задача остается в processing и занимает
+        # свое место у планировщика, иначе повтор запустится сверх лимита
+        if progress is not None:
+            progress.flush()
+        exhausted = self.request.retries >= 3
+        if exhausted:
+            task.status = 'failed'
         task.error_message = str(exc)
-        task.save()
+        task.save(update_fields=['status', 'error_message', 'updated_at'])
+        publish_status(task.id)
         
         # Уведомляем админов
         mail_admins(
@@ -111,66 +217,295 @@ def process_file_task(self, task_id):
             f'Ошибка при обработке файла {task.file_name}: {exc}'
         )
         
+        # Попытки исчерпаны — место задачи освобождается для следующих
+        if exhausted:
+            dispatch_tasks.delay()
+        
         # Перебрасываем исключение
         raise self.retry(exc=exc, countdown=60, max_retries=3)
 
 
-def mock_classify_product(description):
+def finish_cancelled(task, progress=None):
+    """Сохраняет прогресс записанных пакетов и отмечает задачу отмененной"""
+    if progress is not None:
+        progress.flush()
+    latency = mark_cancelled(task.id)
+    dispatch_tasks.delay()
+    return {
+        'status': 'cancelled',
+        'cancel_latency': latency,
+        'message': f'Обработка файла {task.file_name} отменена'
+    }
+
+
+def classify_batch(items, memo=None, user_id=None, checkpoint=None):
     """
-    Временная заглушка для AI классификации
-    TODO: Заменить на реальный AI агент
+    Классифицирует пакет позиций и сохраняет результаты одной транзакцией
+    
+    Позиции группируются по нормализованному описанию: каждое уникальное
+    описание классифицируется один раз, результат раздается всем его
+    позициям. memo хранит результаты между пакетами одного файла, поэтому
+    повтор из прошлого пакета тоже не классифицируется заново. Описания,
+    код которых владелец задачи уже подтверждал, берутся из памяти
+    решений; бэкенд вызывается только для описаний, которых нет ни там,
+    ни в кэше классификации.
+    
+    Args:
+        items: пакет ProductItem
+        memo: словарь нормализованное описание -> результат (на файл/шард)
+        user_id: владелец задачи (чья память решений используется)
+        checkpoint: (task, номер строки) — сдвигается вместе с результатами
+    
+    Returns:
+        Приращения счетчиков задачи: duplicate_items, cache_hits, cache_misses
+        и tier_<уровень>_items по позициям пакета
+    """
+    memo = {} if memo is None else memo
+    keys = [normalize_description(item.original_description) for item in items]
+    
+    # Первая позиция с каждым новым описанием представляет всю группу
+    representatives = {}
+    for key, item in zip(keys, items):
+        if key not in memo:
+            representatives.setdefault(key, item.original_description)
+    
+    stats = {'duplicate_items': len(items) - len(representatives)}
+    if representatives:
+        remembered = recall(user_id, representatives)
+        memo.update(remembered)
+        for key in remembered:
+            del representatives[key]
+    
+    if representatives:
+        results, cache_stats = classify_descriptions(list(representatives.values()))
+        memo.update(zip(representatives, results))
+        stats.update(cache_stats)
+    
+    # Уровень позиции — уровень, который классифицировал ее описание
+    for key in keys:
+        tier = memo[key].get('tier')
+        if tier in TIERS:
+            field = f'tier_{tier}_items'
+            stats[field] = stats.get(field, 0) + 1
+    
+    # Результат общий для группы позиций — attach_hs_codes меняет копии
+    save_results(items, attach_hs_codes([dict(memo[key]) for key in keys]), checkpoint)
+    publish_items(items[0].task_id, items)
+    return stats
+
+
+def classify_descriptions(descriptions):
     """
-    import random
+    Классифицирует уникальные описания через кэш и бэкенд
     
-    # Простая логика на основе ключевых слов
-    description_lower = description.lower()
+    Returns:
+        (результаты в порядке descriptions, {'cache_hits': ..., 'cache_misses': ...})
+    """
+    classifier = get_classifier()
+    cache = get_classification_cache(classifier)
+    if cache is None:
+        return classify_fresh(classifier, descriptions), {}
     
-    mock_codes = [
-        {'code': '8703.10.00', 'desc': 'Автомобили легковые'},
-        {'code': '6203.42.31', 'desc': 'Брюки мужские из хлопка'},
-        {'code': '0901.11.00', 'desc': 'Кофе не обжаренный'},
-        {'code': '8471.30.00', 'desc': 'Машины вычислительные портативные'},
-        {'code': '6204.62.31', 'desc': 'Брюки женские из хлопка'},
+    # Найденное в кэше отмечается уровнем 'memory' (записи кэша не меняются)
+    results = [
+        None if result is None else {**result, 'tier': 'memory'}
+        for result in cache.get_many(descriptions)
     ]
+    missing = [index for index, result in enumerate(results) if result is None]
+    if missing:
+        missing_descriptions = [descriptions[index] for index in missing]
+        fresh = classify_fresh(classifier, missing_descriptions)
+        cache.set_many(missing_descriptions, fresh)
+        for index, result in zip(missing, fresh):
+            results[index] = result
     
-    # Выбираем подходящий код (очень примитивная логика)
-    if any(word in description_lower for word in ['автомобиль', 'машина', 'авто']):
-        selected_code = mock_codes[0]
-        confidence = 0.85
-    elif any(word in description_lower for word in ['брюки', 'штаны']):
-        selected_code = mock_codes[1] if 'мужск' in description_lower else mock_codes[4]
-        confidence = 0.75
-    elif any(word in description_lower for word in ['кофе', 'coffee']):
-        selected_code = mock_codes[2]
-        confidence = 0.90
-    elif any(word in description_lower for word in ['компьютер', 'ноутбук', 'laptop']):
-        selected_code = mock_codes[3]
-        confidence = 0.80
-    else:
-        selected_code = random.choice(mock_codes)
-        confidence = random.uniform(0.3, 0.7)
-    
-    # Создаем или получаем HS код
-    hs_code, created = HSCode.objects.get_or_create(
-        code=selected_code['code'],
-        defaults={
-            'description': selected_code['desc'],
-            'category': 'Товары народного потребления',
-            'subcategory': 'Общая группа'
-        }
+    return results, {'cache_hits': len(descriptions) - len(missing), 'cache_misses': len(missing)}
+
+
+def classify_fresh(classifier, descriptions):
+    """Вызов бэкенда; результат без уровня получает уровень бэкенда"""
+    results = classifier.classify_batch(descriptions)
+    for result in results:
+        result.setdefault('tier', classifier.tier)
+    return results
+
+
+def get_shard_size():
+    """Количество строк в одном шарде (0 — шардирование отключено)"""
+    return getattr(settings, 'PROCESSING_SHARD_SIZE', 0)
+
+
+def shard_ranges(total_rows, shard_size):
+    """Диапазоны номеров строк (first_row, last_row) для каждого шарда"""
+    return [
+        (first_row, min(first_row + shard_size - 1, total_rows))
+        for first_row in range(1, total_rows + 1, shard_size)
+    ]
+
+
+def dispatch_shards(task, total_rows, shard_size, token=None):
+    """
+    Шардированный режим обработки
+    
+    Родительская задача только сохраняет строки файла пакетами, а
+    классификацию выполняют шарды (group) на любых свободных воркерах.
+    Шарды загружают свои позиции из БД по диапазону row_number, поэтому
+    через брокер передаются только номера строк. Когда все шарды
+    завершены, chord вызывает finalize_task.
+    """
+    # Шарды и finalize_task работают от имени родительского запуска
+    owner = token.owner if token is not None else None
+    processed = 0
+    for rows in iter_row_batches(task.file_path, get_batch_size()):
+        if token is not None:
+            token.raise_if_cancelled()
+        items = create_items(task, rows, start_row=processed + 1)
+        processed += len(items)
+    
+    shards = shard_ranges(processed, shard_size)
+    # Шарды идут в очередь приоритета родительской задачи
+    header = group(
+        process_shard_task.s(task.id, first_row, last_row, owner=owner).set(queue=QUEUES[task.priority])
+        for first_row, last_row in shards
     )
+    chord(header)(finalize_task.s(task.id, owner=owner))
+    
+    logger.info(f"Файл {task.file_name} разбит на {len(shards)} шардов по {shard_size} строк")
     
     return {
-        'hs_code': hs_code,
-        'confidence': confidence,
-        'reasoning': f'Классификация на основе ключевых слов в описании: "{description[:50]}..."',
-        'alternatives': [
-            {'code': code['code'], 'confidence': random.uniform(0.2, 0.6)} 
-            for code in random.sample(mock_codes, 2)
-        ]
+        'status': 'sharded',
+        'total_items': total_rows,
+        'shards': len(shards),
+        'message': f'Файл {task.file_name} передан на обработку {len(shards)} шардами'
     }
 
 
+@shared_task(bind=True, max_retries=3)
+def process_shard_task(self, task_id, first_row, last_row, owner=None):
+    """
+    Классификация одного шарда строк задачи
+    
+    Обрабатываются только позиции в статусе pending, поэтому повторный
+    запуск шарда не классифицирует строки повторно. Отмененная задача
+    прекращает шард между пакетами, запущенная заново (owner больше не
+    ее celery_task_id) — тоже, без записи прогресса.
+    """
+    progress = None
+    processed = 0
+    try:
+        task = ProcessingTask.objects.get(id=task_id)
+        token = CancellationToken(task.id, owner=owner)
+        token.raise_if_cancelled()
+        progress = ProgressReporter(task)
+        batch_size = get_batch_size()
+        
+        items = ProductItem.objects.filter(
+            task_id=task_id,
+            row_number__range=(first_row, last_row),
+            status='pending'
+        ).order_by('row_number')
+        
+        # Повторы ищутся внутри шарда; между шардами их отсекает общий кэш
+        memo = {}
+        for batch in chunked(items.iterator(chunk_size=batch_size), batch_size):
+            token.raise_if_cancelled()
+            with cancellation_scope(token):
+                stats = classify_batch(batch, memo, user_id=task.user_id)
+            token.raise_if_superseded()
+            processed += len(batch)
+            progress.advance(len(batch), **stats)
+        
+        progress.flush()
+        return processed
+    
+    except TaskSuperseded as exc:
+        # chord ждет все шарды; прогресс шарда учтет новый запуск
+        logger.warning(f"Шард {first_row}-{last_row} прекращен: {exc}")
+        return processed
+    
+    except TaskCancelled:
+        # chord ждет все шарды: отмененный шард завершается успешно
+        if progress is not None:
+            progress.flush()
+        mark_cancelled(task_id)
+        dispatch_tasks.delay()
+        return processed
+    
+    except Exception as exc:
+        logger.error(f"Ошибка при обработке шарда {first_row}-{last_row} задачи {task_id}: {exc}")
+        
+        if progress is not None:
+            progress.flush()
+        
+        # Если попытки исчерпаны, chord не вызовет finalize_task — помечаем задачу сами
+        if self.request.retries >= self.max_retries:
+            ProcessingTask.objects.filter(pk=task_id).update(
+                status='failed',
+                error_message=str(exc),
+                updated_at=timezone.now()
+            )
+            publish_status(task_id)
+            dispatch_tasks.delay()
+        
+        raise self.retry(exc=exc, countdown=60)
+
+
+@shared_task
+def finalize_task(shard_results, task_id, owner=None):
+    """Callback chord: все шарды обработаны, завершаем задачу"""
+    processed = sum(shard_results)
+    tasks = ProcessingTask.objects.filter(pk=task_id, status='processing')
+    if owner is not None:
+        # Задачу запустили заново — завершит ее новый запуск
+        tasks = tasks.filter(celery_task_id=owner)
+    tasks.update(
+        status='completed',
+        updated_at=timezone.now()
+    )
+    publish_status(task_id)
+    
+    logger.info(f"Шардированная обработка задачи {task_id} завершена: {processed} позиций")
+    dispatch_tasks.delay()
+    
+    return {
+        'status': 'completed',
+        'processed_items': processed,
+        'shards': len(shard_results)
+    }
+
+
+@shared_task
+def remember_confirmed_items(task_id, ids=None, min_confidence=None, max_confidence=None):
+    """
+    Запоминает коды, подтвержденные массовым действием (см. processing.memory)
+    
+    Массовое подтверждение — один UPDATE без чтения позиций; задача
+    получает его критерии выбора и запоминает текущие подтвержденные
+    коды подходящих позиций. Позиции, измененные после UPDATE,
+    запоминаются с их новым кодом, а уже не подтвержденные — пропускаются.
+    """
+    items = ProductItem.objects.filter(task_id=task_id, status='confirmed', final_hs_code__isnull=False)
+    if ids:
+        items = items.filter(id__in=ids)
+    if min_confidence is not None:
+        items = items.filter(confidence_score__gte=min_confidence)
+    if max_confidence is not None:
+        items = items.filter(confidence_score__lt=max_confidence)
+    items = items.select_related('task').only('original_description', 'final_hs_code_id', 'task__user_id')
+    
+    remembered = 0
+    for batch in chunked(items.iterator(chunk_size=get_batch_size()), get_batch_size()):
+        remember(batch)
+        remembered += len(batch)
+    return remembered
+
+
+@shared_task
+def dispatch_tasks():
+    """Запускает ожидающие задачи на освободившиеся места (см. processing.scheduler)"""
+    return dispatch()
+
+
 @shared_task
 def cleanup_old_tasks():
     """Очистка старых задач (запускается по расписанию)"""
@@ -180,11 +515,14 @@ def cleanup_old_tasks():
     cutoff_date = datetime.now() - timedelta(days=30)
     old_tasks = ProcessingTask.objects.filter(
         created_at__lt=cutoff_date,
-        status__in=['completed', 'failed']
+        status__in=['completed', 'failed', 'cancelled']
     )
     
-    count = old_tasks.count()
+    task_ids = list(old_tasks.values_list('id', flat=True))
+    count = len(task_ids)
     old_tasks.delete()
+    # Снимки статуса удаленных задач иначе отвечали бы до истечения TTL
+    discard_status(task_ids)
     
     logger.info(f"Удалено {count} старых задач")
     return f"Удалено {count} старых задач"
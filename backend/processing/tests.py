@@ -1,3 +1,49 @@
-from django.test import TestCase
+import os
+import re
+import shutil
+import tempfile
+import zipfile
 
-# Create your tests here.
+import openpyxl
+from django.test import SimpleTestCase
+
+from .readers import count_rows, iter_row_batches
+
+
+class XlsxReaderTests(SimpleTestCase):
+    """Потоковое чтение .xlsx (processing.readers)"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def make_workbook(self, rows, dimension=None):
+        """Книга с заголовком и rows строками; dimension — подменить тег <dimension>"""
+        path = os.path.join(self.directory, 'items.xlsx')
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(['description', 'quantity', 'unit'])
+        for number in range(rows):
+            sheet.append([f'Товар {number}', number, 'шт'])
+        workbook.save(path)
+
+        if dimension is not None:
+            patched = os.path.join(self.directory, 'patched.xlsx')
+            with zipfile.ZipFile(path) as source, zipfile.ZipFile(patched, 'w', zipfile.ZIP_DEFLATED) as target:
+                for entry in source.infolist():
+                    data = source.read(entry.filename)
+                    if entry.filename == 'xl/worksheets/sheet1.xml':
+                        data = re.sub(rb'<dimension ref="[^"]*"', f'<dimension ref="{dimension}"'.encode(), data)
+                    target.writestr(entry, data)
+            os.replace(patched, path)
+        return path
+
+    def test_reads_all_rows(self):
+        path = self.make_workbook(50)
+        self.assertEqual(count_rows(path), 50)
+
+    def test_stale_dimension_does_not_truncate_rows(self):
+        path = self.make_workbook(50, dimension='A1:C1')
+        batches = list(iter_row_batches(path, batch_size=20))
+        self.assertEqual([len(batch) for batch in batches], [20, 20, 10])
+        self.assertEqual(batches[-1][-1], {'description': 'Товар 49', 'quantity': '49', 'unit': 'шт'})
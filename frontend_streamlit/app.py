@@ -64,8 +64,8 @@ def main():
         **Версия:** 1.0.0  
         **Статус:** В разработке  
         **Поддержка:** Excel, CSV файлы  
-        **Макс. размер:** 10 MB  
-        **Макс. позиций:** 1000
+        **Макс. размер:** 50 MB  
+        **Макс. позиций:** 100 000
         """)
         
         # Быстрые действия
@@ -60,8 +60,8 @@ def show():
         st.markdown("""
         ### Шаг 1: Подготовьте файл
         - Используйте Excel (.xlsx, .xls) или CSV формат
-        - Максимальный размер файла: **10 MB**
-        - Максимальное количество позиций: **1000**
+        - Максимальный размер файла: **50 MB**
+        - Максимальное количество позиций: **100 000**
         - Обязательные колонки: наименование товара, количество, единица измерения
         
         ### Шаг 2: Загрузите файл
@@ -24,11 +24,6 @@ def show():
     with col2:
         auto_refresh = st.checkbox("⚡ Авто-обновление", value=False)
     
-    if auto_refresh:
-        # Авто-обновление каждые 5 секунд
-        time.sleep(5)
-        st.rerun()
-    
     # Получение списка задач
     api = APIClient()
     tasks = get_user_tasks(api)
@@ -79,6 +74,46 @@ def show():
             show_task_card(task, api)
     else:
         st.info("Нет задач, соответствующих выбранным фильтрам")
+    
+    if auto_refresh:
+        follow_task_events(tasks, api)
+
+def follow_task_events(tasks, api: APIClient):
+    """
+    Авто-обновление: прогресс активной задачи по потоку событий (SSE)
+    
+    Страница перезапускается, когда у задачи меняется статус; без
+    активных задач или без потока событий — раз в 5 секунд, как раньше.
+    Поток недоступен, если бэкенд запущен не под ASGI сервером (отвечает
+    503) или не прислал ни одного события: тогда следующую минуту
+    страница только опрашивает статус.
+    """
+    active = [task for task in tasks if task.get('status') in ('pending', 'processing')]
+    retry_at = st.session_state.get('task_events_retry_at', 0)
+    if active and time.time() >= retry_at:
+        task = active[0]
+        st.subheader(f"⚡ В реальном времени: {task.get('file_name', '')}")
+        progress_bar = st.progress(min(task.get('progress_percent', 0) / 100.0, 1.0))
+        caption = st.empty()
+        
+        received = False
+        for event, data in api.stream_task_events(task['id']):
+            received = True
+            if event == 'progress':
+                percent = data.get('progress_percent', 0)
+                progress_bar.progress(min(percent / 100.0, 1.0))
+                caption.caption(
+                    f"Обработано: {data.get('processed_items', 0)} из {data.get('total_items', 0)} "
+                    f"позиций ({percent:.1f}%)"
+                )
+            elif event == 'stage':
+                break
+        if received:
+            st.rerun()
+        st.session_state.task_events_retry_at = time.time() + 60
+    
+    time.sleep(5)
+    st.rerun()
 
 def get_user_tasks(api: APIClient):
     """Получение задач пользователя"""
@@ -303,6 +338,6 @@ def show_empty_state():
         st.markdown("""
         **💡 Подсказки:**
         - Поддерживаются файлы .xlsx, .xls, .csv
-        - Максимальный размер файла: 10 MB
-        - Максимальное количество позиций: 1000
+        - Максимальный размер файла: 50 MB
+        - Максимальное количество позиций: 100 000
         """) 
\ No newline at end of file
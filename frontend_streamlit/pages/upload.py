@@ -25,8 +25,8 @@ def show():
             - CSV (.csv)
             
             **📏 Ограничения:**
-            - Максимальный размер: 10 MB
-            - Максимальное количество строк: 1000
+            - Максимальный размер: 50 MB
+            - Максимальное количество строк: 100 000
             """)
         
         with col2:
@@ -45,7 +45,7 @@ def show():
     uploaded_file = st.file_uploader(
         "Выберите файл или перетащите его сюда",
         type=['xlsx', 'xls', 'csv'],
-        help="Поддерживаются Excel и CSV файлы размером до 10 MB"
+        help="Поддерживаются Excel и CSV файлы размером до 50 MB"
     )
     
     if uploaded_file is not None:
@@ -2,9 +2,10 @@
 API клиент для взаимодействия с Django backend
 """
 
+import json
 import requests
 import streamlit as st
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, Iterator, List, Tuple
 import os
 
 class APIClient:
@@ -209,6 +210,41 @@ class APIClient:
         """
         return self.get(f'/tasks/{task_id}/status/')
     
+    def stream_task_events(self, task_id: int, timeout: float = 30) -> Iterator[Tuple[str, Dict]]:
+        """
+        Поток событий задачи (Server-Sent Events)
+        
+        Args:
+            task_id: ID задачи
+            timeout: сколько ждать следующего события или keepalive (секунды;
+                сервер шлет keepalive раз в 15 секунд)
+            
+        Yields:
+            (событие, данные): progress, stage или items; поток заканчивается,
+            когда задача завершена, или молча при ошибке соединения и при
+            ответе 503 (бэкенд не под ASGI сервером или события отключены)
+        """
+        url = f"{self.base_url.rstrip('/')}/tasks/{task_id}/events/"
+        try:
+            with self.session.get(url, stream=True, timeout=(5, timeout),
+                                  headers={'Accept': 'text/event-stream'}) as response:
+                response.raise_for_status()
+                response.encoding = 'utf-8'
+                event, data = 'message', []
+                for line in response.iter_lines(decode_unicode=True):
+                    if line:
+                        if line.startswith('event:'):
+                            event = line[len('event:'):].strip()
+                        elif line.startswith('data:'):
+                            data.append(line[len('data:'):].strip())
+                        continue
+                    # Пустая строка завершает событие
+                    if data:
+                        yield event, json.loads('\n'.join(data))
+                    event, data = 'message', []
+        except (requests.RequestException, ValueError):
+            return
+    
     def get_user_tasks(self) -> List[Dict]:
         """
         Получение списка задач пользователя
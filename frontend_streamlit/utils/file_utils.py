@@ -7,6 +7,10 @@ import streamlit as st
 from typing import Dict, Any, Optional
 import io
 
+# Ограничения загружаемых файлов (совпадают с настройками backend)
+MAX_FILE_SIZE_MB = 50
+MAX_ROWS = 100000
+
 def validate_file(uploaded_file) -> Dict[str, Any]:
     """
     Валидация загруженного файла
@@ -31,9 +35,9 @@ def validate_file(uploaded_file) -> Dict[str, Any]:
         file_size_mb = uploaded_file.size / (1024 * 1024)
         validation_result['size_mb'] = file_size_mb
         
-        if file_size_mb > 10:
+        if file_size_mb > MAX_FILE_SIZE_MB:
             validation_result['errors'].append(
-                f"Файл слишком большой ({file_size_mb:.1f} MB). Максимальный размер: 10 MB"
+                f"Файл слишком большой ({file_size_mb:.1f} MB). Максимальный размер: {MAX_FILE_SIZE_MB} MB"
             )
         
         # Проверка типа файла
@@ -59,9 +63,9 @@ def validate_file(uploaded_file) -> Dict[str, Any]:
                 validation_result['rows'] = rows_count
                 
                 # Проверка количества строк
-                if rows_count > 1000:
+                if rows_count > MAX_ROWS:
                     validation_result['errors'].append(
-                        f"Слишком много строк ({rows_count}). Максимум: 1000 строк"
+                        f"Слишком много строк ({rows_count}). Максимум: {MAX_ROWS} строк"
                     )
                 elif rows_count < 1:
                     validation_result['errors'].append("Файл не содержит данных")